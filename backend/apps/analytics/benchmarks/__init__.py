@@ -0,0 +1,7 @@
+"""
+Load and latency benchmarks for the API.
+
+Seed a dataset with ``manage.py bench_seed`` and replay traffic with
+``manage.py bench_run``. Both write to the configured database, so point
+``DATABASE_URL`` at a dedicated SQLite file or Postgres database.
+"""
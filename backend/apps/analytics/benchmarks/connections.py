@@ -0,0 +1,82 @@
+"""
+Connection setup cost per request under the configured ``DB_POOL_MODE``.
+
+Three cycles are timed, each ending in ``SELECT 1``:
+
+``connect``
+    A brand-new server connection, as every request paid before
+    ``CONN_MAX_AGE`` was set.
+``checkout``
+    Closing and reacquiring Django's connection, which is a real reconnect
+    with ``CONN_MAX_AGE=0`` and a pool checkout/return in ``psycopg`` mode.
+``persistent``
+    The end-of-request check plus the start-of-request health check on a
+    kept-open connection.
+"""
+
+import time
+
+from django.db import connections
+
+from .runner import percentile
+
+
+def _select_one(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+
+
+def _connect(connection):
+    # Straight from the driver: get_new_connection() is a pool checkout in
+    # psycopg mode, and closing a checked-out connection leaks its slot
+    raw = connection.Database.connect(**connection.get_connection_params())
+    try:
+        cursor = raw.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        cursor.close()
+    finally:
+        raw.close()
+
+
+def _checkout(connection):
+    connection.close()
+    _select_one(connection)
+
+
+def _persistent(connection):
+    connection.close_if_unusable_or_obsolete()
+    _select_one(connection)
+
+
+CYCLES = {"connect": _connect, "checkout": _checkout, "persistent": _persistent}
+
+
+def measure(alias="default", iterations=200):
+    connection = connections[alias]
+    connection.ensure_connection()
+    results = {}
+    for name, cycle in CYCLES.items():
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            cycle(connection)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        results[name] = {
+            "mean_ms": round(sum(timings) / len(timings), 3),
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+        }
+    return results
+
+
+def savings(results, rate):
+    """Milliseconds of connection work per second avoided at ``rate`` req/s"""
+    connect = results["connect"]["mean_ms"]
+    return {
+        name: round((connect - stats["mean_ms"]) * rate, 1)
+        for name, stats in results.items()
+        if name != "connect"
+    }
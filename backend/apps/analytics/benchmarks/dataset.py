@@ -0,0 +1,303 @@
+"""
+Synthetic dataset for the benchmark suite.
+
+Everything is inserted with ``bulk_create`` in batches and is tagged so it
+can be told apart from real data: user index numbers start with
+``BENCH``, course codes with ``BX`` and file names with ``bench-``.
+"""
+
+import random
+import zlib
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from apps.courses.models import Course
+from apps.past_questions.models import DownloadHistory, PastQuestion
+from apps.users.models import User
+
+PRESETS = {
+    "smoke": {"courses": 20, "users": 500, "past_questions": 2_000, "downloads": 10_000},
+    "small": {
+        "courses": 200,
+        "users": 5_000,
+        "past_questions": 50_000,
+        "downloads": 500_000,
+    },
+    "exam-week": {
+        "courses": 2_000,
+        "users": 200_000,
+        "past_questions": 1_000_000,
+        "downloads": 20_000_000,
+    },
+}
+
+USER_PREFIX = "BENCH"
+COURSE_PREFIX = "BX"
+FILE_PREFIX = "bench-"
+SAMPLE_FILE = "past_questions/bench/sample.pdf"
+BENCH_PASSWORD = "bench-password"
+
+SUBJECTS = ["CSC", "MAT", "PHY", "CHE", "EEE", "MEC", "BUS", "ACC", "ECO", "STA"]
+WORDS = [
+    "introduction",
+    "principles",
+    "advanced",
+    "applied",
+    "systems",
+    "analysis",
+    "design",
+    "networks",
+    "databases",
+    "algorithms",
+    "statistics",
+    "accounting",
+    "economics",
+    "circuits",
+    "thermodynamics",
+    "mechanics",
+    "programming",
+    "management",
+    "calculus",
+    "algebra",
+]
+FACULTY_BY_SUBJECT = {
+    "CSC": "computing",
+    "STA": "computing",
+    "MAT": "engineering",
+    "PHY": "engineering",
+    "CHE": "engineering",
+    "EEE": "engineering",
+    "MEC": "engineering",
+    "BUS": "business",
+    "ACC": "business",
+    "ECO": "business",
+}
+
+
+def sample_pdf(*lines, size=64):
+    """
+    A valid one-page PDF with a text layer and an embedded grayscale scan,
+    so uploads go through real text extraction and fingerprinting
+    """
+    pixels = bytes((x * 4 + y * 2) % 256 for y in range(size) for x in range(size))
+    image = zlib.compress(pixels)
+    text = " ".join(f"({line}) '" for line in lines)
+    content = (
+        f"q 200 0 0 200 72 400 cm /Im1 Do Q BT /F1 14 Tf 72 720 Td 18 TL {text} ET"
+    ).encode("latin-1")
+    objects = [
+        b"<</Type/Catalog/Pages 2 0 R>>",
+        b"<</Type/Pages/Kids[3 0 R]/Count 1>>",
+        b"<</Type/Page/Parent 2 0 R/MediaBox[0 0 612 792]"
+        b"/Resources<</Font<</F1 5 0 R>>/XObject<</Im1 6 0 R>>>>/Contents 4 0 R>>",
+        b"<</Length %d>>stream\n%s\nendstream" % (len(content), content),
+        b"<</Type/Font/Subtype/Type1/BaseFont/Helvetica>>",
+        b"<</Type/XObject/Subtype/Image/Width %d/Height %d/ColorSpace/DeviceGray"
+        b"/BitsPerComponent 8/Filter/FlateDecode/Length %d>>stream\n%s\nendstream"
+        % (size, size, len(image), image),
+    ]
+    pdf, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<</Size %d/Root 1 0 R>>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(pdf)
+
+
+SAMPLE_PDF = sample_pdf("Benchmark examination paper", "Answer all questions")
+
+
+@contextmanager
+def manual_timestamps(*fields):
+    """Let bulk_create keep the timestamps we generate"""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+def _batched(objects, batch_size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DatasetSeeder:
+    def __init__(self, sizes, batch_size=5_000, seed=42, log=print):
+        self.sizes = sizes
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.log = log
+        self.now = timezone.now()
+
+    def _insert(self, model, objects, total):
+        inserted = 0
+        for batch in _batched(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+            inserted += len(batch)
+            if inserted % (self.batch_size * 20) == 0 or inserted == total:
+                self.log(f"  {model.__name__}: {inserted}/{total}")
+
+    def _past(self, max_days):
+        return self.now - timedelta(
+            days=self.random.uniform(0, max_days), seconds=self.random.randint(0, 86400)
+        )
+
+    def seed_users(self):
+        total = self.sizes["users"]
+        password = make_password(BENCH_PASSWORD)
+
+        def users():
+            for i in range(total):
+                subject = SUBJECTS[i % len(SUBJECTS)]
+                staff = i < 10
+                yield User(
+                    index_number=f"{USER_PREFIX}{i:07d}",
+                    email=f"bench{i}@example.com",
+                    password=password,
+                    first_name=f"Student{i}",
+                    last_name=subject.title(),
+                    faculty=FACULTY_BY_SUBJECT[subject],
+                    level=str(self.random.choice([100, 200, 300, 400])),
+                    is_admin=i < 2,
+                    is_moderator=staff,
+                    is_staff=staff,
+                )
+
+        self._insert(User, users(), total)
+
+    def seed_courses(self):
+        total = self.sizes["courses"]
+        creator = User.objects.filter(index_number=f"{USER_PREFIX}0000000").first()
+
+        def courses():
+            for i in range(total):
+                subject = SUBJECTS[i % len(SUBJECTS)]
+                level = 100 * (1 + (i // len(SUBJECTS)) % 4)
+                words = self.random.sample(WORDS, 3)
+                yield Course(
+                    code=f"{COURSE_PREFIX}{subject}{i:05d}",
+                    title=" ".join(words).title(),
+                    faculty=FACULTY_BY_SUBJECT[subject],
+                    department=f"{subject} Department",
+                    level=str(level),
+                    semester=self.random.choice(["first", "second"]),
+                    description=" ".join(self.random.choices(WORDS, k=12)),
+                    created_by=creator,
+                )
+
+        self._insert(Course, courses(), total)
+
+    def seed_past_questions(self):
+        total = self.sizes["past_questions"]
+        course_ids = list(
+            Course.objects.filter(code__startswith=COURSE_PREFIX).values_list(
+                "id", "code"
+            )
+        )
+        user_ids = list(
+            User.objects.filter(index_number__startswith=USER_PREFIX).values_list(
+                "id", flat=True
+            )
+        )
+        semesters = [choice for choice, _ in PastQuestion.SEMESTER_CHOICES]
+        exam_types = [choice for choice, _ in PastQuestion.EXAM_TYPE_CHOICES]
+
+        def past_questions():
+            for i in range(total):
+                course_id, code = self.random.choice(course_ids)
+                year = self.random.randint(2005, self.now.year)
+                exam_type = self.random.choice(exam_types)
+                status = self.random.choices(
+                    ["approved", "pending", "rejected"], weights=[85, 10, 5]
+                )[0]
+                uploaded_at = self._past(365 * 5)
+                yield PastQuestion(
+                    course_id=course_id,
+                    year=year,
+                    semester=self.random.choice(semesters),
+                    exam_type=exam_type,
+                    title=f"{code} {exam_type.title()} {year}",
+                    file=SAMPLE_FILE,
+                    file_name=f"{FILE_PREFIX}{i}.pdf",
+                    file_size=self.random.randint(50_000, 8_000_000),
+                    uploaded_by_id=self.random.choice(user_ids),
+                    uploaded_at=uploaded_at,
+                    status=status,
+                    reviewed_at=uploaded_at if status != "pending" else None,
+                    download_count=int(self.random.paretovariate(1.2)) - 1,
+                    view_count=self.random.randint(0, 500),
+                    lecturer=f"Dr. {self.random.choice(WORDS).title()}",
+                    has_solutions=self.random.random() < 0.3,
+                    is_scanned=self.random.random() < 0.4,
+                )
+
+        field = PastQuestion._meta.get_field("uploaded_at")
+        with manual_timestamps(field):
+            self._insert(PastQuestion, past_questions(), total)
+
+    def seed_downloads(self):
+        total = self.sizes["downloads"]
+        question_ids = list(
+            PastQuestion.objects.filter(
+                file_name__startswith=FILE_PREFIX, status="approved"
+            ).values_list("id", flat=True)
+        )
+        user_ids = list(
+            User.objects.filter(index_number__startswith=USER_PREFIX).values_list(
+                "id", flat=True
+            )
+        )
+        if not question_ids or not user_ids:
+            return
+
+        def downloads():
+            for _ in range(total):
+                yield DownloadHistory(
+                    user_id=self.random.choice(user_ids),
+                    past_question_id=self.random.choice(question_ids),
+                    downloaded_at=self._past(365),
+                    ip_address=f"10.{self.random.randint(0, 255)}."
+                    f"{self.random.randint(0, 255)}.{self.random.randint(1, 254)}",
+                )
+
+        field = DownloadHistory._meta.get_field("downloaded_at")
+        with manual_timestamps(field):
+            self._insert(DownloadHistory, downloads(), total)
+
+    def seed(self):
+        self.log(f"Seeding benchmark dataset: {self.sizes}")
+        self.seed_users()
+        self.seed_courses()
+        self.seed_past_questions()
+        self.seed_downloads()
+
+
+def flush():
+    """Delete everything the seeder created"""
+    DownloadHistory.objects.filter(
+        past_question__file_name__startswith=FILE_PREFIX
+    ).delete()
+    PastQuestion.objects.filter(file_name__startswith=FILE_PREFIX).delete()
+    Course.objects.filter(code__startswith=COURSE_PREFIX).delete()
+    User.objects.filter(index_number__startswith=USER_PREFIX).delete()
@@ -0,0 +1,78 @@
+"""
+Encode/decode cost of ``JSONRenderer`` against ``ORJSONRenderer``.
+
+Response data for the past-question list and search endpoints is taken
+from the real views (unrendered), then each renderer encodes it and each
+parser decodes the result ``iterations`` times. The full request time of
+the same endpoint is measured too, so the encoding share of a response is
+visible next to the saving.
+"""
+
+import io
+import time
+
+from django.test import Client
+from django.urls import resolve
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from config.renderers import ORJSONParser, ORJSONRenderer, orjson
+
+from .runner import percentile
+
+ENDPOINTS = {
+    "past-question-list": "/past-questions/?page=1",
+    "past-question-search": "/past-questions/search/?semester=first",
+}
+CODECS = {
+    "stdlib": (JSONRenderer, JSONParser),
+    "orjson": (ORJSONRenderer, ORJSONParser),
+}
+
+
+def _response_data(path):
+    request = APIRequestFactory().get(path)
+    match = resolve(path.split("?", 1)[0])
+    response = match.func(request, *match.args, **match.kwargs)
+    if response.status_code != 200:
+        raise ValueError(f"{path} returned {response.status_code}")
+    return response.data
+
+
+def _timed(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "mean_ms": round(sum(timings) / len(timings), 4),
+        "p50_ms": round(percentile(timings, 50), 4),
+        "p99_ms": round(percentile(timings, 99), 4),
+    }
+
+
+def measure(iterations=500, endpoints=None):
+    if orjson is None:
+        raise ValueError("orjson is not installed; `pip install orjson` first")
+    client = Client()
+    results = {}
+    for name, path in (endpoints or ENDPOINTS).items():
+        data = _response_data(path)
+        bodies = {}
+        endpoint = {"request": _timed(lambda: client.get(path), iterations // 10 or 1)}
+        for codec, (renderer_class, parser_class) in CODECS.items():
+            renderer, parser = renderer_class(), parser_class()
+            body = bodies[codec] = renderer.render(data)
+            endpoint[codec] = {
+                "bytes": len(body),
+                "render": _timed(lambda: renderer.render(data), iterations),
+                "parse": _timed(
+                    lambda: parser.parse(io.BytesIO(body)), iterations
+                ),
+            }
+        endpoint["identical"] = bodies["stdlib"] == bodies["orjson"]
+        results[name] = endpoint
+    return results
@@ -0,0 +1,280 @@
+"""
+Replays benchmark scenarios through the real URLconf and middleware with
+Django's test client and reports latency percentiles, throughput and
+queries per request for each endpoint, keyed by method and URL name
+(``"GET past_questions:past-question-list"``). Queries are counted on
+every database alias, so reads routed to a replica are included, and
+throughput is requests per second of the run's wall-clock time.
+"""
+
+import json
+import math
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.courses.models import Course
+from apps.past_questions.models import PastQuestion
+from apps.users.models import User
+
+from .dataset import COURSE_PREFIX, SAMPLE_FILE, SAMPLE_PDF, USER_PREFIX
+from .scenarios import MIXES, SCENARIOS
+
+
+class BenchmarkContext:
+    """Ids, users and tokens sampled once and shared by every scenario"""
+
+    def __init__(self, seed=42, sample_size=10_000):
+        self.random = random.Random(seed)
+        self.run_id = uuid.uuid4().hex[:8]
+        self.uploads = 0
+
+        courses = Course.objects.filter(
+            code__startswith=COURSE_PREFIX, is_active=True
+        ).values_list("id", "code")[:sample_size]
+        self.course_ids = [pk for pk, _ in courses]
+        self.course_codes = [code for _, code in courses]
+
+        questions = PastQuestion.objects.order_by()
+        self.approved_ids = list(
+            questions.filter(status="approved").values_list("id", flat=True)[
+                :sample_size
+            ]
+        )
+        self.pending_ids = list(
+            questions.filter(status="pending").values_list("id", flat=True)[
+                :sample_size
+            ]
+        )
+
+        page_size = settings.REST_FRAMEWORK.get("PAGE_SIZE") or 1
+        self.course_pages = max(
+            1, math.ceil(Course.objects.filter(is_active=True).count() / page_size)
+        )
+        self.question_pages = max(
+            1, math.ceil(questions.filter(status="approved").count() / page_size)
+        )
+
+        users = User.objects.filter(index_number__startswith=USER_PREFIX)
+        self.moderators = list(users.filter(is_moderator=True)[:10])
+        self.students = list(users.filter(is_moderator=False)[:1_000])
+        self._tokens = {}
+
+        if not (self.course_ids and self.approved_ids and self.students):
+            raise ValueError(
+                "No benchmark data found; run `manage.py bench_seed` first"
+            )
+
+    def student(self):
+        return self.random.choice(self.students)
+
+    def moderator(self):
+        return self.random.choice(self.moderators or self.students)
+
+    def auth_header(self, user):
+        if user.pk not in self._tokens:
+            self._tokens[user.pk] = f"Bearer {AccessToken.for_user(user)}"
+        return self._tokens[user.pk]
+
+    def remote_addr(self):
+        # Spread anonymous traffic over many clients like real exam-week load
+        return f"10.{self.random.randint(0, 255)}.{self.random.randint(0, 255)}.1"
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, math.ceil(pct / 100 * len(values)) - 1))
+    return values[rank]
+
+
+def summarize(samples, wall_time):
+    """Stats for ``samples``; ``wall_time`` is the whole run's duration, so
+    an endpoint's throughput is its share of the run's requests per second"""
+    latencies = sorted(sample["ms"] for sample in samples)
+    queries = [sample["queries"] for sample in samples]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if not sample["ok"]),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "max_ms": round(latencies[-1], 3),
+        "throughput_rps": round(len(samples) / wall_time, 2) if wall_time else 0.0,
+        "queries_per_request": round(sum(queries) / len(queries), 2),
+        "max_queries": max(queries),
+        "mean_bytes": round(sum(s["bytes"] for s in samples) / len(samples)),
+    }
+
+
+def _response_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def _allowed_host():
+    """A Host header ``ALLOWED_HOSTS`` accepts; the test client's default
+    ``testserver`` is rejected under the DEBUG host list"""
+    for host in settings.ALLOWED_HOSTS:
+        if host == "*":
+            break
+        if host:
+            # ".example.com" also matches example.com itself
+            return host.lstrip(".")
+    return "localhost"
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkRunner:
+    def __init__(self, mix="exam-week", requests=1_000, warmup=50, seed=42, log=print):
+        if mix not in MIXES:
+            raise ValueError(f"Unknown mix {mix!r}; choose from {', '.join(MIXES)}")
+        self.mix = mix
+        self.requests = requests
+        self.warmup = warmup
+        self.seed = seed
+        self.log = log
+
+    def _pick(self, ctx):
+        weights = MIXES[self.mix]
+        name = ctx.random.choices(list(weights), weights=list(weights.values()))[0]
+        return SCENARIOS[name](ctx)
+
+    def _send(self, client, ctx, request):
+        headers = {"REMOTE_ADDR": ctx.remote_addr(), **request.extra}
+        if request.user is not None:
+            headers["HTTP_AUTHORIZATION"] = ctx.auth_header(request.user)
+        method = getattr(client, request.method)
+        if request.data is not None:
+            return method(request.path, data=request.data, **headers)
+        return method(request.path, **headers)
+
+    def run(self):
+        media_root = tempfile.mkdtemp(prefix="pastq-bench-")
+        try:
+            # Post-upload processing (text extraction, fingerprints) runs
+            # inline, so its cost lands in the upload's latency instead of
+            # competing with the replay from the thread pool
+            with override_settings(MEDIA_ROOT=media_root, BACKGROUND_TASKS_EAGER=True):
+                default_storage.save(SAMPLE_FILE, ContentFile(SAMPLE_PDF))
+                return self._run()
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def _run(self):
+        ctx = BenchmarkContext(seed=self.seed)
+        client = Client(HTTP_HOST=_allowed_host())
+
+        for _ in range(self.warmup):
+            self._send(client, ctx, self._pick(ctx))
+
+        samples = defaultdict(list)
+        started = time.perf_counter()
+        for _ in range(self.requests):
+            request = self._pick(ctx)
+            view_name = resolve(request.path.split("?")[0]).view_name
+            endpoint = f"{request.method.upper()} {view_name}"
+
+            with ExitStack() as stack:
+                captured = [
+                    stack.enter_context(CaptureQueriesContext(connections[alias]))
+                    for alias in connections
+                ]
+                t0 = time.perf_counter()
+                response = self._send(client, ctx, request)
+                size = _response_size(response)
+                elapsed = time.perf_counter() - t0
+
+            samples[endpoint].append(
+                {
+                    "ms": elapsed * 1000,
+                    "queries": sum(len(queries) for queries in captured),
+                    "bytes": size,
+                    # Redirects and error pages are failures even when a
+                    # scenario lists them
+                    "ok": 200 <= response.status_code < 300
+                    and response.status_code in request.expected,
+                }
+            )
+        total_time = time.perf_counter() - started
+
+        all_samples = [sample for group in samples.values() for sample in group]
+        return {
+            "meta": {
+                "timestamp": timezone.now().isoformat(),
+                "git_revision": _git_revision(),
+                "mix": self.mix,
+                "requests": self.requests,
+                "warmup": self.warmup,
+                "seed": self.seed,
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "dataset": {
+                    "courses": Course.objects.count(),
+                    "past_questions": PastQuestion.objects.count(),
+                    "users": User.objects.count(),
+                },
+            },
+            "overall": summarize(all_samples, total_time),
+            "endpoints": {
+                endpoint: summarize(group, total_time)
+                for endpoint, group in sorted(samples.items())
+            },
+        }
+
+
+def write_results(results, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True))
+    return path
+
+
+def compare(baseline, current):
+    """Per-endpoint deltas between two result documents"""
+    rows = []
+    metrics = ["p50_ms", "p95_ms", "p99_ms", "queries_per_request"]
+    for endpoint, stats in sorted(current["endpoints"].items()):
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if before is None:
+            continue
+        row = {"endpoint": endpoint}
+        for metric in metrics:
+            old, new = before[metric], stats[metric]
+            row[metric] = (old, new, round((new - old) / old * 100, 1) if old else None)
+        rows.append(row)
+    return rows
@@ -0,0 +1,115 @@
+"""
+Scripted request mixes replayed by the benchmark runner.
+
+Each scenario is a function taking the shared ``BenchmarkContext`` and
+returning one ``BenchRequest``. Mixes weight scenarios to approximate
+real traffic; ``exam-week`` is dominated by browsing, search and
+downloads with a trickle of uploads and moderation.
+"""
+
+from dataclasses import dataclass, field
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+
+from .dataset import WORDS, sample_pdf
+
+
+@dataclass
+class BenchRequest:
+    method: str
+    path: str
+    data: dict = None
+    user: object = None
+    expected: tuple = (200,)
+    extra: dict = field(default_factory=dict)
+
+
+def browse(ctx):
+    choice = ctx.random.random()
+    if choice < 0.5:
+        page = ctx.random.randint(1, min(20, ctx.question_pages))
+        return BenchRequest("get", f"/past-questions/?page={page}")
+    if choice < 0.8:
+        page = ctx.random.randint(1, min(10, ctx.course_pages))
+        return BenchRequest("get", f"/courses/?page={page}")
+    if choice < 0.9:
+        return BenchRequest("get", "/past-questions/popular/")
+    return BenchRequest("get", "/courses/catalog/", extra={"HTTP_ACCEPT_ENCODING": "gzip"})
+
+
+def search(ctx):
+    if ctx.random.random() < 0.5:
+        code = ctx.random.choice(ctx.course_codes)
+        prefix = code[: ctx.random.randint(4, len(code))]
+        return BenchRequest("get", f"/past-questions/search/?course={prefix}")
+    return BenchRequest(
+        "get",
+        f"/past-questions/search/?q={ctx.random.choice(WORDS)}"
+        f"&year={ctx.random.randint(2015, timezone.now().year)}",
+    )
+
+
+def detail(ctx):
+    if ctx.random.random() < 0.8:
+        pk = ctx.random.choice(ctx.approved_ids)
+        return BenchRequest("get", f"/past-questions/{pk}/", user=ctx.student())
+    code = ctx.random.choice(ctx.course_codes)
+    return BenchRequest("get", f"/courses/{code}/")
+
+
+def download(ctx):
+    pk = ctx.random.choice(ctx.approved_ids)
+    return BenchRequest("get", f"/past-questions/{pk}/download/", user=ctx.student())
+
+
+def upload(ctx):
+    ctx.uploads += 1
+    name = f"bench-upload-{ctx.run_id}-{ctx.uploads}.pdf"
+    return BenchRequest(
+        "post",
+        "/past-questions/",
+        data={
+            "course_id": ctx.random.choice(ctx.course_ids),
+            "year": ctx.random.randint(2015, timezone.now().year),
+            "semester": "first",
+            "exam_type": "final",
+            "file": SimpleUploadedFile(
+                name, sample_pdf("Benchmark upload", name), "application/pdf"
+            ),
+        },
+        user=ctx.moderator(),
+        expected=(201,),
+    )
+
+
+def moderation(ctx):
+    if ctx.pending_ids and ctx.random.random() < 0.4:
+        pk = ctx.pending_ids.pop()
+        return BenchRequest(
+            "post", f"/past-questions/{pk}/approve/", user=ctx.moderator()
+        )
+    return BenchRequest("get", "/past-questions/pending/", user=ctx.moderator())
+
+
+SCENARIOS = {
+    "browse": browse,
+    "search": search,
+    "detail": detail,
+    "download": download,
+    "upload": upload,
+    "moderation": moderation,
+}
+
+MIXES = {
+    "exam-week": {
+        "browse": 30,
+        "search": 25,
+        "detail": 20,
+        "download": 18,
+        "upload": 2,
+        "moderation": 5,
+    },
+    "read-only": {"browse": 40, "search": 35, "detail": 25},
+    **{name: {name: 1} for name in SCENARIOS},
+}
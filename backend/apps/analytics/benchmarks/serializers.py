@@ -0,0 +1,102 @@
+"""
+``PastQuestionSerializer`` against the values-based
+``PastQuestionValuesSerializer``.
+
+Two measurements per path:
+
+``rows``
+    Fetching and serializing ``rows`` approved past questions, queries
+    included, with the queryset trimmed the way the list views trim it.
+``request``
+    Full GET requests to the list, search and popular endpoints through
+    the test client, with the values path switched on and off.
+
+Both paths must produce the same JSON; a mismatch is reported.
+"""
+
+import time
+from unittest import mock
+
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from apps.past_questions import views
+from apps.past_questions.models import PastQuestion
+from apps.past_questions.serializers import (
+    PastQuestionSerializer,
+    PastQuestionValuesSerializer,
+)
+
+from .runner import percentile
+
+ENDPOINTS = {
+    "past-question-list": (views.PastQuestionListView, "/past-questions/?page=1"),
+    "past-question-search": (
+        views.PastQuestionSearchView,
+        "/past-questions/search/?semester=first",
+    ),
+    "popular-past-questions": (
+        views.PopularPastQuestionsView,
+        "/past-questions/popular/",
+    ),
+}
+
+
+def _timed(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    stats = {
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+    }
+    return stats, result
+
+
+def measure_rows(rows=500, iterations=20):
+    request = APIRequestFactory().get("/past-questions/")
+    context = {"request": request}
+    queryset = PastQuestion.objects.filter(status="approved").order_by("-year", "pk")
+    related, only = PastQuestionSerializer(expand=()).queryset_paths()
+
+    def model_path():
+        page = queryset.select_related(*related).only(*only)[:rows]
+        return PastQuestionSerializer(
+            page, many=True, expand=(), context=context
+        ).data
+
+    def values_path():
+        serializer = PastQuestionValuesSerializer(context=context)
+        return serializer.to_representation(serializer.values(queryset)[:rows])
+
+    model_stats, model_data = _timed(model_path, iterations)
+    values_stats, values_data = _timed(values_path, iterations)
+    renderer = JSONRenderer()
+    return {
+        "rows": len(values_data),
+        "model": model_stats,
+        "values": values_stats,
+        "identical": renderer.render(model_data) == renderer.render(values_data),
+    }
+
+
+def measure_requests(iterations=200):
+    client = Client()
+    results = {}
+    for name, (view_class, path) in ENDPOINTS.items():
+        values_stats, values_response = _timed(lambda: client.get(path), iterations)
+        with mock.patch.object(view_class, "values_serializer_class", None):
+            model_stats, model_response = _timed(lambda: client.get(path), iterations)
+        if values_response.status_code != 200:
+            raise ValueError(f"{path} returned {values_response.status_code}")
+        results[name] = {
+            "model": model_stats,
+            "values": values_stats,
+            "identical": values_response.content == model_response.content,
+        }
+    return results
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.analytics.benchmarks.connections import measure, savings
+
+
+class Command(BaseCommand):
+    help = "Compare per-request connection cost: reconnect, pool and persistent"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=200,
+            help="Requests per second to project savings for",
+        )
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        if alias not in connections:
+            raise CommandError(f"Unknown database {alias!r}")
+
+        config = connections[alias].settings_dict
+        self.stdout.write(
+            f"{alias}: {connections[alias].vendor}, mode={settings.DB_POOL_MODE}, "
+            f"CONN_MAX_AGE={config['CONN_MAX_AGE']}, "
+            f"pool={config['OPTIONS'].get('pool', False)}"
+        )
+
+        results = measure(alias, options["iterations"])
+        for name, stats in results.items():
+            self.stdout.write(
+                f"  {name:<11} mean {stats['mean_ms']:>8.3f}ms  "
+                f"p50 {stats['p50_ms']:>8.3f}ms  p99 {stats['p99_ms']:>8.3f}ms"
+            )
+
+        rate = options["rate"]
+        self.stdout.write(f"Connection time saved at {rate:g} req/s:")
+        for name, saved in savings(results, rate).items():
+            self.stdout.write(
+                f"  {name:<11} {saved:>8.1f}ms per second "
+                f"({saved / 1000:.2f} worker-seconds/s)"
+            )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.benchmarks.renderers import measure
+
+
+class Command(BaseCommand):
+    help = "Compare JSON encode/decode cost: stdlib JSONRenderer and orjson"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            results = measure(options["iterations"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        for endpoint, stats in results.items():
+            request = stats["request"]["mean_ms"]
+            self.stdout.write(
+                f"{endpoint}: request mean {request:.3f}ms, "
+                f"{stats['stdlib']['bytes']} bytes, "
+                f"identical output: {'yes' if stats['identical'] else 'NO'}"
+            )
+            for step in ("render", "parse"):
+                stdlib, fast = stats["stdlib"][step], stats["orjson"][step]
+                speedup = stdlib["mean_ms"] / fast["mean_ms"] if fast["mean_ms"] else 0
+                self.stdout.write(
+                    f"  {step:<7} stdlib {stdlib['mean_ms']:>8.4f}ms  "
+                    f"orjson {fast['mean_ms']:>8.4f}ms  "
+                    f"p99 {stdlib['p99_ms']:>8.4f}/{fast['p99_ms']:>8.4f}ms  "
+                    f"x{speedup:.1f}"
+                )
+            share = stats["stdlib"]["render"]["mean_ms"] / request if request else 0
+            self.stdout.write(f"  stdlib rendering is {share:.1%} of the request")
@@ -0,0 +1,76 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.benchmarks.runner import BenchmarkRunner, compare, write_results
+from apps.analytics.benchmarks.scenarios import MIXES
+
+
+class Command(BaseCommand):
+    help = "Replay benchmark scenarios and report latency per endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mix", choices=sorted(MIXES), default="exam-week")
+        parser.add_argument("--requests", type=int, default=1_000)
+        parser.add_argument("--warmup", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Write results as JSON to this path")
+        parser.add_argument(
+            "--compare", help="Baseline results JSON to diff against"
+        )
+
+    def handle(self, *args, **options):
+        runner = BenchmarkRunner(
+            mix=options["mix"],
+            requests=options["requests"],
+            warmup=options["warmup"],
+            seed=options["seed"],
+            log=self.stdout.write,
+        )
+        try:
+            results = runner.run()
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.print_results(results)
+
+        if options["output"]:
+            path = write_results(results, options["output"])
+            self.stdout.write(f"Results written to {path}")
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+            self.print_comparison(compare(baseline, results))
+
+        errors = results["overall"]["errors"]
+        if errors:
+            raise CommandError(
+                f"{errors} of {results['overall']['requests']} requests failed"
+            )
+
+    def print_results(self, results):
+        header = (
+            f"{'endpoint':50} {'reqs':>6} {'err':>4} {'p50':>8} {'p95':>8} "
+            f"{'p99':>8} {'rps':>8} {'q/req':>6}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        rows = list(results["endpoints"].items()) + [("overall", results["overall"])]
+        for endpoint, stats in rows:
+            self.stdout.write(
+                f"{endpoint:50} {stats['requests']:>6} {stats['errors']:>4} "
+                f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+                f"{stats['p99_ms']:>8.2f} {stats['throughput_rps']:>8.1f} "
+                f"{stats['queries_per_request']:>6.1f}"
+            )
+
+    def print_comparison(self, rows):
+        self.stdout.write("\nChange vs baseline (old -> new, %):")
+        for row in rows:
+            parts = []
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "queries_per_request"):
+                old, new, pct = row[metric]
+                change = f"{pct:+.1f}%" if pct is not None else "n/a"
+                parts.append(f"{metric} {old} -> {new} ({change})")
+            self.stdout.write(f"{row['endpoint']}: " + ", ".join(parts))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.benchmarks.dataset import PRESETS, DatasetSeeder, flush
+from apps.courses.autocomplete import course_index
+from apps.courses.catalog import invalidate_catalog
+
+
+class Command(BaseCommand):
+    help = "Seed a synthetic dataset for the benchmark suite"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--preset",
+            choices=sorted(PRESETS),
+            default="smoke",
+            help="Dataset size preset (exam-week is 1M past questions)",
+        )
+        parser.add_argument("--courses", type=int)
+        parser.add_argument("--users", type=int)
+        parser.add_argument("--past-questions", type=int)
+        parser.add_argument("--downloads", type=int)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="Delete previously seeded benchmark rows first",
+        )
+
+    def handle(self, *args, **options):
+        sizes = dict(PRESETS[options["preset"]])
+        for key in sizes:
+            if options.get(key) is not None:
+                sizes[key] = options[key]
+
+        if options["flush"]:
+            self.stdout.write("Removing previous benchmark data...")
+            flush()
+
+        seeder = DatasetSeeder(
+            sizes,
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+            log=self.stdout.write,
+        )
+        seeder.seed()
+
+        # bulk_create skips Course.save, so drop derived course data by hand
+        invalidate_catalog()
+        course_index.invalidate()
+        self.stdout.write(self.style.SUCCESS("Benchmark dataset ready"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.benchmarks.serializers import measure_requests, measure_rows
+
+
+class Command(BaseCommand):
+    help = "Compare ModelSerializer and values-based serialization of past questions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500)
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        try:
+            rows = measure_rows(options["rows"], max(1, iterations // 10))
+            requests = measure_requests(iterations)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(f"{rows['rows']} rows, fetched and serialized:")
+        self.print_row("rows", rows)
+        self.stdout.write("Full requests:")
+        for endpoint, stats in requests.items():
+            self.print_row(endpoint, stats)
+
+    def print_row(self, name, stats):
+        model, values = stats["model"], stats["values"]
+        speedup = model["mean_ms"] / values["mean_ms"] if values["mean_ms"] else 0
+        self.stdout.write(
+            f"  {name:<24} model {model['mean_ms']:>8.3f}ms  "
+            f"values {values['mean_ms']:>8.3f}ms  "
+            f"p99 {model['p99_ms']:>8.3f}/{values['p99_ms']:>8.3f}ms  "
+            f"x{speedup:.1f}  identical: {'yes' if stats['identical'] else 'NO'}"
+        )
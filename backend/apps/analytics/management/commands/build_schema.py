@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema once into API_SCHEMA_DIR "
+        "(run as a build/deploy step when API_SCHEMA_PREBUILT is set)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Fail if the built schema differs from the current API",
+        )
+
+    def handle(self, *args, **options):
+        # Imported here so serving workers never load spectacular
+        from drf_spectacular.renderers import OpenApiJsonRenderer
+        from drf_spectacular.settings import spectacular_settings
+
+        generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+        schema = generator.get_schema(request=None, public=True)
+        body = OpenApiJsonRenderer().render(schema, renderer_context={})
+
+        directory = Path(settings.API_SCHEMA_DIR)
+        current = directory / "openapi.json"
+        if options["check"]:
+            if not current.exists() or current.read_bytes() != body:
+                raise CommandError(f"{current} is out of date; run build_schema")
+            self.stdout.write(self.style.SUCCESS(f"{current} is up to date"))
+            return
+
+        version = schema["info"]["version"]
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"openapi-{version}.json").write_bytes(body)
+        tmp = current.with_suffix(".tmp")
+        tmp.write_bytes(body)
+        tmp.replace(current)
+
+        paths = len(schema.get("paths", {}))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote schema {version} ({paths} paths, {len(body)} bytes) to {directory}"
+            )
+        )
@@ -0,0 +1,60 @@
+import json
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.slow_queries import load_all, slow_query_log, summarize
+
+
+class Command(BaseCommand):
+    help = "Print slow statements captured by every worker, slowest first"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--view", help="Only statements run by this URL name")
+        parser.add_argument("--json", action="store_true", help="Output JSON")
+        parser.add_argument(
+            "--clear", action="store_true", help="Delete the captured buffers"
+        )
+
+    def handle(self, *args, **options):
+        directory = slow_query_log.directory
+        if directory is None:
+            raise CommandError("SLOW_QUERY_DIR is not set")
+
+        if options["clear"]:
+            shutil.rmtree(directory, ignore_errors=True)
+            self.stdout.write(f"Cleared {directory}")
+            return
+
+        entries, plans = load_all(directory) if directory.exists() else ([], {})
+        if options["view"]:
+            entries = [e for e in entries if e.get("view") == options["view"]]
+        summary = summarize(entries, plans)[: options["limit"]]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(summary, indent=2, default=str))
+            return
+
+        if not summary:
+            self.stdout.write("No slow queries captured")
+            return
+
+        for group in summary:
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"{group['fingerprint']}  max {group['max_ms']}ms  "
+                    f"avg {group['avg_ms']}ms  x{group['count']}"
+                )
+            )
+            self.stdout.write(f"  views: {', '.join(group['views']) or '-'}")
+            self.stdout.write(f"  sql:   {group['sql'][:1000]}")
+            plan = group["plan"]
+            if plan and plan.get("plan"):
+                label = "explain analyze" if plan["analyze"] else "explain"
+                self.stdout.write(f"  {label}:")
+                for line in plan["plan"].splitlines():
+                    self.stdout.write(f"    {line}")
+            elif plan:
+                self.stdout.write(f"  explain failed: {plan.get('error')}")
+            self.stdout.write("")
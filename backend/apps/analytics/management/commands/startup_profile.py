@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is already imported
+BOOT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls = time.perf_counter()
+warmup = {}
+if %(warm)r:
+    from config.warmup import warm_up
+    warmup = warm_up()
+print(json.dumps({
+    "django.setup": (setup - started) * 1000,
+    "urlconf import": (urls - setup) * 1000,
+    "warmup": warmup,
+}))
+"""
+
+
+def parse_importtime(output):
+    """``(module, self_us, cumulative_us)`` rows from ``-X importtime``"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = [part.strip() for part in line[len("import time:") :].split("|")]
+        if len(parts) != 3 or not parts[0].isdigit():
+            continue
+        rows.append((parts[2], int(parts[0]), int(parts[1])))
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Report import time per module and boot time per phase in a fresh process"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=25)
+        parser.add_argument(
+            "--group",
+            choices=["package", "module"],
+            default="package",
+            help="Aggregate import time by top-level package or list modules",
+        )
+        parser.add_argument(
+            "--no-warmup", action="store_true", help="Skip the warm-up phase"
+        )
+
+    def handle(self, *args, **options):
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": os.environ.get(
+                "DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE
+            ),
+        }
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                BOOT_SCRIPT % {"warm": not options["no_warmup"]},
+            ],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+            env=env,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        phases = json.loads(result.stdout.strip().splitlines()[-1])
+        rows = parse_importtime(result.stderr)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Boot phases"))
+        warmup = phases.pop("warmup")
+        for name, ms in phases.items():
+            self.stdout.write(f"  {name:<24} {ms:>9.1f}ms")
+        for name, ms in warmup.items():
+            self.stdout.write(f"  warmup: {name:<16} {ms:>9.1f}ms")
+        total_imports = sum(self_us for _, self_us, _ in rows) / 1000
+        self.stdout.write(f"  {'imports (all)':<24} {total_imports:>9.1f}ms")
+
+        if options["group"] == "package":
+            totals = defaultdict(int)
+            for module, self_us, _ in rows:
+                totals[module.split(".")[0]] += self_us
+            ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+            self.stdout.write(self.style.MIGRATE_HEADING("Import time by package"))
+            for package, self_us in ranked[: options["limit"]]:
+                self.stdout.write(f"  {package:<40} {self_us / 1000:>9.1f}ms")
+        else:
+            ranked = sorted(rows, key=lambda row: row[1], reverse=True)
+            self.stdout.write(self.style.MIGRATE_HEADING("Slowest module imports"))
+            self.stdout.write(f"  {'module':<50} {'self':>10} {'cumulative':>11}")
+            for module, self_us, cumulative_us in ranked[: options["limit"]]:
+                self.stdout.write(
+                    f"  {module:<50} {self_us / 1000:>8.1f}ms "
+                    f"{cumulative_us / 1000:>9.1f}ms"
+                )
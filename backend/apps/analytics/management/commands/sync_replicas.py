@@ -0,0 +1,40 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from config.routers import replica_monitor
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into SQLite replica files "
+        "(local stand-in for streaming replication)"
+    )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError("Replicas of a non-SQLite primary are managed by the server")
+
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        if not replicas:
+            raise CommandError("No replicas configured; set DATABASE_REPLICA_URLS")
+
+        # Copy through Django's own connection so in-memory and URI names
+        # (as used by the test database) work too
+        primary.ensure_connection()
+        for alias in replicas:
+            replica = connections[alias]
+            if replica.vendor != "sqlite":
+                self.stderr.write(f"Skipping {alias}: not SQLite")
+                continue
+            replica.close()
+            target = sqlite3.connect(replica.settings_dict["NAME"])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f"Synced {alias}"))
+        replica_monitor.reset()
@@ -0,0 +1,335 @@
+"""
+Prometheus text-format metrics.
+
+Each process keeps its own counters and fixed-bucket histograms in memory
+and, when ``METRICS_MULTIPROC_DIR`` is set, periodically writes them to its
+own JSON file in that directory. A scrape merges every file so the totals
+cover all gunicorn workers. When a worker exits, gunicorn's ``child_exit``
+hook folds its file into ``metrics-retired.json`` (``retire_process``), so
+recycled workers keep counting without the directory growing.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows; multiprocess mode is for gunicorn only
+    fcntl = None
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+DEFAULT_SIZE_BUCKETS = (
+    256,
+    1024,
+    4096,
+    16384,
+    65536,
+    262144,
+    1048576,
+    4194304,
+    16777216,
+)
+
+
+RETIRED_FILE = "metrics-retired.json"
+
+
+@contextmanager
+def _locked(directory, exclusive=False):
+    """Keep scrapes from reading a dead worker's values twice while they
+    are being folded into the retired file"""
+    if fcntl is None:
+        yield
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _write_json(path, payload):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload))
+    os.replace(tmp, path)
+
+
+def _merge_value(current, other):
+    """Counter values add; histogram states add slot by slot"""
+    if current is None:
+        return other
+    if isinstance(current, list):
+        return [a + b for a, b in zip(current, other)]
+    return current + other
+
+
+def _merge_dumps(dumps):
+    merged = {}
+    for dump in dumps:
+        for name, series in dump.items():
+            values = merged.setdefault(name, {})
+            for key, value in series:
+                key = tuple(key)
+                values[key] = _merge_value(values.get(key), value)
+    return merged
+
+
+def retire_process(directory, pid):
+    """Fold the files of exited process ``pid`` into the retired file"""
+    directory = Path(directory)
+    paths = list(directory.glob(f"metrics-{pid}-*.json"))
+    if not paths:
+        return
+    with _locked(directory, exclusive=True):
+        dumps = []
+        for path in [directory / RETIRED_FILE, *paths]:
+            try:
+                dumps.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        merged = _merge_dumps(dumps)
+        _write_json(
+            directory / RETIRED_FILE,
+            {
+                name: [[list(key), value] for key, value in series.items()]
+                for name, series in merged.items()
+            },
+        )
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=None):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets or DEFAULT_LATENCY_BUCKETS))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last slot is +Inf), then sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self._token = uuid.uuid4().hex[:8]
+        self._flushed_at = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=None):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, func):
+        """Register a function called at scrape time that yields gauge samples
+        as ``(name, documentation, labels, value)``"""
+        self.collectors.append(func)
+        return func
+
+    # Multiprocess support
+
+    @property
+    def directory(self):
+        path = getattr(settings, "METRICS_MULTIPROC_DIR", None)
+        return Path(path) if path else None
+
+    def _path(self):
+        return self.directory / f"metrics-{os.getpid()}-{self._token}.json"
+
+    def flush(self, force=False):
+        """Write this process's values to the shared directory"""
+        directory = self.directory
+        if directory is None:
+            return
+        now = time.monotonic()
+        interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0)
+        if not force and now - self._flushed_at < interval:
+            return
+        self._flushed_at = now
+
+        directory.mkdir(parents=True, exist_ok=True)
+        payload = {name: metric.dump() for name, metric in self.metrics.items()}
+        _write_json(self._path(), payload)
+
+    def _merged(self):
+        """Values summed over every process (or just this one)"""
+        if self.directory is None:
+            dumps = [{name: m.dump() for name, m in self.metrics.items()}]
+        else:
+            self.flush(force=True)
+            dumps = []
+            with _locked(self.directory):
+                for path in self.directory.glob("metrics-*.json"):
+                    try:
+                        dumps.append(json.loads(path.read_text()))
+                    except (OSError, ValueError):
+                        continue
+
+        merged = _merge_dumps(dumps)
+        merged = {name: merged.get(name, {}) for name in self.metrics}
+
+        # Unlabelled counters are exported as 0 before their first increment
+        for name, metric in self.metrics.items():
+            if metric.type == "counter" and not metric.labelnames:
+                merged[name].setdefault((), 0)
+        return merged
+
+    # Exposition
+
+    def render(self):
+        lines = []
+        for name, series in self._merged().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for key, value in sorted(series.items()):
+                labels = dict(zip(metric.labelnames, key))
+                if metric.type == "counter":
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + ("+Inf",), value[:-1]):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _number(bound)
+                    lines.append(
+                        f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{_labels(labels)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+        documented = set()
+        for collector in self.collectors:
+            for name, documentation, labels, value in collector():
+                if name not in documented:
+                    lines.append(f"# HELP {name} {documentation}")
+                    lines.append(f"# TYPE {name} gauge")
+                    documented.add(name)
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return str(value)
+
+
+registry = MetricsRegistry()
+
+# HTTP
+REQUEST_LATENCY = registry.histogram(
+    "pastq_http_request_duration_seconds",
+    "Request latency by view",
+    ["view", "method"],
+)
+RESPONSE_SIZE = registry.histogram(
+    "pastq_http_response_size_bytes",
+    "Response body size by view",
+    ["view"],
+    buckets=DEFAULT_SIZE_BUCKETS,
+)
+RESPONSES = registry.counter(
+    "pastq_http_responses_total",
+    "Responses by view, method and status code",
+    ["view", "method", "status"],
+)
+
+# Domain
+DOWNLOADS = registry.counter(
+    "pastq_downloads_total", "Past question files downloaded"
+)
+DOWNLOAD_BYTES = registry.counter(
+    "pastq_download_bytes_total", "Bytes served by the download view"
+)
+UPLOADS = registry.counter("pastq_uploads_total", "Past questions uploaded")
+REVIEWS = registry.counter(
+    "pastq_reviews_total", "Moderation decisions on past questions", ["decision"]
+)
+
+
+@registry.collector
+def pending_queue_depth():
+    from apps.past_questions.models import PastQuestion
+
+    yield (
+        "pastq_pending_past_questions",
+        "Past questions waiting for review",
+        {},
+        PastQuestion.objects.filter(status="pending").count(),
+    )
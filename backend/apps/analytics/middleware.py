@@ -0,0 +1,166 @@
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .profiling import Profile, read_token, save_profile
+from .metrics import REQUEST_LATENCY, RESPONSE_SIZE, RESPONSES, registry
+from .queries import query_stats, record_queries
+from .slow_queries import capture_slow_queries
+
+logger = logging.getLogger(__name__)
+
+
+def endpoint_name(request):
+    """URL name of the resolved view, e.g. ``past_questions:past-question-list``"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    return match.view_name or match._func_path
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record query count, DB time and repeated statement shapes for a sampled
+    fraction of requests, aggregated per URL name.
+
+    Disabled entirely when ``QUERY_INSTRUMENTATION_SAMPLE_RATE`` is 0.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "QUERY_INSTRUMENTATION_SAMPLE_RATE", 0.0)
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.budgets = getattr(settings, "QUERY_BUDGETS", {})
+        self.duplicate_threshold = getattr(settings, "QUERY_DUPLICATE_THRESHOLD", 5)
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        endpoint = endpoint_name(request)
+        query_stats.add(endpoint, recorder, self.duplicate_threshold)
+
+        budget = self.budgets.get(endpoint)
+        if budget is not None and recorder.count > budget:
+            logger.warning(
+                "%s ran %d queries (budget %d)", endpoint, recorder.count, budget
+            )
+        for duplicate in recorder.duplicates(self.duplicate_threshold):
+            logger.warning(
+                "%s repeated a query %d times: %s",
+                endpoint,
+                duplicate["count"],
+                duplicate["sql"],
+            )
+
+        if settings.DEBUG:
+            response["X-Query-Count"] = str(recorder.count)
+            response["X-DB-Time-Ms"] = f"{recorder.duration * 1000:.2f}"
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Capture statements slower than ``SLOW_QUERY_THRESHOLD_MS`` with the view
+    that ran them. Disabled when the threshold is 0.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if getattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0) <= 0:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        with capture_slow_queries(request):
+            return self.get_response(request)
+
+
+class MetricsMiddleware:
+    """
+    Record latency, response size and status for every request, labelled
+    by URL name. Disabled when ``METRICS_ENABLED`` is false.
+    """
+
+    METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view = endpoint_name(request)
+        method = request.method if request.method in self.METHODS else "OTHER"
+        REQUEST_LATENCY.observe(elapsed, view=view, method=method)
+        RESPONSES.inc(view=view, method=method, status=response.status_code)
+
+        if response.has_header("Content-Length"):
+            RESPONSE_SIZE.observe(int(response["Content-Length"]), view=view)
+        elif not response.streaming:
+            RESPONSE_SIZE.observe(len(response.content), view=view)
+
+        registry.flush()
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile the view (including response rendering) for a sampled fraction
+    of requests, or for admins sending a signed ``X-Profile`` header from
+    ``analytics/profiles/token/``.
+
+    Removed from the middleware chain unless ``PROFILING_ENABLED`` is set.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+        self.mode = getattr(settings, "PROFILING_MODE", "sampling")
+        self.interval = getattr(settings, "PROFILING_INTERVAL", 0.005)
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        requested_by = None
+        header = request.META.get("HTTP_X_PROFILE")
+        if header:
+            requested_by = read_token(header)
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if requested_by is None and not sampled:
+            return None
+
+        started = time.perf_counter()
+        with Profile(self.mode, self.interval) as profile:
+            response = view_func(request, *view_args, **view_kwargs)
+            if hasattr(response, "render") and callable(response.render):
+                response = response.render()
+        elapsed = time.perf_counter() - started
+
+        # DRF authenticates inside the view, so check the header's owner now
+        user = getattr(request, "user", None)
+        is_requesting_admin = (
+            requested_by is not None
+            and user is not None
+            and user.is_authenticated
+            and user.pk == requested_by
+            and user.is_admin
+        )
+        if sampled or is_requesting_admin:
+            name = save_profile(profile, endpoint_name(request), elapsed)
+            if is_requesting_admin:
+                response["X-Profile-Name"] = name
+        return response
@@ -0,0 +1,183 @@
+"""
+On-demand request profiling.
+
+Profiles are written under ``PROFILING_DIR`` either as folded stacks
+(``.folded``, one ``frame;frame;frame count`` line per stack, readable by
+flamegraph.pl and speedscope) from a wall-clock sampler, or as
+``cProfile`` dumps (``.prof``).
+"""
+
+import cProfile
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+SIGNING_SALT = "analytics.profiling"
+PROFILE_NAME_RE = re.compile(r"^[\w.-]+\.(folded|prof)$")
+
+
+class StackSampler:
+    """Samples one thread's stack from a background thread"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                module = frame.f_globals.get("__name__", "?")
+                stack.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        path.write_text("\n".join(lines) + "\n")
+
+
+# cProfile hooks are process-wide from Python 3.12 (sys.monitoring), so a
+# second concurrent session would fail to enable
+_cprofile_lock = threading.Lock()
+
+
+class Profile:
+    """Profiles the calling thread with the configured mode
+
+    Only one cProfile session runs at a time; a request profiled while
+    another holds it is sampled instead.
+    """
+
+    def __init__(self, mode, interval):
+        self.mode = mode
+        self.interval = interval
+        if mode == "cprofile":
+            self.profiler = cProfile.Profile()
+        else:
+            self.profiler = StackSampler(threading.get_ident(), interval)
+
+    @property
+    def extension(self):
+        return "prof" if self.mode == "cprofile" else "folded"
+
+    def __enter__(self):
+        if self.mode == "cprofile":
+            if _cprofile_lock.acquire(blocking=False):
+                try:
+                    self.profiler.enable()
+                    return self
+                except ValueError:
+                    # Another tool (a debugger, coverage) holds the hooks
+                    _cprofile_lock.release()
+            self.mode = "sampling"
+            self.profiler = StackSampler(threading.get_ident(), self.interval)
+        self.profiler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.mode == "cprofile":
+            self.profiler.disable()
+            _cprofile_lock.release()
+        else:
+            self.profiler.stop()
+
+    def write(self, path):
+        if self.mode == "cprofile":
+            self.profiler.dump_stats(str(path))
+        else:
+            self.profiler.write(path)
+
+
+def profile_dir():
+    return Path(getattr(settings, "PROFILING_DIR", settings.BASE_DIR / "profiles"))
+
+
+def make_token(user):
+    """Signed value for the profiling header, tied to an admin user"""
+    return signing.dumps({"user": user.pk}, salt=SIGNING_SALT)
+
+
+def read_token(value):
+    """User id from a valid, unexpired header value, else None"""
+    max_age = getattr(settings, "PROFILING_TOKEN_MAX_AGE", 60 * 60)
+    try:
+        return signing.loads(value, salt=SIGNING_SALT, max_age=max_age)["user"]
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+
+
+def save_profile(profile, view_name, elapsed):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    slug = re.sub(r"[^\w-]+", "-", view_name).strip("-") or "view"
+    name = (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{int(elapsed * 1000)}ms-"
+        f"{uuid.uuid4().hex[:6]}.{profile.extension}"
+    )
+    profile.write(directory / name)
+    prune_profiles(directory)
+    return name
+
+
+def prune_profiles(directory):
+    keep = getattr(settings, "PROFILING_MAX_FILES", 200)
+    files = sorted(
+        (path for path in directory.iterdir() if PROFILE_NAME_RE.match(path.name)),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in files[keep:]:
+        path.unlink(missing_ok=True)
+
+
+def list_profiles():
+    directory = profile_dir()
+    if not directory.exists():
+        return []
+    profiles = []
+    for path in directory.iterdir():
+        if not PROFILE_NAME_RE.match(path.name):
+            continue
+        stat = path.stat()
+        profiles.append(
+            {
+                "name": path.name,
+                "format": path.suffix.lstrip("."),
+                "size": stat.st_size,
+                "created_at": time.strftime(
+                    "%Y-%m-%d %H:%M:%S", time.gmtime(stat.st_mtime)
+                ),
+            }
+        )
+    return sorted(profiles, key=lambda profile: profile["created_at"], reverse=True)
+
+
+def get_profile_path(name):
+    """Resolve a profile name from ``list_profiles`` to its file, or None"""
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+from .slow_queries import is_explaining
+from .sql import fingerprint, normalize_sql
+
+
+class QueryRecorder:
+    """
+    ``connection.execute_wrapper`` that counts statements, DB time and
+    repeated statement shapes for one unit of work (usually a request).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.signatures = Counter()
+        self.samples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if is_explaining():
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            signature = fingerprint(sql)
+            self.signatures[signature] += 1
+            self.samples.setdefault(signature, sql)
+
+    def duplicates(self, threshold=2):
+        """Statement shapes executed at least ``threshold`` times"""
+        return [
+            {
+                "signature": signature,
+                "count": count,
+                "sql": normalize_sql(self.samples[signature])[:500],
+            }
+            for signature, count in self.signatures.most_common()
+            if count >= threshold
+        ]
+
+
+@contextmanager
+def record_queries(aliases=None):
+    """Record queries on every configured database while the block runs"""
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for alias in aliases or connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+class QueryStats:
+    """Per-URL-name query aggregates for this process"""
+
+    def __init__(self, max_signatures=20):
+        self.max_signatures = max_signatures
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, recorder, duplicate_threshold):
+        with self._lock:
+            stats = self._endpoints.setdefault(
+                endpoint,
+                {
+                    "requests": 0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "db_time_ms": 0.0,
+                    "duplicates": Counter(),
+                    "samples": {},
+                },
+            )
+            stats["requests"] += 1
+            stats["queries"] += recorder.count
+            stats["max_queries"] = max(stats["max_queries"], recorder.count)
+            stats["db_time_ms"] += recorder.duration * 1000
+            for duplicate in recorder.duplicates(duplicate_threshold):
+                signature = duplicate["signature"]
+                if (
+                    signature in stats["samples"]
+                    or len(stats["samples"]) < self.max_signatures
+                ):
+                    stats["duplicates"][signature] += 1
+                    stats["samples"][signature] = duplicate["sql"]
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for endpoint, stats in sorted(self._endpoints.items()):
+                requests = stats["requests"]
+                result[endpoint] = {
+                    "requests": requests,
+                    "avg_queries": round(stats["queries"] / requests, 2),
+                    "max_queries": stats["max_queries"],
+                    "avg_db_time_ms": round(stats["db_time_ms"] / requests, 3),
+                    "duplicate_signatures": [
+                        {
+                            "signature": signature,
+                            "requests": count,
+                            "sql": stats["samples"][signature],
+                        }
+                        for signature, count in stats["duplicates"].most_common()
+                    ],
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+query_stats = QueryStats()
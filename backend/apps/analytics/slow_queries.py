@@ -0,0 +1,230 @@
+"""
+Slow statement capture.
+
+Statements slower than ``SLOW_QUERY_THRESHOLD_MS`` are kept in a bounded
+ring buffer per process together with the view that ran them and a
+normalized fingerprint. The slowest SELECT fingerprints get an ``EXPLAIN``
+plan (``EXPLAIN ANALYZE`` for a sampled fraction on backends that support
+it). Each process writes its buffer to ``SLOW_QUERY_DIR`` so
+``manage.py dump_slow_queries`` can merge them.
+
+Statements run for a plan are invisible to ``QueryRecorder``, so query
+counts and budgets only cover the request's own work.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from .sql import fingerprint, normalize_sql
+
+_local = threading.local()
+
+
+class SlowQueryLog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token = uuid.uuid4().hex[:8]
+        self._flushed_at = 0.0
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.entries = deque(
+                maxlen=getattr(settings, "SLOW_QUERY_BUFFER_SIZE", 500)
+            )
+            self.plans = {}
+
+    @property
+    def threshold(self):
+        return getattr(settings, "SLOW_QUERY_THRESHOLD_MS", 100) / 1000
+
+    def record(self, sql, params, duration, view, connection):
+        signature = fingerprint(sql)
+        entry = {
+            "fingerprint": signature,
+            "duration_ms": round(duration * 1000, 3),
+            "view": view,
+            "database": connection.alias,
+            "sql": sql,
+            "params": [repr(param)[:200] for param in (params or [])][:50],
+            "captured_at": time.time(),
+        }
+        with self._lock:
+            self.entries.append(entry)
+            needs_plan = signature not in self.plans and self._is_slowest(signature)
+
+        if needs_plan:
+            plan = explain(sql, params, connection)
+            if plan is not None:
+                with self._lock:
+                    self.plans[signature] = plan
+        self.flush()
+
+    def _is_slowest(self, signature):
+        """Whether ``signature`` is among the slowest fingerprints seen"""
+        top = getattr(settings, "SLOW_QUERY_EXPLAIN_TOP", 10)
+        slowest = {}
+        for entry in self.entries:
+            key = entry["fingerprint"]
+            slowest[key] = max(slowest.get(key, 0), entry["duration_ms"])
+        ranked = sorted(slowest, key=slowest.get, reverse=True)[:top]
+        return signature in ranked
+
+    def snapshot(self):
+        with self._lock:
+            return {"entries": list(self.entries), "plans": dict(self.plans)}
+
+    # Cross-process
+
+    @property
+    def directory(self):
+        path = getattr(settings, "SLOW_QUERY_DIR", None)
+        return Path(path) if path else None
+
+    def flush(self, force=False):
+        directory = self.directory
+        if directory is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < 1.0:
+            return
+        self._flushed_at = now
+
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"slow-{os.getpid()}-{self._token}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot(), default=str))
+        os.replace(tmp, path)
+
+
+def explain(sql, params, connection):
+    """Plan for a SELECT statement, or None if it cannot be explained"""
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+
+    options = {}
+    rate = getattr(settings, "SLOW_QUERY_EXPLAIN_ANALYZE_RATE", 0.0)
+    if connection.vendor == "postgresql" and rate and random.random() < rate:
+        options["analyze"] = True
+    prefix = connection.ops.explain_query_prefix(**options)
+
+    _local.explaining = True
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f"{prefix} {sql}", params)
+                rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return {"error": str(exc)}
+    finally:
+        _local.explaining = False
+
+    return {
+        "analyze": bool(options),
+        "plan": "\n".join(" ".join(str(col) for col in row) for row in rows),
+    }
+
+
+def is_explaining():
+    """Whether this thread is running a plan for the slow query log, whose
+    statements are not the request's own"""
+    return getattr(_local, "explaining", False)
+
+
+class SlowQueryWrapper:
+    """``execute_wrapper`` that hands slow statements to the log"""
+
+    def __init__(self, log, request=None):
+        self.log = log
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        if is_explaining():
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if duration >= self.log.threshold:
+                from .middleware import endpoint_name
+
+                view = endpoint_name(self.request) if self.request else None
+                self.log.record(
+                    sql,
+                    None if many else params,
+                    duration,
+                    view,
+                    context["connection"],
+                )
+
+
+@contextmanager
+def capture_slow_queries(request=None, aliases=None):
+    """Send slow statements on every configured database to the log"""
+    wrapper = SlowQueryWrapper(slow_query_log, request)
+    with ExitStack() as stack:
+        for alias in aliases or connections:
+            stack.enter_context(connections[alias].execute_wrapper(wrapper))
+        yield wrapper
+
+
+def load_all(directory):
+    """Merge the buffers written by every process"""
+    entries, plans = [], {}
+    for path in Path(directory).glob("slow-*.json"):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        entries.extend(data.get("entries", []))
+        plans.update(data.get("plans", {}))
+    return entries, plans
+
+
+def summarize(entries, plans):
+    """Aggregate entries per fingerprint, slowest first"""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(
+            entry["fingerprint"],
+            {
+                "fingerprint": entry["fingerprint"],
+                "sql": normalize_sql(entry["sql"]),
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "views": set(),
+                "example": entry,
+            },
+        )
+        group["count"] += 1
+        group["total_ms"] += entry["duration_ms"]
+        if entry["duration_ms"] >= group["max_ms"]:
+            group["max_ms"] = entry["duration_ms"]
+            group["example"] = entry
+        if entry.get("view"):
+            group["views"].add(entry["view"])
+
+    summary = []
+    for group in groups.values():
+        group["views"] = sorted(group["views"])
+        group["avg_ms"] = round(group["total_ms"] / group["count"], 3)
+        group["total_ms"] = round(group["total_ms"], 3)
+        group["plan"] = plans.get(group["fingerprint"])
+        summary.append(group)
+    return sorted(summary, key=lambda group: group["max_ms"], reverse=True)
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,35 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .queries import record_queries
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin that fails when a block runs more queries than the
+    budget declared for an endpoint in ``settings.QUERY_BUDGETS``.
+
+        with self.assertQueryBudget("past_questions:past-question-list"):
+            self.client.get(url)
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, endpoint=None, max_queries=None):
+        if max_queries is None:
+            budgets = getattr(settings, "QUERY_BUDGETS", {})
+            if endpoint not in budgets:
+                self.fail(f"No query budget declared for {endpoint!r}")
+            max_queries = budgets[endpoint]
+
+        with record_queries() as recorder:
+            yield recorder
+
+        if recorder.count > max_queries:
+            lines = [
+                f"{endpoint or 'block'} ran {recorder.count} queries, "
+                f"budget is {max_queries}"
+            ]
+            for duplicate in recorder.duplicates():
+                lines.append(f"  {duplicate['count']}x {duplicate['sql']}")
+            self.fail("\n".join(lines))
@@ -1,3 +1,314 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.courses.models import Course
+from apps.past_questions.content import extract_text
+from apps.past_questions.fingerprints import first_page_image
+from apps.users.models import User
+
+from .benchmarks.connections import CYCLES
+from .benchmarks.dataset import DatasetSeeder, sample_pdf
+from .benchmarks.runner import BenchmarkRunner, summarize as bench_summarize
+from .metrics import MetricsRegistry, retire_process
+from .profiling import Profile, make_token, read_token
+from .slow_queries import capture_slow_queries, slow_query_log, summarize
+
+from .queries import query_stats, record_queries
+from .sql import fingerprint, normalize_sql
+from .testing import QueryBudgetMixin
+
+
+class NormalizeSqlTests(TestCase):
+    def test_literals_and_in_lists_collapse(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s, %s)"),
+            "SELECT * FROM t WHERE a = ? AND b IN (...)",
+        )
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1"),
+            fingerprint("SELECT * FROM t WHERE id = 42"),
+        )
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(
+            code="CSC101",
+            title="Introduction to Computing",
+            faculty="computing",
+            department="Computer Science",
+            level="100",
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_catalog_within_budget(self):
+        with self.assertQueryBudget("courses:course-catalog"):
+            response = self.client.get(reverse("courses:course-catalog"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_course_detail_within_budget(self):
+        url = reverse("courses:course-detail", args=[self.course.code])
+        with self.assertQueryBudget("courses:course-detail"):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_exceeding_budget_fails(self):
+        url = reverse("courses:course-detail", args=[self.course.code])
+        with self.assertRaises(AssertionError) as raised:
+            with self.assertQueryBudget(max_queries=0):
+                self.client.get(url)
+        self.assertIn("budget is 0", str(raised.exception))
+
+    def test_undeclared_endpoint_fails(self):
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget("courses:no-such-endpoint"):
+                pass
+
+
+@override_settings(QUERY_INSTRUMENTATION_SAMPLE_RATE=1.0)
+class QueryInstrumentationMiddlewareTests(TestCase):
+    def setUp(self):
+        query_stats.reset()
+        Course.objects.create(
+            code="CSC101",
+            title="Introduction to Computing",
+            faculty="computing",
+            department="Computer Science",
+            level="100",
+        )
+
+    def test_records_queries_per_url_name(self):
+        self.client.get(reverse("courses:course-list"))
+        stats = query_stats.snapshot()
+        self.assertIn("courses:course-list", stats)
+        self.assertEqual(stats["courses:course-list"]["requests"], 1)
+        self.assertGreater(stats["courses:course-list"]["avg_queries"], 0)
+
+
+@override_settings(
+    SLOW_QUERY_THRESHOLD_MS=0.000001, SLOW_QUERY_EXPLAIN_TOP=10, SLOW_QUERY_DIR=None
+)
+class SlowQueryTests(TestCase):
+    def setUp(self):
+        slow_query_log.reset()
+        self.addCleanup(slow_query_log.reset)
+
+    def test_explains_selects_without_counting_the_explain(self):
+        with record_queries() as recorder, capture_slow_queries():
+            list(Course.objects.filter(code="CSC101"))
+            Course.objects.filter(code="CSC101").update(title="Computing")
+
+        self.assertEqual(recorder.count, 2)
+        snapshot = slow_query_log.snapshot()
+        groups = {
+            group["sql"].split()[0]: group
+            for group in summarize(snapshot["entries"], snapshot["plans"])
+        }
+        self.assertEqual(sorted(groups), ["SELECT", "UPDATE"])
+        self.assertIn("courses_course", groups["SELECT"]["plan"]["plan"])
+        self.assertIsNone(groups["UPDATE"]["plan"])
+
+    def test_middleware_is_off_without_threshold(self):
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0):
+            self.client.get(reverse("courses:course-list"))
+        self.assertEqual(slow_query_log.snapshot()["entries"], [])
+
+
+def worker_registry():
+    """A registry standing in for one worker process's"""
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs run", ["kind"])
+    registry.histogram("job_seconds", "Job duration", buckets=(0.1, 1.0))
+    return registry
+
+
+class MetricsRegistryTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_renders_counters_and_cumulative_buckets(self):
+        registry = worker_registry()
+        registry.metrics["jobs_total"].inc(kind="import")
+        registry.metrics["jobs_total"].inc(2, kind="import")
+        registry.metrics["job_seconds"].observe(0.05)
+        registry.metrics["job_seconds"].observe(0.5)
+        registry.metrics["job_seconds"].observe(3)
+        with self.settings(METRICS_MULTIPROC_DIR=None):
+            output = registry.render()
+        self.assertIn('jobs_total{kind="import"} 3', output)
+        self.assertIn('job_seconds_bucket{le="0.1"} 1', output)
+        self.assertIn('job_seconds_bucket{le="1"} 2', output)
+        self.assertIn('job_seconds_bucket{le="+Inf"} 3', output)
+        self.assertIn("job_seconds_sum 3.55", output)
+
+    def test_sums_workers_and_keeps_retired_counts(self):
+        first, second = worker_registry(), worker_registry()
+        with self.settings(METRICS_MULTIPROC_DIR=str(self.directory)):
+            first.metrics["jobs_total"].inc(kind="import")
+            first.metrics["job_seconds"].observe(0.5)
+            with mock.patch("apps.analytics.metrics.os.getpid", return_value=1):
+                first.flush(force=True)
+            second.metrics["jobs_total"].inc(4, kind="import")
+            before = second.render()
+
+            # Recycle the first worker twice over; its counts must survive
+            retire_process(self.directory, 1)
+            retire_process(self.directory, 1)
+            after = second.render()
+            files = [path.name for path in self.directory.glob("*.json")]
+            self.assertCountEqual(
+                files, ["metrics-retired.json", second._path().name]
+            )
+
+        self.assertIn('jobs_total{kind="import"} 5', before)
+        self.assertEqual(after, before)
+
+
+class MetricsViewTests(TestCase):
+    url = reverse("analytics:metrics")
+
+    @override_settings(DEBUG=False, METRICS_AUTH_TOKEN="")
+    def test_refused_without_token_in_production(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(DEBUG=True, METRICS_AUTH_TOKEN="")
+    def test_open_without_token_in_debug(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(DEBUG=False, METRICS_AUTH_TOKEN="s3cret")
+    def test_requires_matching_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        response = self.client.get(self.url, HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(self.url, HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"pastq_pending_past_questions 0", response.content)
+
+
+class SamplePdfTests(TestCase):
+    def test_has_text_layer_and_scan(self):
+        pdf = sample_pdf("Final examination", "Answer all questions")
+        text, pages = extract_text(io.BytesIO(pdf))
+        self.assertEqual((text, pages), ("Final examination Answer all questions", 1))
+        self.assertEqual(first_page_image(io.BytesIO(pdf)).size, (64, 64))
+
+
+class BenchmarkRunTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sizes = {"courses": 5, "users": 20, "past_questions": 40, "downloads": 40}
+        DatasetSeeder(sizes, log=lambda message: None).seed()
+
+    @override_settings(ALLOWED_HOSTS=["localhost", "127.0.0.1"])
+    def test_replays_under_debug_host_list(self):
+        runner = BenchmarkRunner(requests=30, warmup=0, log=lambda message: None)
+        results = runner.run()
+        self.assertEqual(results["overall"]["requests"], 30)
+        self.assertEqual(results["overall"]["errors"], 0)
+
+    def test_failed_requests_exit_non_zero(self):
+        samples = [{"ms": 1.0, "queries": 1, "bytes": 10, "ok": ok} for ok in (1, 0)]
+        results = {
+            "overall": bench_summarize(samples, 1.0),
+            "endpoints": {"GET courses:course-list": bench_summarize(samples, 1.0)},
+        }
+        with mock.patch.object(BenchmarkRunner, "run", return_value=results):
+            with self.assertRaisesMessage(CommandError, "1 of 2 requests failed"):
+                call_command("bench_run", stdout=io.StringIO())
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            "10000009", "admin@example.com", "pass", is_admin=True
+        )
+        self.student = User.objects.create_user("10000001", "ama@example.com", "pass")
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def auth(self, user):
+        return {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+
+    def profiled_get(self, **headers):
+        with override_settings(
+            PROFILING_ENABLED=True,
+            PROFILING_DIR=str(self.directory),
+            PROFILING_INTERVAL=0.001,
+        ):
+            return self.client.get(reverse("courses:course-list"), **headers)
+
+    def test_token_is_admin_only(self):
+        url = reverse("analytics:profile-token")
+        self.assertEqual(self.client.post(url).status_code, 401)
+        response = self.client.post(url, **self.auth(self.student))
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(url, **self.auth(self.admin))
+        self.assertEqual(read_token(response.json()["token"]), self.admin.pk)
+
+    def test_header_profiles_for_its_admin(self):
+        token = make_token(self.admin)
+        response = self.profiled_get(HTTP_X_PROFILE=token, **self.auth(self.admin))
+        name = response["X-Profile-Name"]
+        self.assertTrue((self.directory / name).is_file())
+
+        # Someone else's token, a forged token, or a non-admin owner
+        response = self.profiled_get(HTTP_X_PROFILE=token, **self.auth(self.student))
+        self.assertFalse(response.has_header("X-Profile-Name"))
+        response = self.profiled_get(
+            HTTP_X_PROFILE=token + "x", **self.auth(self.admin)
+        )
+        self.assertFalse(response.has_header("X-Profile-Name"))
+        token = make_token(self.student)
+        response = self.profiled_get(HTTP_X_PROFILE=token, **self.auth(self.student))
+        self.assertFalse(response.has_header("X-Profile-Name"))
+        self.assertEqual([path.name for path in self.directory.iterdir()], [name])
+
+    def test_sampled_requests_are_saved(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1.0):
+            response = self.profiled_get()
+        self.assertFalse(response.has_header("X-Profile-Name"))
+        (path,) = self.directory.iterdir()
+        self.assertIn("courses-course-list", path.name)
+        self.assertTrue(path.name.endswith(".folded"))
+
+    def test_sampler_records_folded_stacks(self):
+        with Profile("sampling", 0.001) as profile:
+            time.sleep(0.05)
+        profile.write(self.directory / "stacks.folded")
+        lines = (self.directory / "stacks.folded").read_text().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertTrue(stack.endswith(f"{__name__}:{self._testMethodName}"))
+        self.assertGreater(int(count), 0)
+
+    def test_one_cprofile_session_at_a_time(self):
+        with Profile("cprofile", 0.001) as outer:
+            with Profile("cprofile", 0.001) as inner:
+                self.assertEqual(inner.extension, "folded")
+            self.assertEqual(outer.extension, "prof")
+        with Profile("cprofile", 0.001) as profile:
+            self.assertEqual(profile.extension, "prof")
+
+
+class ConnectionBenchmarkTests(TestCase):
+    def test_connect_cycle_bypasses_the_pool(self):
+        # In psycopg mode get_new_connection() checks out of the pool
+        with mock.patch.object(connection, "get_new_connection") as checkout:
+            CYCLES["connect"](connection)
+        checkout.assert_not_called()
@@ -1,3 +1,22 @@
 from django.urls import path
+from apps.courses.views import CourseCacheStatsView
+from . import views
 
-urlpatterns = []
+app_name = "analytics"
+
+urlpatterns = [
+    path("queries/", views.QueryStatsView.as_view(), name="query-stats"),
+    path("metrics/", views.metrics_view, name="metrics"),
+    # Lives here rather than under courses/, where it would shadow a course
+    # with the code CACHE-STATS
+    path(
+        "course-cache/", CourseCacheStatsView.as_view(), name="course-cache-stats"
+    ),
+    path("profiles/", views.ProfileListView.as_view(), name="profile-list"),
+    path("profiles/token/", views.ProfileTokenView.as_view(), name="profile-token"),
+    path(
+        "profiles/<str:name>/",
+        views.ProfileDetailView.as_view(),
+        name="profile-detail",
+    ),
+]
@@ -1,3 +1,90 @@
-from django.shortcuts import render
+import hmac
 
-# Create your views here.
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.courses.permissions import IsAdminUser
+
+from .metrics import registry
+from .profiling import get_profile_path, list_profiles, make_token
+from .queries import query_stats
+
+
+class QueryStatsView(APIView):
+    """
+    Get per-endpoint query counts, DB time and repeated queries for this
+    worker (admin only)
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(query_stats.snapshot())
+
+    def delete(self, request):
+        query_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ProfileTokenView(APIView):
+    """
+    Issue a signed value for the ``X-Profile`` header (admin only)
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        return Response({"header": "X-Profile", "token": make_token(request.user)})
+
+
+class ProfileListView(APIView):
+    """
+    List recent request profiles (admin only)
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(list_profiles())
+
+
+class ProfileDetailView(APIView):
+    """
+    Download one profile file (admin only)
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, name):
+        path = get_profile_path(name)
+        if path is None:
+            raise Http404("Profile not found")
+        return FileResponse(
+            open(path, "rb"),
+            as_attachment=True,
+            filename=name,
+            content_type="application/octet-stream",
+        )
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition for all workers. Requires
+    ``Authorization: Bearer <METRICS_AUTH_TOKEN>``; without a token set it
+    is only served with ``DEBUG`` on.
+    """
+    token = getattr(settings, "METRICS_AUTH_TOKEN", "")
+    if token:
+        supplied = request.META.get("HTTP_AUTHORIZATION", "")
+        allowed = hmac.compare_digest(supplied, f"Bearer {token}")
+    else:
+        allowed = settings.DEBUG
+    if not allowed:
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,187 @@
+# apps/courses/autocomplete.py
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Course
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+VERSION_KEY = "courses:autocomplete:version"
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+class _Snapshot:
+    """Immutable sorted-array index over course codes and title tokens"""
+
+    def __init__(self, courses):
+        self.courses = []
+        self.popularity = []
+        self.codes = []
+        entries = set()
+
+        for index, course in enumerate(courses):
+            self.courses.append(
+                {
+                    "id": course["id"],
+                    "code": course["code"],
+                    "title": course["title"],
+                    "department": course["department"],
+                    "level": course["level"],
+                }
+            )
+            self.popularity.append(course["popularity"])
+            code = course["code"].lower()
+            self.codes.append(code)
+            entries.add((code, index))
+            for token in tokenize(course["title"]):
+                entries.add((token, index))
+
+        entries = sorted(entries)
+        self.keys = [key for key, _ in entries]
+        self.indexes = [index for _, index in entries]
+
+    def _prefix_matches(self, prefix):
+        matches = set()
+        position = bisect_left(self.keys, prefix)
+        while position < len(self.keys) and self.keys[position].startswith(prefix):
+            matches.add(self.indexes[position])
+            position += 1
+        return matches
+
+    def search(self, query, limit):
+        query = (query or "").strip().lower()
+        if not query:
+            return []
+
+        # A code typed with a space ("csc 101") still matches "csc101"
+        candidates = self._prefix_matches(query.replace(" ", ""))
+        tokens = tokenize(query)
+        if tokens:
+            by_tokens = self._prefix_matches(tokens[0])
+            for token in tokens[1:]:
+                by_tokens &= self._prefix_matches(token)
+            candidates |= by_tokens
+
+        compact = query.replace(" ", "")
+        best = heapq.nsmallest(
+            limit,
+            candidates,
+            key=lambda i: (
+                -self.popularity[i],
+                not self.codes[i].startswith(compact),
+                self.codes[i],
+            ),
+        )
+        return [self.courses[i] for i in best]
+
+
+class CoursePrefixIndex:
+    """
+    In-memory typeahead index over active courses, ranked by popularity
+    (approved past questions and their downloads).
+
+    Course saves bump a version in the shared cache; each worker checks it
+    at most every ``COURSE_AUTOCOMPLETE_REFRESH_INTERVAL`` seconds and
+    rebuilds when it changed, so lookups never touch the database. With a
+    per-process cache other workers never see the bump, so every index is
+    also rebuilt once it is ``COURSE_AUTOCOMPLETE_MAX_AGE`` seconds old.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._version = None
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def refresh_interval(self):
+        return getattr(settings, "COURSE_AUTOCOMPLETE_REFRESH_INTERVAL", 30)
+
+    @property
+    def max_age(self):
+        return getattr(settings, "COURSE_AUTOCOMPLETE_MAX_AGE", 60 * 60)
+
+    def build(self):
+        # Read the version first so a change during the build is not missed
+        version = cache.get(VERSION_KEY)
+        approved = Q(past_questions__status="approved")
+        # Kept until the next version bump, so read the primary rather than
+        # a replica that may not have the change behind the bump yet
+        courses = (
+            Course.objects.using(DEFAULT_DB_ALIAS)
+            .filter(is_active=True)
+            .annotate(
+                approved_count=Count("past_questions", filter=approved),
+                downloads=Coalesce(
+                    Sum("past_questions__download_count", filter=approved), Value(0)
+                ),
+            )
+            .values(
+                "id",
+                "code",
+                "title",
+                "department",
+                "level",
+                "approved_count",
+                "downloads",
+            )
+        )
+        rows = []
+        for course in courses:
+            course["popularity"] = course["downloads"] + 10 * course["approved_count"]
+            rows.append(course)
+
+        snapshot = _Snapshot(rows)
+        with self._lock:
+            self._snapshot = snapshot
+            self._version = version
+            self._built_at = self._checked_at = time.monotonic()
+        return snapshot
+
+    def warm(self):
+        """Build at worker startup; a missing database must not stop boot"""
+        try:
+            self.build()
+        except DatabaseError:
+            logger.warning("Course autocomplete index not built at startup")
+
+    def invalidate(self):
+        """Mark every worker's index stale"""
+        cache.set(VERSION_KEY, time.time_ns(), None)
+        with self._lock:
+            self._snapshot = None
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.build()
+
+        now = time.monotonic()
+        if now - self._built_at >= self.max_age:
+            return self.build()
+        if now - self._checked_at >= self.refresh_interval:
+            self._checked_at = now
+            if cache.get(VERSION_KEY) != self._version:
+                return self.build()
+        return snapshot
+
+    def search(self, query, limit=10):
+        return self._current().search(query, limit)
+
+
+course_index = CoursePrefixIndex()
@@ -0,0 +1,186 @@
+# apps/courses/cache.py
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Course
+
+
+class CourseCache:
+    """
+    Two-tier cache for Course lookups.
+
+    Tier 1 is a bounded in-process LRU, tier 2 is the shared Django cache.
+    Courses are keyed by both id and upper-cased code. Local entries expire
+    after ``COURSE_CACHE_LOCAL_TTL`` seconds so other workers pick up changes
+    made elsewhere; the shared tier is invalidated explicitly on save/delete.
+    When the Django cache is per process (locmem) that invalidation cannot
+    reach other workers, so ``COURSE_CACHE_SHARED_TTL`` then defaults to the
+    local TTL as well.
+    """
+
+    KEY_PREFIX = "courses:course"
+
+    def __init__(self, max_size=None, local_ttl=None, shared_ttl=None):
+        self.max_size = max_size or getattr(settings, "COURSE_CACHE_LOCAL_SIZE", 512)
+        self.local_ttl = (
+            local_ttl
+            if local_ttl is not None
+            else getattr(settings, "COURSE_CACHE_LOCAL_TTL", 60)
+        )
+        self.shared_ttl = (
+            shared_ttl
+            if shared_ttl is not None
+            else getattr(settings, "COURSE_CACHE_SHARED_TTL", 60 * 60)
+        )
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "local_hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+        }
+
+    # Keys
+
+    def _id_key(self, pk):
+        return f"{self.KEY_PREFIX}:id:{pk}"
+
+    def _code_key(self, code):
+        return f"{self.KEY_PREFIX}:code:{code.strip().upper()}"
+
+    # Local tier
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            course, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return course
+
+    def _local_set(self, key, course):
+        with self._lock:
+            self._local[key] = (course, time.monotonic() + self.local_ttl)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    # Lookups
+
+    def _get(self, key, loader):
+        course = self._local_get(key)
+        if course is not None:
+            self._count("local_hits")
+            return copy.copy(course)
+
+        course = cache.get(key)
+        if course is not None:
+            self._count("shared_hits")
+            self._local_set(key, course)
+            return copy.copy(course)
+
+        self._count("misses")
+        course = loader()
+        if course is None:
+            return None
+        self.set(course)
+        return copy.copy(course)
+
+    @staticmethod
+    def _courses():
+        # Loaders refill the cache right after a save invalidates it, so
+        # they read the primary; a replica could still hold the old row
+        return Course.objects.using(DEFAULT_DB_ALIAS).select_related("created_by")
+
+    def get_by_id(self, pk):
+        """Return the course with this primary key, or None"""
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+        return self._get(
+            self._id_key(pk),
+            lambda: self._courses().filter(pk=pk).first(),
+        )
+
+    def get_by_code(self, code):
+        """Return the course with this code (case-insensitive), or None"""
+        if not code or not code.strip():
+            return None
+        code = code.strip().upper()
+        return self._get(
+            self._code_key(code),
+            lambda: self._courses().filter(code=code).first(),
+        )
+
+    # Population and invalidation
+
+    def set(self, course):
+        """Store a course under both its id and code keys in both tiers"""
+        entries = {self._id_key(course.pk): course, self._code_key(course.code): course}
+        cache.set_many(entries, self.shared_ttl)
+        for key, value in entries.items():
+            self._local_set(key, value)
+
+    def invalidate(self, course):
+        """Drop a course from both tiers, including any stale code key"""
+        keys = {self._id_key(course.pk), self._code_key(course.code)}
+
+        # The code may have changed since the course was cached
+        previous = self._local_get(self._id_key(course.pk)) or cache.get(
+            self._id_key(course.pk)
+        )
+        if previous is not None:
+            keys.add(self._code_key(previous.code))
+
+        self._local_delete(*keys)
+        cache.delete_many(list(keys))
+        self._count("invalidations")
+
+    def warm(self):
+        """Load every active course into both tiers"""
+        courses = self._courses().filter(is_active=True)
+        for course in courses.iterator(chunk_size=500):
+            self.set(course)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["local_size"] = len(self._local)
+        lookups = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["max_size"] = self.max_size
+        stats["lookups"] = lookups
+        stats["hit_rate"] = (
+            round((stats["local_hits"] + stats["shared_hits"]) / lookups, 4)
+            if lookups
+            else 0.0
+        )
+        return stats
+
+
+course_cache = CourseCache()
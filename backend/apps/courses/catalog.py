@@ -0,0 +1,124 @@
+# apps/courses/catalog.py
+import gzip
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Course
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+CATALOG_CACHE_KEY = "courses:catalog:snapshot"
+CATALOG_ETAG_KEY = "courses:catalog:etag"
+
+
+class CatalogSnapshot:
+    """A prebuilt catalog document with its compressed variants"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.etag = f'W/"{hashlib.sha256(raw).hexdigest()[:32]}"'
+        self.encodings = {"gzip": gzip.compress(raw, compresslevel=9)}
+        if brotli is not None:
+            self.encodings["br"] = brotli.compress(raw, quality=11)
+
+    def body_for(self, accept_encoding):
+        """Pick the best precompressed body the client accepts"""
+        accepted = {
+            token.split(";")[0].strip().lower()
+            for token in (accept_encoding or "").split(",")
+        }
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.encodings:
+                return self.encodings[encoding], encoding
+        return self.raw, None
+
+
+def _department_nodes(departments):
+    return [
+        {
+            "value": department,
+            "label": department,
+            "levels": sorted(levels, key=lambda level: (len(level), level)),
+        }
+        for department, levels in sorted(departments.items())
+        if department
+    ]
+
+
+def build_catalog():
+    """Build the catalog document from the database"""
+    # The snapshot is cached until the next edit, so read the primary: a
+    # lagging replica would pin pre-edit data long after it caught up
+    courses = list(
+        Course.objects.using(DEFAULT_DB_ALIAS)
+        .filter(is_active=True)
+        .order_by("code")
+        .values(
+            "id",
+            "code",
+            "title",
+            "faculty",
+            "department",
+            "level",
+            "semester",
+            "credit_hours",
+        )
+    )
+
+    tree = {}
+    for course in courses:
+        departments = tree.setdefault(course["faculty"], {})
+        departments.setdefault(course["department"], set()).add(course["level"])
+
+    # Known faculties first, then any value no longer in FACULTY_CHOICES
+    labels = dict(Course.FACULTY_CHOICES)
+    values = [value for value, _ in Course.FACULTY_CHOICES]
+    values += sorted(set(tree) - set(labels))
+
+    faculties = [
+        {
+            "value": value,
+            "label": labels.get(value, value),
+            "departments": _department_nodes(tree.get(value, {})),
+        }
+        for value in values
+    ]
+
+    document = {
+        "faculties": faculties,
+        "semesters": [
+            {"value": value, "label": label} for value, label in Course.SEMESTER_CHOICES
+        ],
+        "courses": courses,
+    }
+    raw = json.dumps(document, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return CatalogSnapshot(raw)
+
+
+def get_catalog_etag():
+    """Current ETag, without loading the document itself"""
+    return cache.get(CATALOG_ETAG_KEY)
+
+
+def get_catalog():
+    """Return the cached snapshot, rebuilding it if courses changed"""
+    snapshot = cache.get(CATALOG_CACHE_KEY)
+    if snapshot is None:
+        snapshot = build_catalog()
+        timeout = getattr(settings, "CATALOG_CACHE_TIMEOUT", None)
+        cache.set_many(
+            {CATALOG_CACHE_KEY: snapshot, CATALOG_ETAG_KEY: snapshot.etag}, timeout
+        )
+    return snapshot
+
+
+def invalidate_catalog():
+    cache.delete_many([CATALOG_CACHE_KEY, CATALOG_ETAG_KEY])
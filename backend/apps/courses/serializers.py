@@ -1,8 +1,30 @@
 # apps/courses/serializers.py
 from rest_framework import serializers
+from .cache import course_cache
 from .models import Course
 
 
+class CachedCourseRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field that resolves courses through the course cache"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("queryset", Course.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+        course = course_cache.get_by_id(pk)
+        if course is None:
+            self.fail("does_not_exist", pk_value=data)
+        return course
+
+
 class CourseSerializer(serializers.ModelSerializer):
     """Serializer for Course model"""
 
@@ -0,0 +1,23 @@
+# apps/courses/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import course_index
+from .cache import course_cache
+from .catalog import invalidate_catalog
+from .models import Course
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_caches(sender, instance, **kwargs):
+    """Drop cached copies of a course whenever it is saved or deleted"""
+    course_cache.invalidate(instance)
+    invalidate_catalog()
+    course_index.invalidate()
+    # Invalidate again once the transaction commits so a concurrent reader
+    # cannot repopulate the cache with the pre-commit row.
+    transaction.on_commit(lambda: course_cache.invalidate(instance))
+    transaction.on_commit(invalidate_catalog)
+    transaction.on_commit(course_index.invalidate)
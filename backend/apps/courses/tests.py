@@ -1,3 +1,269 @@
+import gzip
+import json
+import time
+from types import SimpleNamespace
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.past_questions.models import PastQuestion
+from apps.users.models import User
+
+from .autocomplete import CoursePrefixIndex, course_index
+from .cache import CourseCache, course_cache
+from .catalog import build_catalog, get_catalog
+from .models import Course
+
+
+def make_course(code, title="Introduction to Computing", **fields):
+    fields.setdefault("faculty", "computing")
+    fields.setdefault("department", "Computer Science")
+    fields.setdefault("level", "100")
+    return Course.objects.create(code=code, title=title, **fields)
+
+
+class CourseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        course_cache.clear_local()
+        self.course = make_course("CSC101")
+
+    def test_lru_evicts_least_recently_used(self):
+        # Each course takes two entries, by id and by code
+        lru = CourseCache(max_size=4, local_ttl=60, shared_ttl=60)
+        other = make_course("CSC102", "Programming I")
+        lru.set(self.course)
+        lru.set(other)
+        lru.get_by_id(self.course.pk)
+        lru.set(make_course("CSC103", "Programming II"))
+        self.assertEqual(lru.stats()["local_size"], 4)
+
+        cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(lru.get_by_id(self.course.pk).code, "CSC101")
+        with self.assertNumQueries(1):
+            self.assertEqual(lru.get_by_id(other.pk).code, "CSC102")
+
+    def test_local_entries_expire(self):
+        lru = CourseCache(max_size=4, local_ttl=60, shared_ttl=60)
+        with mock.patch("apps.courses.cache.time.monotonic", return_value=1000.0):
+            lru.get_by_code("csc101")
+        with mock.patch("apps.courses.cache.time.monotonic", return_value=1061.0):
+            lru.get_by_code("CSC101")
+        stats = lru.stats()
+        self.assertEqual((stats["misses"], stats["shared_hits"]), (1, 1))
+
+    def test_lookups_return_copies(self):
+        course_cache.get_by_code("CSC101").title = "Changed"
+        self.assertEqual(
+            course_cache.get_by_code("CSC101").title, "Introduction to Computing"
+        )
+
+    def test_save_invalidates(self):
+        course_cache.get_by_code("CSC101")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.title = "Computing Fundamentals"
+            self.course.save()
+        self.assertEqual(
+            course_cache.get_by_id(self.course.pk).title, "Computing Fundamentals"
+        )
+        self.assertEqual(
+            course_cache.get_by_code("CSC101").title, "Computing Fundamentals"
+        )
+
+    def test_code_rename_drops_old_code(self):
+        course_cache.get_by_code("CSC101")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.code = "CSC111"
+            self.course.save()
+        self.assertIsNone(course_cache.get_by_code("CSC101"))
+        self.assertEqual(course_cache.get_by_code("csc111").pk, self.course.pk)
+
+    def test_delete_invalidates(self):
+        course_cache.get_by_id(self.course.pk)
+        pk = self.course.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.delete()
+        self.assertIsNone(course_cache.get_by_id(pk))
+        self.assertIsNone(course_cache.get_by_code("CSC101"))
+
+    @skipIf(settings.CACHE_IS_SHARED, "CACHE_URL points at a shared cache")
+    def test_shared_tier_is_short_lived_without_a_shared_cache(self):
+        # Other workers never see the invalidation, so nothing may outlive
+        # the local window
+        self.assertEqual(CourseCache().shared_ttl, settings.COURSE_CACHE_LOCAL_TTL)
+
+    def test_stats_route_does_not_shadow_course_codes(self):
+        make_course("CACHE-STATS", "Caching Statistics")
+        url = reverse("courses:course-detail", args=["CACHE-STATS"])
+        self.assertEqual(self.client.get(url).json()["title"], "Caching Statistics")
+
+        url = reverse("analytics:course-cache-stats")
+        admin = User.objects.create_user(
+            "10000009", "admin@example.com", "pass", is_admin=True
+        )
+        student = User.objects.create_user("10000001", "ama@example.com", "pass")
+        response = self.client.get(
+            url, HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(admin)}"
+        )
+        self.assertIn("hit_rate", response.json())
+        response = self.client.get(
+            url, HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(student)}"
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class CatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = make_course("CSC101")
+        make_course("CSC102", "Programming I", level="200")
+        make_course("LAW101", "Legal Method", faculty="law", department="Law")
+        make_course("CSC900", "Retired", is_active=False)
+
+    def get(self, **headers):
+        return self.client.get(reverse("courses:course-catalog"), **headers)
+
+    def test_build(self):
+        document = json.loads(build_catalog().raw)
+        self.assertEqual(
+            [course["code"] for course in document["courses"]],
+            ["CSC101", "CSC102", "LAW101"],
+        )
+        faculties = {faculty["value"]: faculty for faculty in document["faculties"]}
+        # Known faculties keep their order; unknown ones follow
+        self.assertEqual(list(faculties)[-1], "law")
+        self.assertEqual(
+            faculties["computing"]["departments"],
+            [
+                {
+                    "value": "Computer Science",
+                    "label": "Computer Science",
+                    "levels": ["100", "200"],
+                }
+            ],
+        )
+        self.assertEqual(faculties["engineering"]["departments"], [])
+
+    def test_etag_revalidation(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        with self.assertNumQueries(0):
+            response = self.get(HTTP_IF_NONE_MATCH=f'W/"other", {etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='W/"other"').status_code, 200)
+
+    def test_encoding_choice(self):
+        response = self.get(HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), get_catalog().raw)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        response = self.get()
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, get_catalog().raw)
+
+        fake_brotli = SimpleNamespace(compress=lambda raw, quality: b"br" + raw)
+        with mock.patch("apps.courses.catalog.brotli", fake_brotli):
+            cache.clear()
+            response = self.get(HTTP_ACCEPT_ENCODING="gzip;q=0.8, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(response.content, b"br" + get_catalog().raw)
+
+    def test_save_and_delete_rebuild(self):
+        etag = self.get()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.title = "Computing Fundamentals"
+            self.course.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Computing Fundamentals", response.content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.delete()
+        codes = [course["code"] for course in json.loads(self.get().content)["courses"]]
+        self.assertEqual(codes, ["CSC102", "LAW101"])
+
+    @skipIf(settings.CACHE_IS_SHARED, "CACHE_URL points at a shared cache")
+    def test_snapshot_expires_without_a_shared_cache(self):
+        with mock.patch("apps.courses.catalog.cache.set_many") as set_many:
+            get_catalog()
+        self.assertEqual(set_many.call_args.args[1], 60)
+
+
+class CourseAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.intro = make_course("CSC101")
+        cls.programming = make_course("CSC102", "Programming in Python")
+        cls.networks = make_course("CSC301", "Computer Networks", level="300")
+        cls.stats = make_course("STA101", "Introduction to Statistics")
+        make_course("CSC210", "Applied Statistics", level="200")
+        make_course("CSC100", "Retired Computing", is_active=False)
+        uploader = User.objects.create_user("10000001", "ama@example.com", "pass")
+        # CSC301 is the most popular: two approved papers and downloads
+        PastQuestion.objects.bulk_create(
+            PastQuestion(
+                course=cls.networks,
+                year=2020 + n,
+                title=f"Networks {n}",
+                file_name=f"networks-{n}.pdf",
+                uploaded_by=uploader,
+                status="approved",
+                download_count=5,
+            )
+            for n in range(2)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.index = CoursePrefixIndex()
+
+    def codes(self, query, limit=10):
+        return [course["code"] for course in self.index.search(query, limit)]
+
+    def test_ranks_by_popularity_then_code_prefix(self):
+        self.assertEqual(self.codes("c"), ["CSC301", "CSC101", "CSC102", "CSC210"])
+        # "computing" matches CSC101's title; CSC301 via "computer"
+        self.assertEqual(self.codes("comput"), ["CSC301", "CSC101"])
+        self.assertEqual(self.codes("c", limit=1), ["CSC301"])
+        # Equal popularity: a code matching the query outranks a title match
+        self.assertEqual(self.codes("sta"), ["STA101", "CSC210"])
+        self.assertEqual(self.codes("intro"), ["CSC101", "STA101"])
+
+    def test_code_typed_with_space(self):
+        self.assertEqual(self.codes("csc 101"), ["CSC101"])
+        self.assertEqual(self.codes("CSC101"), ["CSC101"])
+
+    def test_tokens_intersect(self):
+        self.assertEqual(self.codes("intro stat"), ["STA101"])
+        self.assertEqual(self.codes("programming python"), ["CSC102"])
+        self.assertEqual(self.codes("networks python"), [])
+        self.assertEqual(self.codes("   "), [])
+
+    def test_refreshes_after_course_save(self):
+        self.assertEqual(course_index.search("data", 10), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            make_course("CSC205", "Data Structures", level="200")
+        self.assertEqual(
+            [course["code"] for course in course_index.search("data", 10)], ["CSC205"]
+        )
 
-# Create your tests here.
+    def test_other_workers_catch_up(self):
+        self.assertEqual(self.codes("data"), [])
+        make_course("CSC205", "Data Structures", level="200")
+        # Another worker's version bump, in a cache this worker cannot see
+        with self.settings(COURSE_AUTOCOMPLETE_REFRESH_INTERVAL=3600):
+            self.assertEqual(self.codes("data"), [])
+            with mock.patch(
+                "apps.courses.autocomplete.time.monotonic",
+                return_value=time.monotonic() + self.index.max_age,
+            ):
+                self.assertEqual(self.codes("data"), ["CSC205"])
@@ -7,6 +7,14 @@ app_name = "courses"
 urlpatterns = [
     # Basic CRUD
     path("", views.CourseListView.as_view(), name="course-list"),
+    # Typeahead
+    path(
+        "autocomplete/",
+        views.CourseAutocompleteView.as_view(),
+        name="course-autocomplete",
+    ),
+    # Catalog snapshot
+    path("catalog/", views.CatalogSnapshotView.as_view(), name="course-catalog"),
     path("<str:code>/", views.CourseDetailView.as_view(), name="course-detail"),
     # Search and filter
     path("search/", views.CourseSearchView.as_view(), name="course-search"),
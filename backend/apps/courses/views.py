@@ -3,6 +3,11 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
+from .autocomplete import course_index
+from .cache import course_cache
+from .catalog import get_catalog, get_catalog_etag
 from .models import Course
 from .permissions import *
 from .serializers import (
@@ -78,10 +83,22 @@ class CourseDetailView(generics.RetrieveUpdateDestroyAPIView):
             permission_classes = permission_classes = [IsAdminUser | IsModerator]
         return [permission() for permission in permission_classes]
 
+    def get_object(self):
+        """Serve reads from the course cache, writes from the database"""
+        if self.request.method != "GET":
+            return super().get_object()
+
+        course = course_cache.get_by_code(self.kwargs[self.lookup_field])
+        if course is None:
+            raise Http404("No Course matches the given query.")
+        self.check_object_permissions(self.request, course)
+        return course
+
     def perform_destroy(self, instance):
         """Soft delete by marking as inactive"""
         instance.is_active = False
         instance.save()
+        course_cache.invalidate(instance)
 
     def destroy(self, request, *args, **kwargs):
         """Override to return custom response"""
@@ -197,3 +214,68 @@ class DepartmentListView(generics.ListAPIView):
         ]
 
         return Response(departments_list)
+
+
+class CourseCacheStatsView(APIView):
+    """
+    Get course cache hit/miss counters for this worker (admin only)
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(course_cache.stats())
+
+
+class CatalogSnapshotView(APIView):
+    """
+    Full course catalog (active courses plus faculty -> department -> level
+    tree) as one precompressed JSON document with an ETag
+    """
+
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        # Revalidation only needs the ETag, not the document
+        etag = get_catalog_etag()
+        if etag and etag in _if_none_match(request):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            snapshot = get_catalog()
+            body, encoding = snapshot.body_for(
+                request.META.get("HTTP_ACCEPT_ENCODING")
+            )
+            etag = snapshot.etag
+            response = HttpResponse(body, content_type="application/json")
+            if encoding:
+                response["Content-Encoding"] = encoding
+
+        response["ETag"] = etag
+        response["Cache-Control"] = "public, max-age=0, must-revalidate"
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
+
+class CourseAutocompleteView(APIView):
+    """
+    Course typeahead served from the in-memory prefix index
+    """
+
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, 50))
+
+        results = course_index.search(request.query_params.get("q", ""), limit)
+        return Response(results)
+
+
+def _if_none_match(request):
+    header = request.META.get("HTTP_IF_NONE_MATCH", "")
+    return {tag.strip() for tag in header.split(",") if tag.strip()}
@@ -1,4 +1,6 @@
 from django.contrib import admin
+from apps.analytics.metrics import REVIEWS
+from .fingerprints import sync_course
 from .models import PastQuestion, DownloadHistory
 
 
@@ -52,14 +54,20 @@ class PastQuestionAdmin(admin.ModelAdmin):
         ),
     )
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        sync_course(obj)
+
     def approve_selected(self, request, queryset):
         updated = queryset.update(status="approved", reviewed_by=request.user)
+        REVIEWS.inc(updated, decision="approved")
         self.message_user(request, f"{updated} past questions approved.")
 
     approve_selected.short_description = "Approve selected"
 
     def reject_selected(self, request, queryset):
         updated = queryset.update(status="rejected", reviewed_by=request.user)
+        REVIEWS.inc(updated, decision="rejected")
         self.message_user(request, f"{updated} past questions rejected.")
 
     reject_selected.short_description = "Reject selected"
@@ -0,0 +1,202 @@
+"""
+Extracted-text index for searching inside uploaded papers.
+
+After an upload commits, the PDF's text layer is pulled out with pypdf on
+the background pool and stored in ``PastQuestionContent`` keyed by the
+file's SHA-256, so re-runs skip unchanged files and identical re-uploads
+reuse the earlier extraction. On PostgreSQL searches use a GIN index over
+``to_tsvector('english', text)`` (migration 0003) with ``ts_headline``
+snippets; other databases fall back to substring matching and snippets
+built in Python.
+"""
+
+import hashlib
+import html
+import logging
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connection
+from django.db.models import Q
+
+from .models import PastQuestionContent
+from .tasks import run_in_background
+
+try:
+    from pypdf import PdfReader
+    from pypdf.errors import PyPdfError
+except ImportError:  # pypdf is optional; without it nothing is extracted
+    PdfReader = None
+    PyPdfError = Exception
+
+logger = logging.getLogger(__name__)
+
+# Must match the expression index created in migration 0003
+SEARCH_CONFIG = "english"
+# Control characters around matches, swapped for <mark> after escaping
+MARK_START, MARK_STOP = "\x02", "\x03"
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def file_sha256(field):
+    digest = hashlib.sha256()
+    with field.storage.open(field.name, "rb") as stored:
+        for chunk in iter(lambda: stored.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_text(fileobj):
+    """``(text, page_count)`` from a PDF's text layer"""
+    max_chars = getattr(settings, "CONTENT_MAX_CHARS", 200_000)
+    reader = PdfReader(fileobj)
+    parts, length = [], 0
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        parts.append(text)
+        length += len(text)
+        if length >= max_chars:
+            break
+    # PostgreSQL text columns cannot hold NUL characters
+    text = WHITESPACE_RE.sub(" ", " ".join(parts).replace("\x00", "")).strip()
+    return text[:max_chars], len(reader.pages)
+
+
+def update_content(past_question, force=False):
+    """Extract (or reuse) the text for one past question; returns the outcome"""
+    if past_question.file_type != "pdf":
+        return "skipped"
+    if PdfReader is None:
+        logger.warning("pypdf is not installed; skipping text extraction")
+        return "skipped"
+
+    try:
+        digest = file_sha256(past_question.file)
+    except FileNotFoundError:
+        return "failed"
+
+    existing = PastQuestionContent.objects.filter(past_question=past_question).first()
+    if existing is not None and existing.file_hash == digest and not force:
+        return "unchanged"
+
+    twin = (
+        PastQuestionContent.objects.filter(file_hash=digest)
+        .exclude(past_question=past_question)
+        .exclude(status="failed")
+        .first()
+    )
+    if twin is not None and not force:
+        text, page_count, status = twin.text, twin.page_count, twin.status
+    else:
+        try:
+            with past_question.file.storage.open(past_question.file.name, "rb") as f:
+                text, page_count = extract_text(f)
+            status = "extracted" if text else "empty"
+        except (PyPdfError, ValueError, OSError) as exc:
+            logger.warning(
+                "Could not extract text from past question %s: %s",
+                past_question.pk,
+                exc,
+            )
+            text, page_count, status = "", 0, "failed"
+
+    PastQuestionContent.objects.update_or_create(
+        past_question=past_question,
+        defaults={
+            "file_hash": digest,
+            "text": text,
+            "page_count": page_count,
+            "status": status,
+        },
+    )
+    return status
+
+
+def update_content_by_id(pk):
+    from .models import PastQuestion
+
+    past_question = PastQuestion.objects.filter(pk=pk).first()
+    if past_question is not None:
+        return update_content(past_question)
+
+
+def schedule_content_extraction(past_question):
+    """Queue text extraction for a PDF upload once it commits"""
+    if not getattr(settings, "CONTENT_EXTRACT_ON_UPLOAD", True):
+        return
+    if past_question.file_type == "pdf":
+        run_in_background(update_content_by_id, past_question.pk)
+
+
+def search_terms(query):
+    return [term for term in WHITESPACE_RE.split(query.strip()) if term][:10]
+
+
+def search_content(queryset, query):
+    """Past questions whose text matches ``query``, best first, with a
+    ``headline`` annotation on PostgreSQL"""
+    if connection.vendor == "postgresql":
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+        vector = SearchVector("content__text", config=SEARCH_CONFIG)
+        return (
+            queryset.annotate(search=vector)
+            .filter(search=search_query)
+            .annotate(
+                rank=SearchRank(vector, search_query),
+                headline=SearchHeadline(
+                    "content__text",
+                    search_query,
+                    config=SEARCH_CONFIG,
+                    start_sel=MARK_START,
+                    stop_sel=MARK_STOP,
+                    max_words=35,
+                    min_words=15,
+                    max_fragments=2,
+                ),
+            )
+            .order_by("-rank", "-year")
+        )
+
+    condition = Q()
+    for term in search_terms(query):
+        condition &= Q(content__text__icontains=term)
+    return queryset.filter(condition).select_related("content").order_by("-year")
+
+
+def python_headline(text, query, width=160):
+    """Window of ``text`` around the first match, with matches marked"""
+    terms = search_terms(query)
+    if not terms:
+        return ""
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    match = pattern.search(text)
+    if match is None:
+        return ""
+    start = max(0, match.start() - width // 2)
+    end = min(len(text), start + width)
+    snippet = pattern.sub(lambda m: MARK_START + m.group(0) + MARK_STOP, text[start:end])
+    return ("…" if start else "") + snippet + ("…" if end < len(text) else "")
+
+
+def render_snippet(headline):
+    """Escape a headline and turn the match markers into <mark> tags"""
+    return (
+        html.escape(headline)
+        .replace(MARK_START, "<mark>")
+        .replace(MARK_STOP, "</mark>")
+    )
+
+
+def snippet_for(past_question, query):
+    headline = getattr(past_question, "headline", None)
+    if headline is None:
+        content = getattr(past_question, "content", None)
+        headline = python_headline(content.text, query) if content else ""
+    return render_snippet(headline)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .models import PastQuestion
+
+# Facets that can be requested through ``?facets=``
+FACET_FIELDS = ["year", "semester", "exam_type", "has_solutions"]
+
+
+def _facet_sql(connection, source_sql, facets):
+    """
+    Build one grouped query over ``source_sql`` returning a row per
+    (facet, value) pair. Postgres uses GROUPING SETS, other backends a
+    UNION ALL of one GROUP BY per facet.
+    """
+    qn = connection.ops.quote_name
+    columns = [qn(facet) for facet in facets]
+
+    if connection.vendor == "postgresql":
+        grouping = ", ".join(f"GROUPING({column})" for column in columns)
+        sets = ", ".join(f"({column})" for column in columns)
+        sql = (
+            f"SELECT {', '.join(columns)}, {grouping}, COUNT(*) "
+            f"FROM ({source_sql}) facet_source "
+            f"GROUP BY GROUPING SETS ({sets})"
+        )
+        return sql, 1
+
+    branches = []
+    for index, column in enumerate(columns):
+        selected = [column if i == index else "NULL" for i in range(len(columns))]
+        branches.append(
+            f"SELECT {index}, {', '.join(selected)}, COUNT(*) "
+            f"FROM ({source_sql}) facet_source_{index} GROUP BY {column}"
+        )
+    return " UNION ALL ".join(branches), len(facets)
+
+
+def compute_facets(queryset, facets):
+    """
+    Count rows of ``queryset`` per value of each facet in a single query.
+
+    Returns ``{facet: [{"value": ..., "label": ..., "count": ...}, ...]}``.
+    """
+    facets = [facet for facet in FACET_FIELDS if facet in facets]
+    if not facets:
+        return {}
+
+    connection = connections[queryset.db]
+    source_sql, source_params = (
+        queryset.order_by().values(*facets).query.sql_with_params()
+    )
+    sql, repeat = _facet_sql(connection, source_sql, facets)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, list(source_params) * repeat)
+        rows = cursor.fetchall()
+
+    fields = {facet: PastQuestion._meta.get_field(facet) for facet in facets}
+    results = {facet: [] for facet in facets}
+    for row in rows:
+        if connection.vendor == "postgresql":
+            values = row[: len(facets)]
+            grouping = row[len(facets) : 2 * len(facets)]
+            index = list(grouping).index(0)
+        else:
+            index, values = row[0], row[1:-1]
+
+        facet = facets[index]
+        field = fields[facet]
+        value = field.to_python(values[index])
+        label = dict(field.flatchoices).get(value, value) if field.choices else value
+        results[facet].append({"value": value, "label": label, "count": row[-1]})
+
+    for facet, buckets in results.items():
+        if facet == "year":
+            buckets.sort(key=lambda bucket: bucket["value"], reverse=True)
+        else:
+            buckets.sort(key=lambda bucket: (-bucket["count"], str(bucket["value"])))
+    return results
+
+
+def get_facets(queryset, facets, filters):
+    """
+    Cached ``compute_facets``. ``filters`` are the normalized search
+    parameters that produced ``queryset`` and make up the cache key.
+    """
+    normalized = {
+        key: value
+        for key, value in sorted(filters.items())
+        if key != "facets" and value not in (None, "")
+    }
+    payload = json.dumps([normalized, sorted(facets)], sort_keys=True, default=str)
+    key = "past_questions:facets:" + hashlib.sha1(payload.encode()).hexdigest()
+
+    results = cache.get(key)
+    if results is None:
+        results = compute_facets(queryset, facets)
+        cache.set(key, results, getattr(settings, "SEARCH_FACETS_CACHE_TIMEOUT", 30))
+    return results
@@ -0,0 +1,210 @@
+"""
+Perceptual hashing for near-duplicate uploads.
+
+Re-photographed copies of the same paper differ byte for byte but shrink
+to nearly the same 8x8 thumbnails. aHash marks pixels brighter than the
+mean and dHash marks pixels brighter than their right-hand neighbour;
+copies of one page land within a few bits of each other.
+
+Candidates are looked up by exact match on any of the eight dHash bytes
+within the course (see ``PastQuestionFingerprint``), then confirmed by
+Hamming distance in Python.
+"""
+
+import io
+import logging
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Q
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import PastQuestion, PastQuestionFingerprint
+from .tasks import run_in_background
+
+try:
+    from pypdf import PdfReader
+    from pypdf.errors import PyPdfError
+except ImportError:  # pypdf is optional; PDFs are then not fingerprinted
+    PdfReader = None
+    PyPdfError = Exception
+
+logger = logging.getLogger(__name__)
+
+BITS = 64
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png"}
+
+
+def to_signed(value):
+    """Store an unsigned 64-bit hash in a signed BigIntegerField"""
+    return value - (1 << BITS) if value >= 1 << (BITS - 1) else value
+
+
+def hamming(a, b):
+    return ((a ^ b) & ((1 << BITS) - 1)).bit_count()
+
+
+def average_hash(image):
+    pixels = list(image.resize((8, 8), Image.Resampling.LANCZOS).getdata())
+    mean = sum(pixels) / len(pixels)
+    return reduce(lambda bits, pixel: (bits << 1) | (pixel > mean), pixels, 0)
+
+
+def difference_hash(image):
+    pixels = list(image.resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left, right = pixels[row * 9 + col], pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def bands(dhash):
+    count = PastQuestionFingerprint.BAND_COUNT
+    return [(dhash >> (8 * band)) & 0xFF for band in range(count)]
+
+
+def first_page_image(fileobj):
+    """Largest image embedded in a PDF's first page (a scanned page), or None"""
+    if PdfReader is None:
+        return None
+    reader = PdfReader(fileobj)
+    if not reader.pages:
+        return None
+    images = [item.image for item in reader.pages[0].images]
+    images = [image for image in images if image is not None]
+    if not images:
+        return None
+    return max(images, key=lambda image: image.width * image.height)
+
+
+def load_image(past_question):
+    field = past_question.file
+    with field.storage.open(field.name, "rb") as stored:
+        data = stored.read()
+    if past_question.file_type == "pdf":
+        image = first_page_image(io.BytesIO(data))
+    else:
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+    if image is None:
+        return None
+    # Crop the photo's border so framing differences matter less
+    grey = image.convert("L")
+    width, height = grey.size
+    margin_x, margin_y = width // 20, height // 20
+    return grey.crop((margin_x, margin_y, width - margin_x, height - margin_y))
+
+
+def fingerprint(past_question, retry=True):
+    """Hash one upload and store its fingerprint; returns it, or None"""
+    if past_question.file_type not in IMAGE_EXTENSIONS | {"pdf"}:
+        return None
+    try:
+        image = load_image(past_question)
+    except FileNotFoundError:
+        if not retry:
+            return None
+        # Scan optimisation may have just swapped the file; use the new one
+        past_question.refresh_from_db(fields=["file"])
+        return fingerprint(past_question, retry=False)
+    except (UnidentifiedImageError, OSError, PyPdfError, ValueError) as exc:
+        logger.warning(
+            "Could not fingerprint past question %s: %s", past_question.pk, exc
+        )
+        return None
+    if image is None:
+        return None
+
+    ahash, dhash = average_hash(image), difference_hash(image)
+    values = {
+        "course_id": past_question.course_id,
+        "ahash": to_signed(ahash),
+        "dhash": to_signed(dhash),
+        **{f"band{band}": value for band, value in enumerate(bands(dhash))},
+    }
+    fp, _ = PastQuestionFingerprint.objects.update_or_create(
+        past_question=past_question, defaults=values
+    )
+    return fp
+
+
+def fingerprint_by_id(pk):
+    past_question = PastQuestion.objects.filter(pk=pk).first()
+    if past_question is not None:
+        return fingerprint(past_question)
+
+
+def sync_course(past_question):
+    """Move the fingerprint along when its past question changes course,
+    so candidate lookups keep using the course-scoped band indexes"""
+    PastQuestionFingerprint.objects.filter(past_question=past_question).exclude(
+        course_id=past_question.course_id
+    ).update(course_id=past_question.course_id)
+
+
+def schedule_fingerprint(past_question):
+    """Queue perceptual hashing of an upload once it commits"""
+    if past_question.file_type in IMAGE_EXTENSIONS | {"pdf"}:
+        run_in_background(fingerprint_by_id, past_question.pk)
+
+
+def _candidate_filter(fp):
+    unsigned = fp.dhash & ((1 << BITS) - 1)
+    any_band = reduce(
+        or_,
+        (Q(**{f"band{band}": value}) for band, value in enumerate(bands(unsigned))),
+    )
+    return Q(course_id=fp.course_id) & any_band
+
+
+def _matches(fp, candidates, max_distance):
+    ahash_limit = getattr(settings, "PHASH_AHASH_MAX_DISTANCE", 10)
+    matches = []
+    for other in candidates:
+        if other.past_question_id == fp.past_question_id:
+            continue
+        distance = hamming(fp.dhash, other.dhash)
+        if distance <= max_distance and hamming(fp.ahash, other.ahash) <= ahash_limit:
+            matches.append((other.past_question_id, distance))
+    return sorted(matches, key=lambda match: match[1])
+
+
+def find_similar(fp, max_distance=None, statuses=None):
+    """``[(past_question_id, distance)]`` near ``fp`` in the same course"""
+    if max_distance is None:
+        max_distance = getattr(settings, "PHASH_MAX_DISTANCE", 7)
+    candidates = PastQuestionFingerprint.objects.filter(_candidate_filter(fp))
+    if statuses is not None:
+        candidates = candidates.filter(past_question__status__in=statuses)
+    candidates = candidates.only("past_question_id", "ahash", "dhash")
+    return _matches(fp, candidates, max_distance)
+
+
+def find_duplicates(past_question_ids, max_distance=None):
+    """Near-duplicates for several past questions with two queries,
+    as ``{past_question_id: [(other_id, distance)]}``"""
+    if max_distance is None:
+        max_distance = getattr(settings, "PHASH_MAX_DISTANCE", 7)
+    fingerprints = list(
+        PastQuestionFingerprint.objects.filter(past_question_id__in=past_question_ids)
+    )
+    if not fingerprints:
+        return {}
+    candidates = list(
+        PastQuestionFingerprint.objects.filter(
+            reduce(or_, (_candidate_filter(fp) for fp in fingerprints))
+        )
+        .exclude(past_question__status="rejected")
+        .only("past_question_id", "course_id", "ahash", "dhash")
+    )
+    return {
+        fp.past_question_id: _matches(
+            fp,
+            (other for other in candidates if other.course_id == fp.course_id),
+            max_distance,
+        )
+        for fp in fingerprints
+    }
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.past_questions.uploads import cleanup_intents
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete upload intents that were never finalised, and their files. "
+        "Run it from cron, e.g. hourly"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Count without deleting"
+        )
+
+    def handle(self, *args, **options):
+        removed = cleanup_intents(dry_run=options["dry_run"])
+        prefix = "Would remove" if options["dry_run"] else "Removed"
+        self.stdout.write(self.style.SUCCESS(f"{prefix} {removed} abandoned uploads"))
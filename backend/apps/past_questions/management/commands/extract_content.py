@@ -0,0 +1,43 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from apps.past_questions.content import update_content
+from apps.past_questions.models import PastQuestion
+
+
+class Command(BaseCommand):
+    help = (
+        "Extract the text of PDF uploads for content search; files whose "
+        "hash is unchanged are skipped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("ids", nargs="*", type=int, help="Only these past questions")
+        parser.add_argument(
+            "--force", action="store_true", help="Re-extract even if unchanged"
+        )
+        parser.add_argument("--limit", type=int)
+
+    def handle(self, *args, **options):
+        queryset = PastQuestion.objects.filter(file_name__iendswith=".pdf").order_by(
+            "pk"
+        )
+        if options["ids"]:
+            queryset = queryset.filter(pk__in=options["ids"])
+        if options["limit"]:
+            queryset = queryset[: options["limit"]]
+
+        outcomes = Counter()
+        for past_question in queryset.iterator(chunk_size=200):
+            outcome = update_content(past_question, force=options["force"])
+            outcomes[outcome] += 1
+            if options["verbosity"] > 1:
+                self.stdout.write(f"#{past_question.pk}: {outcome}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                ", ".join(f"{count} {outcome}" for outcome, count in outcomes.items())
+                or "Nothing to extract"
+            )
+        )
@@ -0,0 +1,42 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.past_questions.fingerprints import fingerprint
+from apps.past_questions.models import PastQuestion
+
+
+class Command(BaseCommand):
+    help = "Compute perceptual hashes for uploads that do not have one yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument("ids", nargs="*", type=int, help="Only these past questions")
+        parser.add_argument(
+            "--force", action="store_true", help="Recompute existing fingerprints"
+        )
+        parser.add_argument("--limit", type=int)
+
+    def handle(self, *args, **options):
+        queryset = PastQuestion.objects.filter(
+            Q(file_name__iendswith=".pdf")
+            | Q(file_name__iendswith=".jpg")
+            | Q(file_name__iendswith=".jpeg")
+            | Q(file_name__iendswith=".png")
+        ).order_by("pk")
+        if options["ids"]:
+            queryset = queryset.filter(pk__in=options["ids"])
+        if not options["force"]:
+            queryset = queryset.filter(fingerprint__isnull=True)
+        if options["limit"]:
+            queryset = queryset[: options["limit"]]
+
+        outcomes = Counter()
+        for past_question in queryset.iterator(chunk_size=200):
+            outcomes["hashed" if fingerprint(past_question) else "skipped"] += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{outcomes['hashed']} fingerprinted, {outcomes['skipped']} skipped"
+            )
+        )
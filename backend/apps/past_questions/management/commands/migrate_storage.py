@@ -0,0 +1,109 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.files.storage import InvalidStorageError, storages
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.past_questions.models import PastQuestion
+from apps.past_questions.storage import STORAGE_ALIAS, is_sharded
+
+
+def copy_file(source, destination, name):
+    """Copy one file; returns ``(status, new_name, size)``. No database access,
+    so it is safe to run on worker threads."""
+    if is_sharded(name) and destination.exists(name):
+        return "present", name, 0
+    try:
+        with source.open(name, "rb") as stored:
+            new_name = destination.save(name, stored)
+    except FileNotFoundError:
+        return "missing", name, 0
+    size = destination.size(new_name)
+    if size != source.size(name):
+        destination.delete(new_name)
+        return "failed", name, 0
+    return "copied", new_name, size
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy past-question files from another storage into "
+        f'STORAGES["{STORAGE_ALIAS}"] and repoint the rows'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from",
+            dest="source",
+            default="default",
+            help="STORAGES alias the files currently live in (default: default)",
+        )
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--limit", type=int)
+        parser.add_argument(
+            "--delete-source",
+            action="store_true",
+            help="Delete each source file once its row points at the copy",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            source = storages[options["source"]]
+        except InvalidStorageError as exc:
+            raise CommandError(str(exc))
+        destination = storages[STORAGE_ALIAS]
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1")
+
+        rows = PastQuestion.objects.exclude(file="").order_by("pk").values_list(
+            "pk", "file"
+        )
+        if options["limit"]:
+            rows = rows[: options["limit"]]
+        rows = rows.iterator(chunk_size=500)
+
+        totals = {"copied": 0, "present": 0, "missing": 0, "failed": 0}
+        copied_bytes = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            # Bounded batches keep memory flat on large tables
+            while batch := list(islice(rows, options["workers"] * 4)):
+                futures = [
+                    (pk, name, executor.submit(copy_file, source, destination, name))
+                    for pk, name in batch
+                ]
+                for pk, name, future in futures:
+                    status, new_name, size = future.result()
+                    if status == "copied" and not self.repoint(
+                        pk, name, new_name, source, destination, options
+                    ):
+                        status = "failed"
+                    totals[status] += 1
+                    copied_bytes += size if status == "copied" else 0
+                    if status in ("missing", "failed"):
+                        self.stdout.write(self.style.ERROR(f"#{pk}: {status} {name}"))
+
+        elapsed = time.perf_counter() - started
+        rate = copied_bytes / elapsed / 1024 / 1024 if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{totals['copied']} copied ({copied_bytes / 1024 / 1024:.1f}MB, "
+                f"{rate:.1f}MB/s), {totals['present']} already in place, "
+                f"{totals['missing']} missing, {totals['failed']} failed "
+                f"in {elapsed:.1f}s"
+            )
+        )
+
+    def repoint(self, pk, name, new_name, source, destination, options):
+        with transaction.atomic():
+            updated = PastQuestion.objects.filter(pk=pk, file=name).update(
+                file=new_name
+            )
+            if updated and options["delete_source"]:
+                transaction.on_commit(lambda: source.delete(name))
+        if not updated:
+            # The row moved on (new upload, optimisation) while we copied
+            destination.delete(new_name)
+        return bool(updated)
@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.past_questions.models import PastQuestion
+from apps.past_questions.optimization import optimize_past_question
+
+
+def _size(num_bytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(num_bytes) < 1024 or unit == "GB":
+            return f"{num_bytes:.1f}{unit}" if unit != "B" else f"{num_bytes}B"
+        num_bytes /= 1024
+
+
+class Command(BaseCommand):
+    help = "Recompress scanned image uploads and report the bytes saved"
+
+    def add_arguments(self, parser):
+        parser.add_argument("ids", nargs="*", type=int, help="Only these past questions")
+        parser.add_argument(
+            "--all-images",
+            action="store_true",
+            help="Include image uploads not marked as scanned",
+        )
+        parser.add_argument("--limit", type=int)
+        parser.add_argument("--quality", type=int, help="JPEG quality override")
+        parser.add_argument(
+            "--pdf", action="store_true", help="Bundle each scan into a PDF"
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Report savings without writing"
+        )
+
+    def handle(self, *args, **options):
+        queryset = PastQuestion.objects.filter(optimized_at__isnull=True).filter(
+            Q(file_name__iendswith=".jpg")
+            | Q(file_name__iendswith=".jpeg")
+            | Q(file_name__iendswith=".png")
+        )
+        if options["ids"]:
+            queryset = queryset.filter(pk__in=options["ids"])
+        if not options["all_images"]:
+            queryset = queryset.filter(is_scanned=True)
+        queryset = queryset.order_by("pk")
+        if options["limit"]:
+            queryset = queryset[: options["limit"]]
+
+        totals = {"optimized": 0, "skipped": 0, "failed": 0}
+        original_bytes = optimized_bytes = 0
+        for past_question in queryset.iterator(chunk_size=200):
+            result = optimize_past_question(
+                past_question,
+                quality=options["quality"],
+                to_pdf=options["pdf"] or None,
+                dry_run=options["dry_run"],
+            )
+            totals[result.status] += 1
+            line = f"#{result.pk}: {result.status}"
+            if result.status == "optimized":
+                original_bytes += result.original_size
+                optimized_bytes += result.optimized_size
+                pct = result.saved / result.original_size * 100
+                line += (
+                    f" {_size(result.original_size)} -> "
+                    f"{_size(result.optimized_size)} (-{pct:.0f}%)"
+                )
+            if result.detail:
+                line += f" ({result.detail})"
+            style = self.style.ERROR if result.status == "failed" else str
+            self.stdout.write(style(line))
+
+        saved = original_bytes - optimized_bytes
+        pct = saved / original_bytes * 100 if original_bytes else 0
+        prefix = "Would save" if options["dry_run"] else "Saved"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix} {_size(saved)} of {_size(original_bytes)} ({pct:.0f}%) "
+                f"across {totals['optimized']} files; "
+                f"{totals['skipped']} skipped, {totals['failed']} failed"
+            )
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('past_questions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pastquestion',
+            name='original_file_size',
+            field=models.IntegerField(default=0, help_text='Size in bytes before scan optimisation', verbose_name='original file size'),
+        ),
+        migrations.AddField(
+            model_name='pastquestion',
+            name='optimized_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='optimised at'),
+        ),
+    ]
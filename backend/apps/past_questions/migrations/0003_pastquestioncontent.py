@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Matches SearchVector("content__text", config="english") so searches use it
+CREATE_SEARCH_INDEX = """
+CREATE INDEX IF NOT EXISTS past_questions_content_search_idx
+ON past_questions_pastquestioncontent
+USING gin (to_tsvector('english'::regconfig, COALESCE(text, ''::text)))
+"""
+DROP_SEARCH_INDEX = "DROP INDEX IF EXISTS past_questions_content_search_idx"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_SEARCH_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('past_questions', '0002_pastquestion_original_file_size_optimized_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PastQuestionContent',
+            fields=[
+                ('past_question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='content', serialize=False, to='past_questions.pastquestion')),
+                ('file_hash', models.CharField(db_index=True, help_text='SHA-256 of the file', max_length=64, verbose_name='file hash')),
+                ('text', models.TextField(blank=True, verbose_name='text')),
+                ('page_count', models.IntegerField(default=0, verbose_name='page count')),
+                ('status', models.CharField(choices=[('extracted', 'Extracted'), ('empty', 'No text layer'), ('failed', 'Failed')], default='extracted', max_length=20, verbose_name='status')),
+                ('extracted_at', models.DateTimeField(auto_now=True, verbose_name='extracted at')),
+            ],
+            options={
+                'verbose_name': 'past question content',
+                'verbose_name_plural': 'past question contents',
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
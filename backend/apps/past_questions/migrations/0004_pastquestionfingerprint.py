@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_course_course_past_questions'),
+        ('past_questions', '0003_pastquestioncontent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PastQuestionFingerprint',
+            fields=[
+                ('past_question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='past_questions.pastquestion')),
+                ('ahash', models.BigIntegerField(verbose_name='average hash')),
+                ('dhash', models.BigIntegerField(verbose_name='difference hash')),
+                ('band0', models.SmallIntegerField()),
+                ('band1', models.SmallIntegerField()),
+                ('band2', models.SmallIntegerField()),
+                ('band3', models.SmallIntegerField()),
+                ('band4', models.SmallIntegerField()),
+                ('band5', models.SmallIntegerField()),
+                ('band6', models.SmallIntegerField()),
+                ('band7', models.SmallIntegerField()),
+                ('created_at', models.DateTimeField(auto_now=True, verbose_name='created at')),
+                ('course', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courses.course')),
+            ],
+            options={
+                'verbose_name': 'past question fingerprint',
+                'verbose_name_plural': 'past question fingerprints',
+                'indexes': [models.Index(fields=['course', 'band0'], name='pq_fp_course_band0'), models.Index(fields=['course', 'band1'], name='pq_fp_course_band1'), models.Index(fields=['course', 'band2'], name='pq_fp_course_band2'), models.Index(fields=['course', 'band3'], name='pq_fp_course_band3'), models.Index(fields=['course', 'band4'], name='pq_fp_course_band4'), models.Index(fields=['course', 'band5'], name='pq_fp_course_band5'), models.Index(fields=['course', 'band6'], name='pq_fp_course_band6'), models.Index(fields=['course', 'band7'], name='pq_fp_course_band7')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-19 12:00
+
+import apps.past_questions.storage
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('past_questions', '0004_pastquestionfingerprint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pastquestion',
+            name='file',
+            field=models.FileField(help_text='PDF or Image files only (max 10MB)', storage=apps.past_questions.storage.past_question_storage, upload_to='past_questions/%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'jpg', 'jpeg', 'png'])], verbose_name='file'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('past_questions', '0006_uploadintent'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pastquestion',
+            name='past_questi_status_759353_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='pastquestion',
+            name='past_questi_uploade_d49ce3_idx',
+        ),
+        migrations.AddIndex(
+            model_name='pastquestion',
+            index=models.Index(condition=models.Q(('status', 'approved')), fields=['-year', '-uploaded_at'], name='pq_approved_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pastquestion',
+            index=models.Index(condition=models.Q(('status', 'approved')), fields=['-uploaded_at'], name='pq_approved_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pastquestion',
+            index=models.Index(condition=models.Q(('status', 'approved')), fields=['-download_count'], name='pq_approved_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pastquestion',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['uploaded_at'], name='pq_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pastquestion',
+            index=models.Index(fields=['uploaded_by', '-uploaded_at'], name='pq_uploader_recent_idx'),
+        ),
+    ]
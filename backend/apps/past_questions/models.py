@@ -1,8 +1,11 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
 from django.utils.translation import gettext_lazy as _
 from apps.courses.models import Course
+from .storage import past_question_storage
 
 
 class PastQuestion(models.Model):
@@ -65,6 +68,7 @@ class PastQuestion(models.Model):
     file = models.FileField(
         _("file"),
         upload_to="past_questions/%Y/%m/%d/",
+        storage=past_question_storage,
         validators=[
             FileExtensionValidator(allowed_extensions=["pdf", "jpg", "jpeg", "png"])
         ],
@@ -78,6 +82,14 @@ class PastQuestion(models.Model):
 
     file_name = models.CharField(_("original filename"), max_length=255, blank=True)
 
+    original_file_size = models.IntegerField(
+        _("original file size"),
+        default=0,
+        help_text=_("Size in bytes before scan optimisation"),
+    )
+
+    optimized_at = models.DateTimeField(_("optimised at"), null=True, blank=True)
+
     # --- Upload Info ---
     uploaded_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -142,10 +154,38 @@ class PastQuestion(models.Model):
         ordering = ["-uploaded_at"]
         verbose_name = _("past question")
         verbose_name_plural = _("past questions")
+        # Partial indexes match the endpoints' filter and ORDER BY exactly,
+        # so pages are read in index order without a sort (see tests.py)
         indexes = [
-            models.Index(fields=["status", "uploaded_at"]),
+            # List and search-by-year: approved, -year, -uploaded_at
+            models.Index(
+                fields=["-year", "-uploaded_at"],
+                condition=models.Q(status="approved"),
+                name="pq_approved_year_idx",
+            ),
+            # Search: approved, newest first (Meta.ordering)
+            models.Index(
+                fields=["-uploaded_at"],
+                condition=models.Q(status="approved"),
+                name="pq_approved_recent_idx",
+            ),
+            # Popular: approved, -download_count
+            models.Index(
+                fields=["-download_count"],
+                condition=models.Q(status="approved"),
+                name="pq_approved_popular_idx",
+            ),
+            # Review queue: pending, oldest first
+            models.Index(
+                fields=["uploaded_at"],
+                condition=models.Q(status="pending"),
+                name="pq_pending_idx",
+            ),
+            # My uploads: uploaded_by, -uploaded_at
+            models.Index(
+                fields=["uploaded_by", "-uploaded_at"], name="pq_uploader_recent_idx"
+            ),
             models.Index(fields=["course", "year", "semester"]),
-            models.Index(fields=["uploaded_by"]),
         ]
         unique_together = ["course", "year", "semester", "exam_type", "file_name"]
 
@@ -207,3 +247,130 @@ class DownloadHistory(models.Model):
 
     def __str__(self):
         return f"{self.user.index_number} downloaded {self.past_question}"
+
+
+class PastQuestionContent(models.Model):
+    """Text layer extracted from an uploaded PDF, for full-text search"""
+
+    STATUS_CHOICES = [
+        ("extracted", "Extracted"),
+        ("empty", "No text layer"),
+        ("failed", "Failed"),
+    ]
+
+    past_question = models.OneToOneField(
+        PastQuestion,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="content",
+    )
+    file_hash = models.CharField(
+        _("file hash"), max_length=64, db_index=True, help_text=_("SHA-256 of the file")
+    )
+    text = models.TextField(_("text"), blank=True)
+    page_count = models.IntegerField(_("page count"), default=0)
+    status = models.CharField(
+        _("status"), max_length=20, choices=STATUS_CHOICES, default="extracted"
+    )
+    extracted_at = models.DateTimeField(_("extracted at"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("past question content")
+        verbose_name_plural = _("past question contents")
+
+    def __str__(self):
+        return f"Content of {self.past_question_id} ({self.page_count} pages)"
+
+
+class PastQuestionFingerprint(models.Model):
+    """
+    Perceptual hashes of an upload's image (or first PDF page image).
+
+    ``dhash`` is split into eight one-byte bands, each indexed together with
+    the course, so any two hashes within Hamming distance 7 share at least
+    one band and near-duplicates are found with indexed equality lookups.
+    """
+
+    BAND_COUNT = 8
+
+    past_question = models.OneToOneField(
+        PastQuestion,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="fingerprint",
+    )
+    course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    ahash = models.BigIntegerField(_("average hash"))
+    dhash = models.BigIntegerField(_("difference hash"))
+    band0 = models.SmallIntegerField()
+    band1 = models.SmallIntegerField()
+    band2 = models.SmallIntegerField()
+    band3 = models.SmallIntegerField()
+    band4 = models.SmallIntegerField()
+    band5 = models.SmallIntegerField()
+    band6 = models.SmallIntegerField()
+    band7 = models.SmallIntegerField()
+    created_at = models.DateTimeField(_("created at"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("past question fingerprint")
+        verbose_name_plural = _("past question fingerprints")
+        indexes = [
+            models.Index(
+                fields=["course", f"band{band}"], name=f"pq_fp_course_band{band}"
+            )
+            for band in range(8)
+        ]
+
+    def __str__(self):
+        return f"Fingerprint of {self.past_question_id}"
+
+
+class UploadIntent(models.Model):
+    """
+    A slot for uploading a file straight to storage.
+
+    The client PUTs the file to ``key`` with a signed URL, then finalises
+    the intent, which checks the stored file against the declared size and
+    SHA-256 and creates the past question. Intents left pending past their
+    expiry are removed by ``cleanup_uploads``.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("completed", "Completed"),
+    ]
+
+    token = models.UUIDField(_("token"), default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="upload_intents",
+    )
+    file_name = models.CharField(_("file name"), max_length=255)
+    key = models.CharField(_("storage key"), max_length=100, unique=True)
+    size = models.IntegerField(_("size"), help_text=_("Declared size in bytes"))
+    sha256 = models.CharField(_("SHA-256"), max_length=64)
+    status = models.CharField(
+        _("status"), max_length=20, choices=STATUS_CHOICES, default="pending"
+    )
+    past_question = models.OneToOneField(
+        PastQuestion,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="upload_intent",
+    )
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    expires_at = models.DateTimeField(_("expires at"))
+    completed_at = models.DateTimeField(_("completed at"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("upload intent")
+        verbose_name_plural = _("upload intents")
+        indexes = [models.Index(fields=["status", "expires_at"])]
+
+    def __str__(self):
+        return f"Upload {self.token} by {self.user_id} ({self.status})"
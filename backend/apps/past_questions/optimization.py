@@ -0,0 +1,220 @@
+"""
+Recompression of scanned image uploads.
+
+Phone photos of exam papers are re-encoded with Pillow, near-losslessly:
+exam papers are mostly small print, which chroma subsampling and low JPEG
+quality smear. Orientation is applied, colour is dropped when the page is
+effectively grayscale, JPEGs are re-encoded at ``SCAN_JPEG_QUALITY``
+(92 by default) without chroma subsampling and PNGs are losslessly
+optimised. Scans are only downscaled when ``SCAN_MAX_DIMENSION`` is set.
+With ``SCAN_CONVERT_TO_PDF`` the result is wrapped in a single-page PDF
+instead.
+
+The optimised file is written next to the original and read back and
+decoded before the row is switched over; the original is deleted only
+after that change commits. PDF uploads are left as they are.
+"""
+
+import io
+import logging
+import os
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from PIL import Image, ImageChops, ImageOps, UnidentifiedImageError
+
+from .models import PastQuestion
+from .tasks import run_in_background
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png"}
+
+
+@dataclass
+class OptimizationResult:
+    pk: int
+    status: str
+    original_size: int = 0
+    optimized_size: int = 0
+    detail: str = ""
+
+    @property
+    def saved(self):
+        if self.status != "optimized":
+            return 0
+        return self.original_size - self.optimized_size
+
+
+def is_grayscale(image, tolerance=None, max_colour_ratio=0.005):
+    """Whether nearly every pixel has (almost) equal R, G and B"""
+    if image.mode in ("1", "L", "LA", "I", "F"):
+        return True
+    if tolerance is None:
+        tolerance = getattr(settings, "SCAN_GRAYSCALE_TOLERANCE", 24)
+
+    sample = image.convert("RGB")
+    sample.thumbnail((256, 256))
+    red, green, blue = sample.split()
+    spread = ImageChops.lighter(
+        ImageChops.difference(red, green), ImageChops.difference(green, blue)
+    )
+    histogram = spread.histogram()
+    coloured = sum(histogram[tolerance + 1 :])
+    return coloured <= max_colour_ratio * sum(histogram)
+
+
+def encode_scan(data, extension, quality=None, to_pdf=None):
+    """Optimised bytes and their extension for one scanned image"""
+    quality = quality or getattr(settings, "SCAN_JPEG_QUALITY", 92)
+    if to_pdf is None:
+        to_pdf = getattr(settings, "SCAN_CONVERT_TO_PDF", False)
+    max_dimension = getattr(settings, "SCAN_MAX_DIMENSION", 0)
+
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.load()
+
+    if max_dimension and max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+    if image.mode in ("RGBA", "LA", "P"):
+        # Scans have no meaningful transparency; flatten onto white
+        rgba = image.convert("RGBA")
+        image = Image.new("RGB", rgba.size, "white")
+        image.paste(rgba, mask=rgba.getchannel("A"))
+    image = image.convert("L" if is_grayscale(image) else "RGB")
+
+    output = io.BytesIO()
+    if to_pdf:
+        image.save(output, "PDF", quality=quality, resolution=300.0)
+        return output.getvalue(), "pdf"
+    if extension == "png":
+        image.save(output, "PNG", optimize=True)
+        return output.getvalue(), "png"
+    image.save(
+        output,
+        "JPEG",
+        quality=quality,
+        optimize=True,
+        progressive=True,
+        # Full-resolution colour keeps red marking and coloured ink legible
+        subsampling=0,
+    )
+    return output.getvalue(), extension
+
+
+def verify(storage, name, data, extension):
+    """Read the stored file back and make sure it is intact and decodable"""
+    with storage.open(name, "rb") as stored:
+        content = stored.read()
+    if content != data:
+        return False
+    if extension == "pdf":
+        return content.startswith(b"%PDF") and b"%%EOF" in content[-1024:]
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image.verify()
+        with Image.open(io.BytesIO(content)) as image:
+            image.load()
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        return False
+    return True
+
+
+def optimize_past_question(past_question, quality=None, to_pdf=None, dry_run=False):
+    extension = past_question.file_type
+    result = OptimizationResult(pk=past_question.pk, status="skipped")
+    if extension not in IMAGE_EXTENSIONS:
+        result.detail = f"{extension or 'unknown'} files are not recompressed"
+        return result
+    if past_question.optimized_at is not None:
+        result.detail = "already optimised"
+        return result
+
+    field = past_question.file
+    storage = field.storage
+    old_name = field.name
+    try:
+        with storage.open(old_name, "rb") as stored:
+            original = stored.read()
+    except FileNotFoundError:
+        result.status, result.detail = "failed", "file missing"
+        return result
+    result.original_size = len(original)
+
+    try:
+        data, new_extension = encode_scan(original, extension, quality, to_pdf)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        result.status, result.detail = "failed", f"unreadable image: {exc}"
+        return result
+    result.optimized_size = len(data)
+
+    min_saving = getattr(settings, "SCAN_MIN_SAVING", 0.05)
+    if len(data) > len(original) * (1 - min_saving):
+        result.detail = "no worthwhile saving"
+        return result
+    if dry_run:
+        result.status = "optimized"
+        return result
+
+    base = os.path.splitext(os.path.basename(old_name))[0]
+    new_name = storage.save(
+        f"{os.path.dirname(old_name)}/{base}-opt.{new_extension}", ContentFile(data)
+    )
+    if not verify(storage, new_name, data, new_extension):
+        storage.delete(new_name)
+        result.status, result.detail = "failed", "optimised file failed verification"
+        return result
+
+    file_name = past_question.file_name
+    if new_extension != extension:
+        file_name = f"{os.path.splitext(file_name)[0]}.{new_extension}"
+    try:
+        with transaction.atomic():
+            updated = PastQuestion.objects.filter(
+                pk=past_question.pk, file=old_name
+            ).update(
+                file=new_name,
+                file_name=file_name,
+                file_size=len(data),
+                original_file_size=len(original),
+                optimized_at=timezone.now(),
+            )
+            if updated:
+                transaction.on_commit(lambda: storage.delete(old_name))
+    except IntegrityError as exc:
+        updated = 0
+        result.detail = str(exc)
+    if not updated:
+        # The file was replaced meanwhile (or the new name clashes); keep it
+        storage.delete(new_name)
+        result.status = "failed"
+        result.detail = result.detail or "file changed during optimisation"
+        return result
+
+    result.status = "optimized"
+    logger.info(
+        "Optimised past question %s: %d -> %d bytes",
+        past_question.pk,
+        len(original),
+        len(data),
+    )
+    return result
+
+
+def optimize_past_question_by_id(pk):
+    past_question = PastQuestion.objects.filter(pk=pk).first()
+    if past_question is not None:
+        return optimize_past_question(past_question)
+
+
+def schedule_scan_optimization(past_question):
+    """Queue a scanned image upload for recompression after it commits"""
+    if not getattr(settings, "SCAN_OPTIMIZE_ON_UPLOAD", True):
+        return
+    if past_question.is_scanned and past_question.file_type in IMAGE_EXTENSIONS:
+        run_in_background(optimize_past_question_by_id, past_question.pk)
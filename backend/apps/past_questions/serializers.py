@@ -1,21 +1,36 @@
 from rest_framework import serializers
+from django.core.exceptions import SuspiciousFileOperation
 from django.core.validators import FileExtensionValidator
-from .models import PastQuestion, DownloadHistory
+from django.utils.text import get_valid_filename
+from .models import PastQuestion, DownloadHistory, UploadIntent
 from apps.courses.models import Course
-from apps.courses.serializers import CourseSerializer
+from apps.courses.serializers import CachedCourseRelatedField, CourseSerializer
 from apps.users.serializers import UserProfileSerializer
+from config.compiled import ValuesSerializer
+from config.fieldsets import SparseFieldsSerializerMixin
 
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+ALLOWED_FILE_TYPES = ["pdf", "jpg", "jpeg", "png"]
 
-class PastQuestionSerializer(serializers.ModelSerializer):
-    """Serializer for Past Question model"""
+
+class PastQuestionSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    """Serializer for Past Question model
+
+    ``course`` and ``uploaded_by`` are primary keys unless expanded (see
+    ``config.fieldsets``); the flat ``course_code``, ``course_title`` and
+    ``uploaded_by_name`` are always available.
+    """
 
     # Related fields
-    course = CourseSerializer(read_only=True)
-    course_id = serializers.PrimaryKeyRelatedField(
-        queryset=Course.objects.all(), source="course", write_only=True
-    )
+    course = serializers.PrimaryKeyRelatedField(read_only=True)
+    course_id = CachedCourseRelatedField(source="course", write_only=True)
+    course_code = serializers.CharField(source="course.code", read_only=True)
+    course_title = serializers.CharField(source="course.title", read_only=True)
 
-    uploaded_by = UserProfileSerializer(read_only=True)
+    uploaded_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    uploaded_by_name = serializers.CharField(
+        source="uploaded_by.get_full_name", read_only=True
+    )
 
     semester_display = serializers.CharField(
         source="get_semester_display", read_only=True
@@ -33,6 +48,8 @@ class PastQuestionSerializer(serializers.ModelSerializer):
             "id",
             "course",
             "course_id",
+            "course_code",
+            "course_title",
             "year",
             "semester",
             "semester_display",
@@ -45,6 +62,7 @@ class PastQuestionSerializer(serializers.ModelSerializer):
             "file_size",
             "file_type",
             "uploaded_by",
+            "uploaded_by_name",
             "uploaded_at",
             "status",
             "status_display",
@@ -70,6 +88,19 @@ class PastQuestionSerializer(serializers.ModelSerializer):
             "status",
             "quality_rating",
         ]
+        expandable_fields = {
+            "course": CourseSerializer,
+            "uploaded_by": UserProfileSerializer,
+        }
+        # Columns read by fields whose source is not a model field
+        field_sources = {
+            "semester_display": ["semester"],
+            "exam_type_display": ["exam_type"],
+            "status_display": ["status"],
+            "file_url": ["file"],
+            "file_type": ["file_name"],
+            "uploaded_by_name": ["uploaded_by__first_name", "uploaded_by__last_name"],
+        }
 
     def get_file_url(self, obj):
         """Get absolute URL for file"""
@@ -92,22 +123,77 @@ class PastQuestionSerializer(serializers.ModelSerializer):
 
     def validate_file(self, value):
         """Validate file size and type"""
-        # Size validation (10MB max)
-        max_size = 10 * 1024 * 1024  # 10MB
-        if value.size > max_size:
-            raise serializers.ValidationError(
-                f"File too large. Max size is {max_size // (1024*1024)}MB"
-            )
+        validate_upload(value.name, value.size)
+        return value
 
-        # Type validation
-        allowed_types = ["pdf", "jpg", "jpeg", "png"]
-        ext = value.name.split(".")[-1].lower()
-        if ext not in allowed_types:
-            raise serializers.ValidationError(
-                f"File type not allowed. Allowed: {', '.join(allowed_types)}"
+
+class PastQuestionValuesSerializer(ValuesSerializer):
+    """``PastQuestionSerializer`` output from ``.values_list()`` rows, for
+    the hot list endpoints"""
+
+    serializer_class = PastQuestionSerializer
+
+    def compile_field(self, name, field, column):
+        if name == "file_url":
+            # get_file_url(): the absolute URL, or None without a request
+            if self.context.get("request") is None:
+                return lambda row: None
+            return self.compile_file(
+                serializers.FileField(use_url=True),
+                self.model._meta.get_field("file").storage,
+                column("file"),
             )
+        if name == "file_type":
+            index = column("file_name")
+            return lambda row: row[index].split(".")[-1].lower() if row[index] else ""
+        if name == "uploaded_by_name":
+            first = column("uploaded_by__first_name")
+            last = column("uploaded_by__last_name")
+            return lambda row: f"{row[first]} {row[last]}".strip()
+        return super().compile_field(name, field, column)
 
-        return value
+
+def validate_upload(name, size):
+    """Size and type rules shared by direct and intent-based uploads"""
+    # Size validation (10MB max)
+    if size > MAX_FILE_SIZE:
+        raise serializers.ValidationError(
+            f"File too large. Max size is {MAX_FILE_SIZE // (1024*1024)}MB"
+        )
+
+    # Type validation
+    ext = name.split(".")[-1].lower()
+    if ext not in ALLOWED_FILE_TYPES:
+        raise serializers.ValidationError(
+            f"File type not allowed. Allowed: {', '.join(ALLOWED_FILE_TYPES)}"
+        )
+
+
+class PastQuestionContentResultSerializer(PastQuestionSerializer):
+    """Past question matched by its text, with a highlighted snippet"""
+
+    snippet = serializers.SerializerMethodField()
+
+    class Meta(PastQuestionSerializer.Meta):
+        fields = PastQuestionSerializer.Meta.fields + ["snippet"]
+
+    def get_snippet(self, obj):
+        from .content import snippet_for
+
+        return snippet_for(obj, self.context.get("query", ""))
+
+
+class PendingPastQuestionSerializer(PastQuestionSerializer):
+    """Pending item with likely duplicates from the same course"""
+
+    possible_duplicates = serializers.SerializerMethodField()
+
+    class Meta(PastQuestionSerializer.Meta):
+        fields = PastQuestionSerializer.Meta.fields + ["possible_duplicates"]
+
+    def get_possible_duplicates(self, obj):
+        matches = self.context.get("duplicates", {}).get(obj.pk, [])
+        return [{"id": pk, "distance": distance} for pk, distance in matches]
 
 
 class PastQuestionCreateSerializer(PastQuestionSerializer):
@@ -127,6 +213,64 @@ class PastQuestionCreateSerializer(PastQuestionSerializer):
         ]
 
 
+class UploadIntentSerializer(serializers.ModelSerializer):
+    """Request an upload slot; returns where and how to PUT the file"""
+
+    upload_url = serializers.CharField(read_only=True)
+    upload_method = serializers.CharField(read_only=True)
+    upload_headers = serializers.DictField(
+        child=serializers.CharField(), read_only=True
+    )
+    finalise_url = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = UploadIntent
+        fields = [
+            "token",
+            "file_name",
+            "size",
+            "sha256",
+            "status",
+            "expires_at",
+            "upload_url",
+            "upload_method",
+            "upload_headers",
+            "finalise_url",
+        ]
+        read_only_fields = ["token", "status", "expires_at"]
+
+    def validate_file_name(self, value):
+        try:
+            return get_valid_filename(value)
+        except SuspiciousFileOperation:
+            raise serializers.ValidationError("Invalid file name")
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("The file is empty")
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if len(value) != 64 or any(c not in "0123456789abcdef" for c in value):
+            raise serializers.ValidationError("Expected a hex SHA-256 digest")
+        return value
+
+    def validate(self, attrs):
+        try:
+            validate_upload(attrs["file_name"], attrs["size"])
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({"file": exc.detail})
+        return attrs
+
+
+class SignedDownloadSerializer(serializers.Serializer):
+    """A short-lived download link and when it stops working"""
+
+    url = serializers.CharField(read_only=True)
+    expires_at = serializers.DateTimeField(read_only=True)
+
+
 class PastQuestionUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating past questions (admin only)"""
 
@@ -147,6 +291,40 @@ class DownloadHistorySerializer(serializers.ModelSerializer):
         read_only_fields = ["user", "past_question", "downloaded_at", "ip_address"]
 
 
+class PastQuestionContentSearchSerializer(serializers.Serializer):
+    """Parameters for searching inside papers"""
+
+    q = serializers.CharField(max_length=200, help_text="Words to find in the paper")
+    course = serializers.CharField(required=False)
+    year = serializers.IntegerField(required=False)
+
+
+class PastQuestionBatchSerializer(serializers.Serializer):
+    """Parameters for fetching several past questions by id"""
+
+    ids = serializers.CharField(help_text="Comma-separated past question ids")
+    record_views = serializers.BooleanField(
+        required=False, default=False, help_text="Count a view of each result"
+    )
+
+    def validate_ids(self, value):
+        """Parse into unique ids, keeping their order"""
+        from django.conf import settings
+
+        try:
+            ids = [int(pk) for pk in value.split(",") if pk.strip()]
+        except ValueError:
+            raise serializers.ValidationError("Ids must be integers")
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            raise serializers.ValidationError("At least one id is required")
+        if len(ids) > settings.PAST_QUESTION_BATCH_MAX_IDS:
+            raise serializers.ValidationError(
+                f"At most {settings.PAST_QUESTION_BATCH_MAX_IDS} ids per request"
+            )
+        return ids
+
+
 class PastQuestionSearchSerializer(serializers.Serializer):
     """Serializer for search parameters"""
 
@@ -156,6 +334,22 @@ class PastQuestionSearchSerializer(serializers.Serializer):
     semester = serializers.CharField(required=False)
     exam_type = serializers.CharField(required=False)
     status = serializers.CharField(required=False, default="approved")
+    facets = serializers.CharField(
+        required=False, help_text="Comma-separated facets to count"
+    )
+
+    def validate_facets(self, value):
+        """Parse and check the requested facets"""
+        from .facets import FACET_FIELDS
+
+        facets = [facet.strip() for facet in value.split(",") if facet.strip()]
+        unknown = [facet for facet in facets if facet not in FACET_FIELDS]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown facets: {', '.join(unknown)}. "
+                f"Allowed: {', '.join(FACET_FIELDS)}"
+            )
+        return facets
 
     def validate(self, attrs):
         """At least one search parameter"""
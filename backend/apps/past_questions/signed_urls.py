@@ -0,0 +1,370 @@
+"""
+Short-lived signed URLs for past-question files.
+
+``PastQuestionDownloadURLView`` checks permissions and records the download
+once, then hands out ``/files/<name>?expires=...&filename=...&sig=...``.
+The signature is an HMAC-SHA256 over the name, expiry and filename, so the
+file can be served by anything holding ``DOWNLOAD_URL_SECRET`` without
+touching the database. ``serve_signed_file`` is a plain Django view (which
+can hand the transfer to nginx via ``X-Accel-Redirect``). ``SignedFileApp``
+is a bare ASGI app that sits in front of Django in ``config/asgi.py``.
+Fetching the same URL again before it expires costs no queries.
+
+Upload intents get the mirror image: ``/uploads/<key>?expires=&size=&sig=``
+accepts one PUT of at most ``size`` bytes while the intent is pending,
+answered by ``receive_signed_upload`` or, under ASGI, without occupying a
+worker. The file is linked into place only if nothing is stored at the key
+yet, so a replayed URL can never overwrite an upload.
+
+Object stores sign their own URLs, so on S3 both directions use presigned
+URLs with the same lifetime instead; the upload URL also signs the length
+and SHA-256 checksum, which the client sends as headers.
+"""
+
+import asyncio
+import base64
+import os
+import time
+from urllib.parse import parse_qs, quote, urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import storages
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import content_disposition_header
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods, require_safe
+
+from .storage import STORAGE_ALIAS, is_remote
+
+KEY_SALT = "apps.past_questions.signed_urls"
+UPLOAD_KEY_SALT = "apps.past_questions.signed_urls.upload"
+CHUNK_SIZE = 64 * 1024
+
+
+def _prefix():
+    return getattr(settings, "DOWNLOAD_URL_PREFIX", "/files/")
+
+
+def _upload_prefix():
+    return getattr(settings, "UPLOAD_URL_PREFIX", "/uploads/")
+
+
+def _hmac(salt, value):
+    secret = getattr(settings, "DOWNLOAD_URL_SECRET", "") or settings.SECRET_KEY
+    return salted_hmac(salt, value, secret=secret, algorithm="sha256").hexdigest()
+
+
+def signature(name, expires, filename):
+    return _hmac(KEY_SALT, f"{name}\n{expires}\n{filename}")
+
+
+def upload_signature(name, expires, size):
+    return _hmac(UPLOAD_KEY_SALT, f"{name}\n{expires}\n{size}")
+
+
+def signed_url(field, filename, ttl=None):
+    """``(url, expires)`` for downloading ``field`` as ``filename``
+
+    Local URLs are relative unless ``DOWNLOAD_URL_BASE`` is set.
+    """
+    ttl = ttl or getattr(settings, "DOWNLOAD_URL_TTL", 300)
+    expires = int(time.time()) + ttl
+    if is_remote(field.storage):
+        url = field.storage.url(
+            field.name,
+            parameters={
+                "ResponseContentDisposition": content_disposition_header(
+                    True, filename
+                ),
+                "ResponseContentType": "application/octet-stream",
+            },
+            expire=ttl,
+        )
+        return url, expires
+
+    query = urlencode(
+        {
+            "expires": expires,
+            "filename": filename,
+            "sig": signature(field.name, expires, filename),
+        }
+    )
+    base = getattr(settings, "DOWNLOAD_URL_BASE", "").rstrip("/")
+    return f"{base}{_prefix()}{quote(field.name)}?{query}", expires
+
+
+def verify(name, params):
+    """The signed filename if ``params`` carry a valid, unexpired signature"""
+    try:
+        expires = int(params.get("expires", ""))
+    except ValueError:
+        return None
+    filename, sig = params.get("filename", ""), params.get("sig", "")
+    if expires < time.time() or not filename:
+        return None
+    if not constant_time_compare(sig, signature(name, expires, filename)):
+        return None
+    return filename
+
+
+def _checksum(sha256):
+    """S3's form of a hex SHA-256 digest"""
+    return base64.b64encode(bytes.fromhex(sha256)).decode()
+
+
+def signed_upload_url(storage, name, size, expires, sha256):
+    """URL to PUT at most ``size`` bytes to ``name`` until ``expires``
+
+    Presigned S3 URLs only accept exactly ``size`` bytes hashing to
+    ``sha256``, sent with ``upload_headers``.
+    """
+    if is_remote(storage):
+        return storage.bucket.meta.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": storage.bucket_name,
+                "Key": name,
+                "ContentLength": size,
+                "ChecksumSHA256": _checksum(sha256),
+            },
+            ExpiresIn=max(1, int(expires - time.time())),
+        )
+    query = urlencode(
+        {
+            "expires": expires,
+            "size": size,
+            "sig": upload_signature(name, expires, size),
+        }
+    )
+    base = getattr(settings, "DOWNLOAD_URL_BASE", "").rstrip("/")
+    return f"{base}{_upload_prefix()}{quote(name)}?{query}"
+
+
+def upload_headers(storage, sha256):
+    """Headers the client must send with the PUT to a signed upload URL"""
+    if is_remote(storage):
+        return {"x-amz-checksum-sha256": _checksum(sha256)}
+    return {}
+
+
+def verify_upload(name, params):
+    """The signed size limit if ``params`` carry a valid upload signature"""
+    try:
+        expires, size = int(params.get("expires", "")), int(params.get("size", ""))
+    except ValueError:
+        return None
+    if expires < time.time():
+        return None
+    expected = upload_signature(name, expires, size)
+    if not constant_time_compare(params.get("sig", ""), expected):
+        return None
+    return size
+
+
+def _is_pending(name):
+    """Whether ``name`` belongs to an upload intent that still takes a PUT"""
+    from .models import UploadIntent
+
+    return UploadIntent.objects.filter(key=name, status="pending").exists()
+
+
+def _open_part(storage, name):
+    """Partial file next to the destination; linked into place when done"""
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path, open(f"{path}.part", "wb")
+
+
+def _commit_part(part_name, path):
+    """Link the finished part into place; raises ``FileExistsError`` rather
+    than replace a stored file"""
+    try:
+        os.link(part_name, path)
+    finally:
+        os.remove(part_name)
+
+
+def _cache_control(expires):
+    return f"private, max-age={max(0, int(expires) - int(time.time()))}"
+
+
+@require_safe
+def serve_signed_file(request, name):
+    """Serve a file named by a signed URL; no authentication or queries"""
+    filename = verify(name, request.GET)
+    if filename is None:
+        return HttpResponseForbidden("Invalid or expired link")
+
+    accel_prefix = getattr(settings, "DOWNLOAD_ACCEL_REDIRECT_PREFIX", "")
+    if accel_prefix:
+        # Let the front-end server send the bytes from its internal location
+        response = HttpResponse(content_type="application/octet-stream")
+        response["X-Accel-Redirect"] = accel_prefix + quote(name)
+    else:
+        try:
+            stored = storages[STORAGE_ALIAS].open(name, "rb")
+        except (FileNotFoundError, SuspiciousFileOperation):
+            raise Http404("File not found")
+        response = FileResponse(stored, content_type="application/octet-stream")
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    response["Cache-Control"] = _cache_control(request.GET["expires"])
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["PUT"])
+def receive_signed_upload(request, name):
+    """Accept the body of a signed upload URL into local storage"""
+    limit = verify_upload(name, request.GET)
+    if limit is None or not _is_pending(name):
+        return HttpResponseForbidden("Invalid or expired link")
+    if int(request.META.get("CONTENT_LENGTH") or 0) > limit:
+        return HttpResponse("Larger than the declared size", status=413)
+
+    try:
+        path, part = _open_part(storages[STORAGE_ALIAS], name)
+    except SuspiciousFileOperation:
+        return HttpResponseForbidden("Invalid or expired link")
+    written = 0
+    with part:
+        while chunk := request.read(CHUNK_SIZE):
+            written += len(chunk)
+            if written > limit:
+                break
+            part.write(chunk)
+    if written > limit:
+        os.remove(part.name)
+        return HttpResponse("Larger than the declared size", status=413)
+    try:
+        _commit_part(part.name, path)
+    except FileExistsError:
+        return HttpResponse("Already uploaded", status=409)
+    return HttpResponse(status=200)
+
+
+class SignedFileApp:
+    """ASGI app answering signed download and upload URLs against local
+    storage; everything else is passed through to ``app``"""
+
+    def __init__(self, app):
+        self.app = app
+        self.prefix = _prefix()
+        self.upload_prefix = _upload_prefix()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not is_remote(storages[STORAGE_ALIAS]):
+            path = scope["path"]
+            if path.startswith(self.prefix):
+                return await self.serve(scope, send)
+            # CORS preflights fall through to Django's middleware
+            if path.startswith(self.upload_prefix) and scope["method"] == "PUT":
+                return await self.receive_upload(scope, receive, send)
+        return await self.app(scope, receive, send)
+
+    async def serve(self, scope, send):
+        storage = storages[STORAGE_ALIAS]
+        if scope["method"] not in ("GET", "HEAD"):
+            return await self.respond(send, 405, b"Method not allowed")
+        name = scope["path"][len(self.prefix) :]
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        params = {key: values[0] for key, values in query.items()}
+        filename = verify(name, params)
+        if filename is None:
+            return await self.respond(send, 403, b"Invalid or expired link")
+        try:
+            path = storage.path(name)
+            stat = await asyncio.to_thread(os.stat, path)
+        except (FileNotFoundError, SuspiciousFileOperation):
+            return await self.respond(send, 404, b"File not found")
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/octet-stream"),
+                    (b"content-length", str(stat.st_size).encode()),
+                    (
+                        b"content-disposition",
+                        content_disposition_header(True, filename).encode(),
+                    ),
+                    (b"cache-control", _cache_control(params["expires"]).encode()),
+                ],
+            }
+        )
+        if scope["method"] == "HEAD":
+            return await send({"type": "http.response.body", "body": b""})
+        with open(path, "rb") as stored:
+            while True:
+                chunk = await asyncio.to_thread(stored.read, CHUNK_SIZE)
+                more = len(chunk) == CHUNK_SIZE
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": more}
+                )
+                if not more:
+                    break
+
+    async def receive_upload(self, scope, receive, send):
+        name = scope["path"][len(self.upload_prefix) :]
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        limit = verify_upload(name, {key: values[0] for key, values in query.items()})
+        headers = [(b"content-type", b"text/plain; charset=utf-8")]
+        headers += self.cors_headers(scope)
+        if limit is None or not await sync_to_async(_is_pending)(name):
+            return await self.respond(send, 403, b"Invalid or expired link", headers)
+        declared = dict(scope["headers"]).get(b"content-length", b"0")
+        if int(declared or 0) > limit:
+            too_large = b"Larger than the declared size"
+            return await self.respond(send, 413, too_large, headers)
+
+        try:
+            path, part = await asyncio.to_thread(
+                _open_part, storages[STORAGE_ALIAS], name
+            )
+        except SuspiciousFileOperation:
+            return await self.respond(send, 403, b"Invalid or expired link", headers)
+        written, more = 0, True
+        try:
+            while more and written <= limit:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    break
+                chunk = message.get("body", b"")
+                written += len(chunk)
+                more = message.get("more_body", False)
+                if chunk and written <= limit:
+                    await asyncio.to_thread(part.write, chunk)
+        finally:
+            await asyncio.to_thread(part.close)
+        if more or written > limit:
+            await asyncio.to_thread(os.remove, part.name)
+            if written > limit:
+                too_large = b"Larger than the declared size"
+                return await self.respond(send, 413, too_large, headers)
+            return
+        try:
+            await asyncio.to_thread(_commit_part, part.name, path)
+        except FileExistsError:
+            return await self.respond(send, 409, b"Already uploaded", headers)
+        await self.respond(send, 200, b"", headers)
+
+    def cors_headers(self, scope):
+        origin = dict(scope["headers"]).get(b"origin")
+        allowed = getattr(settings, "CORS_ALLOWED_ORIGINS", [])
+        if origin is None or origin.decode("latin-1") not in allowed:
+            return []
+        return [(b"access-control-allow-origin", origin), (b"vary", b"origin")]
+
+    async def respond(self, send, status, body, headers=None):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": headers
+                or [(b"content-type", b"text/plain; charset=utf-8")],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,133 @@
+"""
+Storage backends for past-question files and their derivatives.
+
+Files are addressed through ``storages["past_questions"]`` rather than a
+path under ``MEDIA_ROOT`` so the app servers can share one object store.
+Both backends lay names out as ``<kind>/<aa>/<bb>/<file>``, where ``aabb``
+are the first hex digits of the file's SHA-256. This keeps local directories
+small, and a file keeps its name when it is copied between backends.
+
+``ShardedFileSystemStorage`` writes to local disk. ``ShardedS3Storage``
+writes to any S3-compatible service (AWS, MinIO) through django-storages.
+Uploads above ``multipart_threshold`` are sent as concurrent multipart
+uploads.
+"""
+
+import hashlib
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, storages
+from django.http import FileResponse, HttpResponseRedirect
+
+try:
+    from boto3.s3.transfer import TransferConfig
+    from storages.backends.s3 import S3Storage
+except ImportError:  # boto3/django-storages are optional; local disk only
+    TransferConfig = None
+    S3Storage = None
+
+STORAGE_ALIAS = "past_questions"
+SHARDED_NAME_RE = re.compile(r"^(?:[^/]+/)?[0-9a-f]{2}/[0-9a-f]{2}/[^/]+$")
+
+
+def past_question_storage():
+    """Storage for ``PastQuestion.file``, configured in ``STORAGES``"""
+    return storages[STORAGE_ALIAS]
+
+
+def content_sha256(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def sharded_name(name, digest):
+    """``past_questions/2024/01/31/x.pdf`` -> ``past_questions/ab/cd/x.pdf``"""
+    kind = name.split("/", 1)[0] if "/" in name else ""
+    basename = posixpath.basename(name)
+    return posixpath.join(kind, digest[:2], digest[2:4], basename)
+
+
+def is_sharded(name):
+    return bool(SHARDED_NAME_RE.match(name))
+
+
+class ShardedNameMixin:
+    """Place each saved file under directories taken from its content hash"""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = sharded_name(name, content_sha256(content))
+        return super().save(name, content, max_length=max_length)
+
+
+class ShardedFileSystemStorage(ShardedNameMixin, FileSystemStorage):
+    pass
+
+
+if S3Storage is not None:
+
+    class ShardedS3Storage(ShardedNameMixin, S3Storage):
+        """S3-compatible storage with tunable multipart uploads
+
+        Never overwrites: two different files can share a shard and a name.
+        """
+
+        def __init__(
+            self,
+            multipart_threshold=8 * 1024 * 1024,
+            multipart_chunksize=8 * 1024 * 1024,
+            max_concurrency=4,
+            **settings,
+        ):
+            settings.setdefault("file_overwrite", False)
+            # SigV2 presigned URLs cannot bind an upload's length and checksum
+            settings.setdefault("signature_version", "s3v4")
+            settings.setdefault(
+                "transfer_config",
+                TransferConfig(
+                    multipart_threshold=multipart_threshold,
+                    multipart_chunksize=multipart_chunksize,
+                    max_concurrency=max_concurrency,
+                ),
+            )
+            super().__init__(**settings)
+
+else:
+    ShardedS3Storage = None
+
+
+def is_remote(storage):
+    return S3Storage is not None and isinstance(storage, S3Storage)
+
+
+def download_response(field, filename):
+    """Attachment response for a stored file on either backend
+
+    Object stores get a redirect to a short-lived signed URL so the bytes
+    never pass through the app server; local files are streamed.
+    """
+    storage = field.storage
+    disposition = f'attachment; filename="{filename}"'
+    if is_remote(storage):
+        url = storage.url(
+            field.name,
+            parameters={
+                "ResponseContentDisposition": disposition,
+                "ResponseContentType": "application/octet-stream",
+            },
+        )
+        return HttpResponseRedirect(url)
+    response = FileResponse(
+        storage.open(field.name, "rb"), content_type="application/octet-stream"
+    )
+    response["Content-Disposition"] = disposition
+    return response
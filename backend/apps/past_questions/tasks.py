@@ -0,0 +1,51 @@
+"""
+In-process background work for post-upload processing.
+
+Jobs run on a small thread pool once the uploading transaction commits,
+so the upload response is never held up and a rolled-back upload never
+gets processed. With ``BACKGROUND_TASKS_EAGER`` they run inline instead
+(management commands, tests).
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "BACKGROUND_TASK_WORKERS", 2),
+                thread_name_prefix="pastq-task",
+            )
+        return _executor
+
+
+def _run(func, args, kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", func.__qualname__)
+    finally:
+        # Worker threads keep their own connections; release them between jobs
+        for connection in connections.all(initialized_only=True):
+            connection.close()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Run ``func`` after the current transaction commits"""
+    if getattr(settings, "BACKGROUND_TASKS_EAGER", False):
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run, func, args, kwargs))
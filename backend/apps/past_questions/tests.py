@@ -1,3 +1,1441 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import random
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlencode, urlsplit
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, ImageChops, ImageDraw, ImageStat, JpegImagePlugin
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.analytics.benchmarks.dataset import sample_pdf
+from apps.analytics.testing import QueryBudgetMixin
+from apps.courses.models import Course
+from apps.courses.serializers import CourseSerializer
+from apps.users.models import User
+from apps.users.serializers import UserProfileSerializer
+
+from . import content, facets, views
+from .fingerprints import (
+    bands,
+    find_duplicates,
+    find_similar,
+    fingerprint,
+    hamming,
+    to_signed,
+)
+from .management.commands.migrate_storage import Command as MigrateStorageCommand
+from .models import (
+    PastQuestion,
+    PastQuestionContent,
+    PastQuestionFingerprint,
+    UploadIntent,
+)
+from .optimization import encode_scan, optimize_past_question
+from .serializers import PastQuestionContentResultSerializer, PastQuestionSerializer
+from .signed_urls import (
+    SignedFileApp,
+    signature,
+    signed_upload_url,
+    signed_url,
+    upload_headers,
+)
+from .storage import (
+    ShardedS3Storage,
+    download_response,
+    is_sharded,
+    past_question_storage,
+    sharded_name,
+)
+from .uploads import cleanup_intents, create_intent
+
+try:
+    from botocore.stub import Stubber
+except ImportError:  # boto3 is optional; the S3 tests are skipped
+    Stubber = None
+
+
+def asgi_request(app, method, url, body=b"", headers=()):
+    """``(status, headers, body)`` of one request to an ASGI app"""
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(key.encode(), value.encode()) for key, value in headers],
+    }
+    chunks = [body[i : i + 4096] for i in range(0, len(body), 4096)] or [b""]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": n < len(chunks) - 1}
+        for n, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    # Sync code the app hands off (database queries) runs on this thread
+    async_to_sync(app)(scope, receive, send)
+    start = sent[0]
+    return (
+        start["status"],
+        {key.decode(): value.decode() for key, value in start["headers"]},
+        b"".join(message.get("body", b"") for message in sent[1:]),
+    )
+
+
+async def not_found_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 404, "headers": []})
+    await send({"type": "http.response.body", "body": b"passed through"})
+
+
+class TempMediaMixin:
+    """Stored files go to a throwaway ``MEDIA_ROOT``"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+def scanned_page(size=(600, 800), ink="black", mode="RGB"):
+    """A photographed page: off-white paper, lines of print and sensor noise"""
+    page = Image.new(mode, size, "white")
+    draw = ImageDraw.Draw(page)
+    for top in range(40, size[1] - 40, 24):
+        for left in range(40, size[0] - 80, 60):
+            draw.rectangle((left, top, left + 40, top + 8), fill=ink)
+    noise = Image.effect_noise(size, 12).convert(mode)
+    paper = ImageChops.invert(noise).point(lambda value: 200 + value // 5)
+    return ImageChops.multiply(page, paper)
+
+
+def encode(image, format, **options):
+    output = io.BytesIO()
+    image.save(output, format, **options)
+    return output.getvalue()
+
+
+def photo(image):
+    """Camera-quality JPEG of ``image``, so any loss is the optimiser's"""
+    return encode(image, "JPEG", quality=100, subsampling=0)
+
+
+class PastQuestionDataMixin:
+    """Two approved past questions and a pending one"""
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(
+            code="CSC101",
+            title="Introduction to Computing",
+            faculty="computing",
+            department="Computer Science",
+            level="100",
+        )
+        uploader = User.objects.create_user(
+            "10000001", "ama@example.com", "pass", first_name="Ama", last_name="Mensah"
+        )
+        reviewer = User.objects.create_user("10000002", "kofi@example.com", "pass")
+        cls.newest, cls.older, cls.pending = PastQuestion.objects.bulk_create(
+            [
+                PastQuestion(
+                    course=course,
+                    year=2023,
+                    semester="first",
+                    exam_type="final",
+                    title="Final 2023",
+                    file="past_questions/ab/cd/final 2023 (copy).pdf",
+                    file_name="Final 2023.PDF",
+                    file_size=2048,
+                    uploaded_by=uploader,
+                    status="approved",
+                    reviewed_by=reviewer,
+                    download_count=7,
+                    quality_rating=4.5,
+                    has_solutions=True,
+                ),
+                PastQuestion(
+                    course=course,
+                    year=2022,
+                    semester="second",
+                    exam_type="quiz",
+                    title="Quiz – café",
+                    file="past_questions/ef/01/quiz.png",
+                    file_name="",
+                    file_size=10,
+                    uploaded_by=reviewer,
+                    status="approved",
+                    lecturer="Dr. Ofori",
+                ),
+                PastQuestion(
+                    course=course,
+                    year=2021,
+                    title="Pending",
+                    file="",
+                    file_size=0,
+                    uploaded_by=uploader,
+                    status="pending",
+                ),
+            ]
+        )
+
+
+class PastQuestionValuesSerializerTests(
+    PastQuestionDataMixin, QueryBudgetMixin, TestCase
+):
+    """The values-based list path must be indistinguishable from
+    ``PastQuestionSerializer``"""
+
+    def assertSameAsModelSerializer(self, view_class, url):
+        fast = self.client.get(url)
+        with mock.patch.object(view_class, "values_serializer_class", None):
+            slow = self.client.get(url)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_list_matches(self):
+        url = reverse("past_questions:past-question-list")
+        self.assertSameAsModelSerializer(views.PastQuestionListView, url)
+        self.assertSameAsModelSerializer(
+            views.PastQuestionListView,
+            url + "?fields=id,file_url,file_type,uploaded_by_name,status_display",
+        )
+
+    def test_search_matches(self):
+        url = reverse("past_questions:past-question-search")
+        self.assertSameAsModelSerializer(
+            views.PastQuestionSearchView, url + "?course=csc&facets=year"
+        )
+
+    def test_popular_matches(self):
+        url = reverse("past_questions:popular-past-questions")
+        self.assertSameAsModelSerializer(views.PopularPastQuestionsView, url)
+
+    def test_expand_uses_model_serializer(self):
+        url = reverse("past_questions:past-question-list") + "?expand=course"
+        response = self.client.get(url)
+        self.assertEqual(response.json()["results"][0]["course"]["code"], "CSC101")
+
+    def test_list_within_budget(self):
+        url = reverse("past_questions:past-question-list")
+        with self.assertQueryBudget("past_questions:past-question-list"):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+
+class SparseFieldsTests(PastQuestionDataMixin, TestCase):
+    """``?fields=``/``?expand=`` on past questions (``config.fieldsets``)"""
+
+    def get(self, **params):
+        url = reverse("past_questions:past-question-list")
+        return self.client.get(url, params)
+
+    def test_unknown_names_are_rejected(self):
+        response = self.get(fields="id,nope,secret")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"fields": ["Unknown fields: nope, secret"]})
+        # Write-only fields are not output fields
+        self.assertEqual(self.get(fields="course_id").status_code, 400)
+
+        response = self.get(expand="course,title")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"expand": ["Cannot expand: title"]})
+
+    def test_expand_nests_the_full_serializer(self):
+        result = self.get(expand="course,uploaded_by").json()["results"][0]
+        self.assertEqual(result["course"], CourseSerializer(self.newest.course).data)
+        self.assertEqual(
+            result["uploaded_by"], UserProfileSerializer(self.newest.uploaded_by).data
+        )
+
+        result = self.get(expand="uploaded_by").json()["results"][0]
+        self.assertEqual(result["course"], self.newest.course_id)
+        self.assertEqual(result["uploaded_by"]["index_number"], "10000001")
+
+        result = self.get(fields="id,course", expand="course").json()["results"][0]
+        self.assertEqual(list(result), ["id", "course"])
+        self.assertEqual(result["course"]["code"], "CSC101")
+
+    def test_fields_select_minimal_columns(self):
+        def paths(fields, expand=()):
+            serializer = PastQuestionSerializer(fields=fields, expand=list(expand))
+            return serializer.queryset_paths()
+
+        self.assertEqual(
+            paths(["id", "status_display", "uploaded_by_name"]),
+            (
+                ["uploaded_by"],
+                [
+                    "id",
+                    "status",
+                    "uploaded_by",
+                    "uploaded_by__first_name",
+                    "uploaded_by__last_name",
+                ],
+            ),
+        )
+        self.assertEqual(
+            paths(["title", "file_type", "course_code"]),
+            (["course"], ["course", "course__code", "file_name", "id", "title"]),
+        )
+        # An expanded relation is loaded whole
+        self.assertEqual(
+            paths(["id", "course"], expand=["course"]), (["course"], ["course", "id"])
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(fields="id,title")
+        self.assertEqual(response.status_code, 200)
+        table = PastQuestion._meta.db_table
+        [select] = [
+            query["sql"]
+            for query in queries
+            if f'FROM "{table}"' in query["sql"] and "COUNT" not in query["sql"]
+        ]
+        self.assertNotIn("file_name", select)
+        self.assertNotIn("JOIN", select)
+
+    def test_unmapped_fields_leave_queryset_untrimmed(self):
+        serializer = PastQuestionContentResultSerializer(
+            fields=["id", "snippet"], expand=[]
+        )
+        self.assertEqual(serializer.queryset_paths(), ([], None))
+
+
+class PastQuestionBatchTests(PastQuestionDataMixin, TestCase):
+    def get(self, ids, **params):
+        params["ids"] = ",".join(str(pk) for pk in ids)
+        return self.client.get(reverse("past_questions:past-question-batch"), params)
+
+    def test_keeps_requested_order_and_hides_pending(self):
+        response = self.get([self.older.pk, self.pending.pk, 0, self.newest.pk])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["id"] for row in response.json()], [self.older.pk, self.newest.pk]
+        )
+
+    def test_records_views_in_one_update(self):
+        with self.assertNumQueries(2):
+            self.get([self.newest.pk, self.pending.pk], record_views="true")
+        self.newest.refresh_from_db()
+        self.pending.refresh_from_db()
+        self.assertEqual((self.newest.view_count, self.pending.view_count), (1, 0))
+
+    def test_rejects_too_many_ids(self):
+        with self.settings(PAST_QUESTION_BATCH_MAX_IDS=2):
+            response = self.get([1, 2, 3])
+        self.assertEqual(response.status_code, 400)
+
+
+class PastQuestionIndexTests(TestCase):
+    """
+    Each hot endpoint's page query must be read in index order: EXPLAIN
+    shows the expected index, no sort step and no full table scan.
+
+    On PostgreSQL sequential scans are disabled for the EXPLAIN, since the
+    planner prefers them on a table this small; a sort then still shows up
+    if no index can produce the order.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(
+            code="CSC101",
+            title="Introduction to Computing",
+            faculty="computing",
+            department="Computer Science",
+            level="100",
+        )
+        cls.uploader = User.objects.create_user("10000001", "ama@example.com", "pass")
+        cls.moderator = User.objects.create_user(
+            "10000002", "kofi@example.com", "pass", is_moderator=True
+        )
+        statuses = ["approved"] * 7 + ["pending"] * 2 + ["rejected"]
+        PastQuestion.objects.bulk_create(
+            PastQuestion(
+                course=course,
+                year=2015 + n % 10,
+                title=f"Paper {n}",
+                file=f"past_questions/00/00/paper-{n}.pdf",
+                file_name=f"paper-{n}.pdf",
+                file_size=1024,
+                uploaded_by=cls.moderator if n % 4 else cls.uploader,
+                status=statuses[n % len(statuses)],
+                download_count=n * 7 % 101,
+            )
+            for n in range(400)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "ANALYZE past_questions_pastquestion"
+                if connection.vendor == "postgresql"
+                else "ANALYZE"
+            )
+
+    def page_query(self, url, user=None):
+        """The ordered SELECT that fetches the page of past questions"""
+        headers = {}
+        if user is not None:
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {AccessToken.for_user(user)}"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        for query in queries.captured_queries:
+            sql = query["sql"]
+            if (
+                sql.startswith('SELECT "past_questions_pastquestion"')
+                and "ORDER BY" in sql
+            ):
+                return sql
+        self.fail(f"No ordered past-question query for {url}")
+
+    def explain(self, sql):
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                return "\n".join(row[-1] for row in cursor.fetchall())
+        if connection.vendor == "postgresql":
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}")
+                return "\n".join(row[0] for row in cursor.fetchall())
+        self.skipTest(f"No EXPLAIN parser for {connection.vendor}")
+
+    def assertIndexOrdered(self, url, index, user=None):
+        plan = self.explain(self.page_query(url, user))
+        self.assertIn(index, plan)
+        if connection.vendor == "sqlite":
+            self.assertNotIn("TEMP B-TREE", plan)
+            self.assertNotRegex(plan, r"SCAN past_questions_pastquestion(?! USING)")
+        else:
+            self.assertNotRegex(plan, r"\bSort\b")
+            self.assertNotIn("Seq Scan on past_questions_pastquestion", plan)
+
+    def test_list(self):
+        url = reverse("past_questions:past-question-list") + "?page=2"
+        self.assertIndexOrdered(url, "pq_approved_year_idx")
+
+    def test_search_by_year(self):
+        url = reverse("past_questions:past-question-search") + "?year=2020"
+        self.assertIndexOrdered(url, "pq_approved_year_idx")
+
+    def test_search(self):
+        url = reverse("past_questions:past-question-search") + "?exam_type=final"
+        self.assertIndexOrdered(url, "pq_approved_recent_idx")
+
+    def test_popular(self):
+        url = reverse("past_questions:popular-past-questions")
+        self.assertIndexOrdered(url, "pq_approved_popular_idx")
+
+    def test_pending(self):
+        url = reverse("past_questions:pending-review")
+        self.assertIndexOrdered(url, "pq_pending_idx", self.moderator)
+
+    def test_my_uploads(self):
+        url = reverse("past_questions:my-uploads")
+        self.assertIndexOrdered(url, "pq_uploader_recent_idx", self.uploader)
+
+
+class ScanEncodingTests(TestCase):
+    def decode(self, data):
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def test_colour_jpeg_keeps_resolution_and_full_chroma(self):
+        page = scanned_page(ink="red")
+        data, extension = encode_scan(photo(page), "jpg")
+        image = self.decode(data)
+        self.assertEqual((extension, image.mode, image.size), ("jpg", "RGB", page.size))
+        self.assertEqual(JpegImagePlugin.get_sampling(image), 0)
+        difference = ImageStat.Stat(ImageChops.difference(page, image)).mean
+        # 4:2:0 at quality 80 is off by about 8 levels on this page
+        self.assertLess(max(difference), 3)
+
+    def test_grayscale_page_drops_colour(self):
+        data, _ = encode_scan(photo(scanned_page()), "jpeg")
+        self.assertEqual(self.decode(data).mode, "L")
+
+    def test_png_is_lossless(self):
+        page = scanned_page(mode="L")
+        data, extension = encode_scan(encode(page, "PNG"), "png")
+        self.assertEqual(extension, "png")
+        self.assertIsNone(ImageChops.difference(page, self.decode(data)).getbbox())
+
+    def test_downscales_only_when_configured(self):
+        original = photo(scanned_page())
+        self.assertEqual(self.decode(encode_scan(original, "jpg")[0]).size, (600, 800))
+        with self.settings(SCAN_MAX_DIMENSION=400):
+            data, _ = encode_scan(original, "jpg")
+        self.assertEqual(self.decode(data).size, (300, 400))
+
+
+class OptimizePastQuestionTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        course = Course.objects.create(
+            code="CSC101",
+            title="Introduction to Computing",
+            faculty="computing",
+            department="Computer Science",
+            level="100",
+        )
+        uploader = User.objects.create_user("10000001", "ama@example.com", "pass")
+        self.original = photo(scanned_page())
+        self.storage = past_question_storage()
+        name = self.storage.save("past_questions/scan.jpg", ContentFile(self.original))
+        self.past_question = PastQuestion.objects.create(
+            course=course,
+            year=2023,
+            title="Scanned final",
+            file=name,
+            file_name="scan.jpg",
+            file_size=len(self.original),
+            uploaded_by=uploader,
+            is_scanned=True,
+        )
+
+    def test_switches_to_optimised_file_and_deletes_original(self):
+        old_name = self.past_question.file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            result = optimize_past_question(self.past_question)
+
+        self.assertEqual(result.status, "optimized")
+        self.past_question.refresh_from_db()
+        self.assertTrue(self.past_question.file.name.endswith("scan-opt.jpg"))
+        self.assertEqual(self.past_question.file_size, result.optimized_size)
+        self.assertEqual(self.past_question.original_file_size, len(self.original))
+        self.assertIsNotNone(self.past_question.optimized_at)
+        self.assertFalse(self.storage.exists(old_name))
+        self.assertEqual(
+            optimize_past_question(self.past_question).detail, "already optimised"
+        )
+
+    def test_concurrent_file_swap_wins(self):
+        old_name = self.past_question.file.name
+        replacement = self.storage.save(
+            "past_questions/replacement.pdf", ContentFile(b"%PDF-1.4")
+        )
+
+        def encode_during_swap(*args):
+            # Someone replaces the file while the scan is being re-encoded
+            PastQuestion.objects.filter(pk=self.past_question.pk).update(
+                file=replacement
+            )
+            return encode_scan(*args)
+
+        with mock.patch(
+            "apps.past_questions.optimization.encode_scan", encode_during_swap
+        ), self.captureOnCommitCallbacks(execute=True):
+            result = optimize_past_question(self.past_question)
+
+        self.assertEqual(
+            (result.status, result.detail),
+            ("failed", "file changed during optimisation"),
+        )
+        self.past_question.refresh_from_db()
+        self.assertEqual(self.past_question.file.name, replacement)
+        self.assertIsNone(self.past_question.optimized_at)
+        self.assertTrue(self.storage.exists(old_name))
+        self.assertEqual(list(Path(settings.MEDIA_ROOT).rglob("*-opt.*")), [])
+
+
+class FingerprintTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.course, cls.other_course = Course.objects.bulk_create(
+            Course(
+                code=code,
+                title=title,
+                faculty="computing",
+                department="Computer Science",
+                level="100",
+            )
+            for code, title in [
+                ("CSC101", "Introduction to Computing"),
+                ("CSC102", "Programming I"),
+            ]
+        )
+        cls.moderator = User.objects.create_user(
+            "10000002", "kofi@example.com", "pass", is_moderator=True
+        )
+        cls.dhash = random.Random(41).getrandbits(64)
+
+    def paper(self, dhash, status="approved", course=None, ahash=0):
+        past_question = PastQuestion.objects.create(
+            course=course or self.course,
+            year=2023,
+            title=f"Paper {dhash:x}",
+            file="past_questions/00/00/paper.jpg",
+            file_name=f"paper-{PastQuestion.objects.count()}.jpg",
+            file_size=1024,
+            uploaded_by=self.moderator,
+            status=status,
+        )
+        PastQuestionFingerprint.objects.create(
+            past_question=past_question,
+            course=past_question.course,
+            ahash=to_signed(ahash),
+            dhash=to_signed(dhash),
+            **{f"band{band}": value for band, value in enumerate(bands(dhash))},
+        )
+        return past_question
+
+    def flip(self, dhash, *bits):
+        for bit in bits:
+            dhash ^= 1 << bit
+        return dhash
+
+    def test_bands_split_hash_into_bytes(self):
+        parts = bands(self.dhash)
+        self.assertEqual(len(parts), 8)
+        self.assertTrue(all(0 <= part <= 0xFF for part in parts))
+        self.assertEqual(
+            sum(part << (8 * band) for band, part in enumerate(parts)), self.dhash
+        )
+
+    def test_distance_seven_always_shares_a_band(self):
+        rng = random.Random(7)
+        for _ in range(2000):
+            dhash = rng.getrandbits(64)
+            other = self.flip(dhash, *rng.sample(range(64), rng.randint(0, 7)))
+            self.assertLessEqual(hamming(dhash, other), 7)
+            self.assertTrue(
+                any(a == b for a, b in zip(bands(dhash), bands(other))), other
+            )
+
+    def test_find_similar_uses_bands(self):
+        source = self.paper(self.dhash)
+        # Seven bits, one in each of the first seven bands: only band 7 matches
+        near = self.paper(self.flip(self.dhash, 0, 8, 16, 24, 32, 40, 48))
+        # One bit in every band: no shared band, so never a candidate
+        spread = self.paper(self.flip(self.dhash, 0, 8, 16, 24, 32, 40, 48, 56))
+        far = self.paper(self.flip(self.dhash, *range(8)))
+
+        fp = source.fingerprint
+        self.assertEqual(find_similar(fp), [(near.pk, 7)])
+        matches = find_similar(fp, max_distance=64)
+        # Eight bits in band 0 still leaves seven bands to match on
+        self.assertEqual(matches, [(near.pk, 7), (far.pk, 8)])
+        self.assertNotIn(spread.pk, dict(matches))
+
+    def test_find_similar_scopes_course_status_and_ahash(self):
+        source = self.paper(self.dhash)
+        copy = self.paper(self.flip(self.dhash, 3))
+        pending = self.paper(self.flip(self.dhash, 5), status="pending")
+        self.paper(self.dhash, course=self.other_course)
+        self.paper(self.dhash, ahash=(1 << 11) - 1)
+
+        fp = source.fingerprint
+        self.assertEqual(find_similar(fp), [(copy.pk, 1), (pending.pk, 1)])
+        self.assertEqual(find_similar(fp, statuses=["approved"]), [(copy.pk, 1)])
+
+    def test_find_duplicates_in_two_queries(self):
+        first = self.paper(self.dhash, status="pending")
+        copy = self.paper(self.flip(self.dhash, 60))
+        self.paper(self.flip(self.dhash, 61), status="rejected")
+        other_dhash = self.dhash ^ ((1 << 64) - 1)
+        second = self.paper(other_dhash, status="pending", course=self.other_course)
+        other_copy = self.paper(
+            self.flip(other_dhash, 1, 2), course=self.other_course
+        )
+        lone = self.paper(self.dhash, status="pending", course=self.other_course)
+
+        with self.assertNumQueries(2):
+            duplicates = find_duplicates([first.pk, second.pk, lone.pk])
+        self.assertEqual(
+            duplicates,
+            {
+                first.pk: [(copy.pk, 1)],
+                second.pk: [(other_copy.pk, 2)],
+                lone.pk: [],
+            },
+        )
+
+    def test_pending_list_reports_duplicates(self):
+        pending = self.paper(self.dhash, status="pending")
+        copy = self.paper(self.flip(self.dhash, 9))
+        response = self.client.get(
+            reverse("past_questions:pending-review"),
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.moderator)}",
+        )
+        self.assertEqual(response.status_code, 200)
+        (row,) = response.json()["results"]
+        self.assertEqual(row["id"], pending.pk)
+        self.assertEqual(row["possible_duplicates"], [{"id": copy.pk, "distance": 1}])
+
+    def test_course_change_moves_fingerprint(self):
+        moved = self.paper(self.dhash)
+        copy = self.paper(self.flip(self.dhash, 2), course=self.other_course)
+        response = self.client.patch(
+            reverse("past_questions:past-question-detail", args=[moved.pk]),
+            {"course_id": self.other_course.pk},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.moderator)}",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        fp = PastQuestionFingerprint.objects.get(past_question=moved)
+        self.assertEqual(fp.course_id, self.other_course.pk)
+        self.assertEqual(find_similar(fp), [(copy.pk, 1)])
+
+
+class FingerprintImageTests(TempMediaMixin, TestCase):
+    def test_rescanned_copy_is_near(self):
+        course = Course.objects.create(
+            code="CSC101",
+            title="Introduction to Computing",
+            faculty="computing",
+            department="Computer Science",
+            level="100",
+        )
+        uploader = User.objects.create_user("10000001", "ama@example.com", "pass")
+        storage = past_question_storage()
+        page = scanned_page()
+        # A heading and a diagram, so the page is not a uniform grey at 8x8
+        draw = ImageDraw.Draw(page)
+        draw.rectangle((60, 60, 540, 140), fill="black")
+        draw.ellipse((100, 300, 350, 550), fill="black")
+        copies = [
+            photo(page),
+            encode(page.resize((450, 600)), "JPEG", quality=60),
+        ]
+        fingerprints = []
+        for n, data in enumerate(copies):
+            name = storage.save(f"past_questions/scan-{n}.jpg", ContentFile(data))
+            past_question = PastQuestion.objects.create(
+                course=course,
+                year=2023,
+                title=f"Scan {n}",
+                file=name,
+                file_name=f"scan-{n}.jpg",
+                file_size=len(data),
+                uploaded_by=uploader,
+            )
+            fingerprints.append(fingerprint(past_question))
+
+        first, second = fingerprints
+        self.assertLessEqual(hamming(first.dhash, second.dhash), 7)
+        self.assertEqual(find_similar(first)[0][0], second.past_question_id)
+
+
+class ShardedStorageTests(TempMediaMixin, TestCase):
+    digest = "abcdef0123456789"
+
+    def test_sharded_name(self):
+        self.assertEqual(
+            sharded_name("past_questions/2024/01/31/x.pdf", self.digest),
+            "past_questions/ab/cd/x.pdf",
+        )
+        self.assertEqual(sharded_name("x.pdf", self.digest), "ab/cd/x.pdf")
+
+    def test_is_sharded(self):
+        self.assertTrue(is_sharded("past_questions/ab/cd/x.pdf"))
+        self.assertTrue(is_sharded("ab/cd/x.pdf"))
+        self.assertFalse(is_sharded("past_questions/2024/01/x.pdf"))
+        self.assertFalse(is_sharded("past_questions/AB/cd/x.pdf"))
+        self.assertFalse(is_sharded("past_questions/ab/cd/"))
+
+    def test_save_shards_by_content(self):
+        storage = past_question_storage()
+        first = storage.save("past_questions/2024/paper.pdf", ContentFile(b"one"))
+        second = storage.save("past_questions/2024/paper.pdf", ContentFile(b"two"))
+        self.assertTrue(is_sharded(first) and is_sharded(second))
+        self.assertNotEqual(first.split("/")[1:3], second.split("/")[1:3])
+
+    def test_local_download_streams_file(self):
+        storage = past_question_storage()
+        name = storage.save("past_questions/paper.pdf", ContentFile(b"%PDF-1.4"))
+        past_question = PastQuestion(file=name)
+        response = download_response(past_question.file, "Final 2023.pdf")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="Final 2023.pdf"'
+        )
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.4")
+        response.close()
+
+
+@skipUnless(ShardedS3Storage, "boto3/django-storages are not installed")
+class ShardedS3StorageTests(TestCase):
+    def setUp(self):
+        self.storage = ShardedS3Storage(
+            bucket_name="past-questions",
+            region_name="us-east-1",
+            access_key="test",
+            secret_key="test",
+            querystring_expire=300,
+            multipart_threshold=1024,
+        )
+        self.stubber = Stubber(self.storage.connection.meta.client)
+        self.stubber.activate()
+        self.addCleanup(self.stubber.deactivate)
+
+    def test_defaults(self):
+        self.assertFalse(self.storage.file_overwrite)
+        self.assertEqual(self.storage.transfer_config.multipart_threshold, 1024)
+
+    def test_save_shards_by_content(self):
+        self.stubber.add_client_error(
+            "head_object", service_error_code="404", http_status_code=404
+        )
+        self.stubber.add_response("put_object", {})
+        name = self.storage.save("past_questions/2024/paper.pdf", ContentFile(b"one"))
+        self.assertTrue(is_sharded(name))
+        self.stubber.assert_no_pending_responses()
+
+    def test_download_redirects_to_signed_url(self):
+        past_question = PastQuestion(file="past_questions/ab/cd/paper.pdf")
+        past_question.file.storage = self.storage
+        # Signing is local: the stubbed client fails on any request
+        response = download_response(past_question.file, "Final 2023.pdf")
+        self.assertEqual(response.status_code, 302)
+        url = urlsplit(response["Location"])
+        query = parse_qs(url.query)
+        self.assertTrue(url.path.endswith("/past_questions/ab/cd/paper.pdf"))
+        self.assertEqual(
+            query["response-content-disposition"],
+            ['attachment; filename="Final 2023.pdf"'],
+        )
+        self.assertIn("X-Amz-Signature", query)
+
+    def test_upload_url_binds_length_and_checksum(self):
+        digest = hashlib.sha256(b"%PDF").hexdigest()
+        name, expires = "past_questions/ab/cd/x-paper.pdf", time.time() + 60
+        url = signed_upload_url(self.storage, name, 4, expires, digest)
+        query = parse_qs(urlsplit(url).query)
+        self.assertEqual(
+            query["X-Amz-SignedHeaders"], ["content-length;host;x-amz-checksum-sha256"]
+        )
+        checksum = upload_headers(self.storage, digest)["x-amz-checksum-sha256"]
+        self.assertEqual(base64.b64decode(checksum).hex(), digest)
+
+
+class MigrateStorageTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        course = Course.objects.create(
+            code="CSC101",
+            title="Introduction to Computing",
+            faculty="computing",
+            department="Computer Science",
+            level="100",
+        )
+        uploader = User.objects.create_user("10000001", "ama@example.com", "pass")
+        self.source = storages["default"]
+        self.destination = past_question_storage()
+        self.name = self.source.save(
+            "past_questions/2024/01/31/paper.pdf", ContentFile(b"%PDF-1.4")
+        )
+        self.past_question = PastQuestion.objects.create(
+            course=course,
+            year=2023,
+            title="Final",
+            file=self.name,
+            file_name="paper.pdf",
+            file_size=8,
+            uploaded_by=uploader,
+        )
+
+    def migrate(self, *args):
+        output = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("migrate_storage", *args, stdout=output)
+        return output.getvalue()
+
+    def test_copies_repoints_and_deletes_source(self):
+        output = self.migrate("--delete-source")
+        self.assertIn("1 copied", output)
+        self.past_question.refresh_from_db()
+        new_name = self.past_question.file.name
+        self.assertTrue(is_sharded(new_name))
+        self.assertTrue(self.destination.exists(new_name))
+        self.assertFalse(self.source.exists(self.name))
+
+        self.assertIn("1 already in place", self.migrate())
+
+    def test_repoint_loses_to_concurrent_change(self):
+        with self.source.open(self.name, "rb") as stored:
+            copy = self.destination.save(self.name, stored)
+        # The row moves on (e.g. a scan optimisation) while the copy runs
+        PastQuestion.objects.filter(pk=self.past_question.pk).update(
+            file="past_questions/ef/01/replacement.pdf"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            repointed = MigrateStorageCommand().repoint(
+                self.past_question.pk,
+                self.name,
+                copy,
+                self.source,
+                self.destination,
+                {"delete_source": True},
+            )
+
+        self.assertFalse(repointed)
+        self.past_question.refresh_from_db()
+        self.assertEqual(
+            self.past_question.file.name, "past_questions/ef/01/replacement.pdf"
+        )
+        self.assertFalse(self.destination.exists(copy))
+        self.assertTrue(self.source.exists(self.name))
+
+
+class SignedDownloadTests(TempMediaMixin, TestCase):
+    """Signed links are checked without the database, on both the Django
+    view and the ASGI app"""
+
+    def setUp(self):
+        super().setUp()
+        course = Course.objects.create(
+            code="CSC101",
+            title="Introduction to Computing",
+            faculty="computing",
+            department="Computer Science",
+            level="100",
+        )
+        self.student = User.objects.create_user("10000001", "ama@example.com", "pass")
+        self.storage = past_question_storage()
+        self.name = self.storage.save("past_questions/final.pdf", ContentFile(b"%PDF"))
+        self.past_question = PastQuestion.objects.create(
+            course=course,
+            year=2023,
+            title="Final",
+            file=self.name,
+            file_name="Final 2023.pdf",
+            file_size=4,
+            uploaded_by=self.student,
+            status="approved",
+        )
+        self.app = SignedFileApp(not_found_app)
+
+    def link(self, name=None, filename="Final 2023.pdf", expires=None):
+        name = name or self.name
+        expires = expires or int(datetime.now().timestamp()) + 60
+        query = urlencode(
+            {
+                "expires": expires,
+                "filename": filename,
+                "sig": signature(name, expires, filename),
+            }
+        )
+        return f"/files/{name}?{query}"
+
+    def fetch(self, url):
+        """``(status, body)`` from the Django view and from ``SignedFileApp``;
+        error bodies are left out"""
+        response = self.client.get(url)
+        body = b"".join(response.streaming_content) if response.streaming else b""
+        response.close()
+        status, _, asgi_body = asgi_request(self.app, "GET", url)
+        return (response.status_code, body), (status, asgi_body * (status == 200))
+
+    def test_download_url_view(self):
+        response = self.client.post(
+            reverse(
+                "past_questions:past-question-download-url",
+                args=[self.past_question.pk],
+            ),
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.student)}",
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        expires_at = datetime.strptime(data["expires_at"], "%Y-%m-%d %H:%M:%S")
+        self.assertGreater(expires_at.year, 2000)
+        self.assertTrue(data["url"].startswith("http://testserver/files/"))
+
+        url = data["url"].removeprefix("http://testserver")
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                result = self.fetch(url)
+            self.assertEqual(result, ((200, b"%PDF"), (200, b"%PDF")))
+            self.assertEqual(len(queries), 0)
+
+    def test_signed_url_headers(self):
+        url, expires = signed_url(self.past_question.file, "Final 2023.pdf")
+        response = self.client.get(url)
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="Final 2023.pdf"'
+        )
+        self.assertTrue(response["Cache-Control"].startswith("private, max-age="))
+        response.close()
+        _, headers, _ = asgi_request(self.app, "HEAD", url)
+        self.assertEqual(headers["content-length"], "4")
+        self.assertEqual(
+            headers["content-disposition"], 'attachment; filename="Final 2023.pdf"'
+        )
+
+    def test_expired_link(self):
+        url = self.link(expires=int(datetime.now().timestamp()) - 1)
+        self.assertEqual(self.fetch(url), ((403, b""), (403, b"")))
+
+    def test_tampered_link(self):
+        url = self.link()
+        for tampered in [
+            url.replace("Final+2023.pdf", "Other.pdf"),
+            url.replace("final", "other"),
+            url[:-1] + ("0" if url[-1] != "0" else "1"),
+            url.split("&sig=")[0],
+        ]:
+            with self.subTest(tampered):
+                self.assertEqual(self.fetch(tampered), ((403, b""), (403, b"")))
+
+    def test_path_traversal(self):
+        root = Path(settings.MEDIA_ROOT)
+        (root / "secret.txt").write_bytes(b"secret")
+        # Even a correctly signed name may not leave the storage root
+        url = self.link("past_questions/../../secret.txt")
+        with self.settings(MEDIA_ROOT=str(root / "media")):
+            self.assertEqual(self.fetch(url), ((404, b""), (404, b"")))
+
+    def test_other_paths_pass_through(self):
+        status, _, body = asgi_request(self.app, "GET", "/api/courses/")
+        self.assertEqual((status, body), (404, b"passed through"))
+
+
+class UploadIntentTests(TempMediaMixin, TestCase):
+    """Intent, PUT and finalise, with the PUT answered by the Django view or
+    by ``SignedFileApp``"""
+
+    data = b"%PDF-1.4 final examination"
+
+    def setUp(self):
+        super().setUp()
+        self.course = Course.objects.create(
+            code="CSC101",
+            title="Introduction to Computing",
+            faculty="computing",
+            department="Computer Science",
+            level="100",
+        )
+        self.moderator = User.objects.create_user(
+            "10000002", "kofi@example.com", "pass", is_moderator=True
+        )
+        self.auth = {
+            "HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(self.moderator)}"
+        }
+        self.app = SignedFileApp(not_found_app)
+        self.storage = past_question_storage()
+
+    def create(self, file_name="Final 2023.pdf", size=None, data=None):
+        data = self.data if data is None else data
+        return self.client.post(
+            reverse("past_questions:upload-intent-create"),
+            {
+                "file_name": file_name,
+                "size": len(data) if size is None else size,
+                "sha256": hashlib.sha256(data).hexdigest(),
+            },
+            content_type="application/json",
+            **self.auth,
+        )
+
+    def put_wsgi(self, url, data):
+        response = self.client.put(
+            url.removeprefix("http://testserver"),
+            data,
+            content_type="application/octet-stream",
+        )
+        return response.status_code
+
+    def put_asgi(self, url, data, declare=True):
+        headers = [("content-length", str(len(data)))] if declare else []
+        status, _, _ = asgi_request(
+            self.app, "PUT", url.removeprefix("http://testserver"), data, headers
+        )
+        return status
+
+    def finalise(self, intent):
+        return self.client.post(
+            intent["finalise_url"].removeprefix("http://testserver"),
+            {
+                "course_id": self.course.pk,
+                "year": 2023,
+                "semester": "first",
+                "exam_type": "final",
+                "title": "Final 2023",
+            },
+            content_type="application/json",
+            **self.auth,
+        )
+
+    def test_upload_and_finalise(self):
+        for put in (self.put_wsgi, self.put_asgi):
+            with self.subTest(put.__name__):
+                PastQuestion.objects.all().delete()
+                response = self.create()
+                self.assertEqual(response.status_code, 201)
+                intent = response.json()
+                self.assertEqual(intent["upload_method"], "PUT")
+                self.assertEqual(self.finalise(intent).status_code, 400)
+
+                self.assertEqual(put(intent["upload_url"], self.data), 200)
+                response = self.finalise(intent)
+                self.assertEqual(response.status_code, 201, response.content)
+                past_question = PastQuestion.objects.get(pk=response.json()["id"])
+                self.assertEqual(past_question.file_name, "Final_2023.pdf")
+                self.assertEqual(past_question.file_size, len(self.data))
+                with past_question.file.open("rb") as stored:
+                    self.assertEqual(stored.read(), self.data)
+                self.assertEqual(
+                    UploadIntent.objects.get(token=intent["token"]).status,
+                    "completed",
+                )
+                self.assertEqual(self.finalise(intent).status_code, 409)
+
+    @skipUnless(content.PdfReader, "pypdf is not installed")
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_finalise_extracts_text(self):
+        data = sample_pdf("Final examination", "Answer all questions")
+        intent = self.create(data=data).json()
+        self.put_wsgi(intent["upload_url"], data)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.finalise(intent)
+        stored = PastQuestionContent.objects.get(past_question=response.json()["id"])
+        self.assertEqual(stored.text, "Final examination Answer all questions")
+        self.assertEqual(stored.file_hash, hashlib.sha256(data).hexdigest())
+
+    def test_put_never_replaces_a_stored_file(self):
+        for put in (self.put_wsgi, self.put_asgi):
+            with self.subTest(put.__name__):
+                PastQuestion.objects.all().delete()
+                intent = self.create().json()
+                self.assertEqual(intent["upload_headers"], {})
+                url = intent["upload_url"]
+                self.assertEqual(put(url, self.data), 200)
+                self.assertEqual(put(url, b"%PDF-1.4 other paper!!!!!"), 409)
+                self.assertEqual(self.finalise(intent).status_code, 201)
+                # The URL has not expired, but the intent is no longer pending
+                self.assertEqual(put(url, b"%PDF-1.4 other paper!!!!!"), 403)
+
+                key = UploadIntent.objects.get(token=intent["token"]).key
+                with self.storage.open(key, "rb") as stored:
+                    self.assertEqual(stored.read(), self.data)
+                self.assertFalse(self.storage.exists(f"{key}.part"))
+
+    def test_mismatched_upload_is_refused(self):
+        intent = self.create().json()
+        self.put_wsgi(intent["upload_url"], self.data[:-1] + b"!")
+        response = self.finalise(intent)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("SHA-256", response.json()["error"])
+
+    def test_put_is_capped_at_declared_size(self):
+        intent = self.create().json()
+        url, larger = intent["upload_url"], self.data + b"x"
+        self.assertEqual(self.put_wsgi(url, larger), 413)
+        self.assertEqual(self.put_asgi(url, larger), 413)
+        # Without a Content-Length the body is counted as it arrives
+        self.assertEqual(self.put_asgi(url, larger * 400, declare=False), 413)
+
+        key = UploadIntent.objects.get(token=intent["token"]).key
+        self.assertFalse(self.storage.exists(key))
+        self.assertFalse(self.storage.exists(f"{key}.part"))
+
+    def test_put_needs_valid_signature(self):
+        url = self.create().json()["upload_url"]
+        for tampered in [url.replace("size=", "size=1"), url + "0"]:
+            with self.subTest(tampered):
+                self.assertEqual(self.put_wsgi(tampered, self.data), 403)
+                self.assertEqual(self.put_asgi(tampered, self.data), 403)
+
+    def test_file_name_is_sanitised(self):
+        response = self.create("../../etc/Final 2023 (copy).pdf")
+        self.assertEqual(response.status_code, 201)
+        intent = UploadIntent.objects.get(token=response.json()["token"])
+        self.assertEqual(intent.file_name, "....etcFinal_2023_copy.pdf")
+        self.assertNotIn("/etc/", intent.key)
+        self.assertEqual(self.create("..").status_code, 400)
+
+    def test_cleanup_intents(self):
+        grace = settings.UPLOAD_INTENT_GRACE
+        abandoned = create_intent(self.moderator, "old.pdf", 4, "0" * 64)
+        # One finished PUT and one cut off halfway
+        stored = Path(self.storage.path(abandoned.key))
+        stored.parent.mkdir(parents=True)
+        stored.write_bytes(b"%PDF")
+        stored.with_name(f"{stored.name}.part").write_bytes(b"%P")
+        fresh = create_intent(self.moderator, "new.pdf", 1, "1" * 64)
+        done = create_intent(self.moderator, "done.pdf", 1, "2" * 64)
+        UploadIntent.objects.filter(pk__in=[abandoned.pk, done.pk]).update(
+            expires_at=timezone.now() - timedelta(seconds=grace + 60)
+        )
+        UploadIntent.objects.filter(pk=done.pk).update(status="completed")
+
+        self.assertEqual(cleanup_intents(dry_run=True), 1)
+        self.assertTrue(self.storage.exists(abandoned.key))
+
+        self.assertEqual(cleanup_intents(), 1)
+        self.assertFalse(self.storage.exists(abandoned.key))
+        self.assertFalse(self.storage.exists(f"{abandoned.key}.part"))
+        self.assertCountEqual(
+            UploadIntent.objects.values_list("pk", flat=True), [fresh.pk, done.pk]
+        )
+
+
+class SearchFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        computing, maths = Course.objects.bulk_create(
+            Course(
+                code=code,
+                title=title,
+                faculty="computing",
+                department="Computer Science",
+                level="100",
+            )
+            for code, title in [("CSC101", "Computing"), ("MAT101", "Calculus")]
+        )
+        uploader = User.objects.create_user("10000001", "ama@example.com", "pass")
+        papers = [
+            (computing, 2023, "first", "final", True, "approved"),
+            (computing, 2023, "second", "final", False, "approved"),
+            (computing, 2022, "first", "quiz", False, "approved"),
+            (computing, 2021, "first", "final", False, "pending"),
+            (maths, 2020, "first", "midterm", True, "approved"),
+        ]
+        PastQuestion.objects.bulk_create(
+            PastQuestion(
+                course=course,
+                year=year,
+                semester=semester,
+                exam_type=exam_type,
+                has_solutions=has_solutions,
+                status=status,
+                title=f"Paper {n}",
+                file_name=f"paper-{n}.pdf",
+                uploaded_by=uploader,
+            )
+            for n, (course, year, semester, exam_type, has_solutions, status) in (
+                enumerate(papers)
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, **params):
+        return self.client.get(reverse("past_questions:past-question-search"), params)
+
+    def test_counts_follow_filters(self):
+        response = self.search(course="csc", facets="year,exam_type,has_solutions")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(
+            data["facets"],
+            {
+                "year": [
+                    {"value": 2023, "label": 2023, "count": 2},
+                    {"value": 2022, "label": 2022, "count": 1},
+                ],
+                "exam_type": [
+                    {"value": "final", "label": "Final Exam", "count": 2},
+                    {"value": "quiz", "label": "Quiz", "count": 1},
+                ],
+                "has_solutions": [
+                    {"value": False, "label": False, "count": 2},
+                    {"value": True, "label": True, "count": 1},
+                ],
+            },
+        )
+
+        data = self.search(course="csc", semester="first", facets="semester").json()
+        self.assertEqual(
+            data["facets"],
+            {"semester": [{"value": "first", "label": "First Semester", "count": 2}]},
+        )
+
+    def test_unknown_facets_are_rejected(self):
+        response = self.search(course="csc", facets="year,colour")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("colour", response.json()["facets"][0])
+
+    def test_cache_key_covers_filters(self):
+        with mock.patch.object(
+            facets, "compute_facets", wraps=facets.compute_facets
+        ) as compute:
+            first = self.search(course="csc", facets="year").json()["facets"]
+            again = self.search(course="csc", facets="year").json()["facets"]
+            self.assertEqual((again, compute.call_count), (first, 1))
+
+            other = self.search(course="mat", facets="year").json()["facets"]
+            self.assertEqual(compute.call_count, 2)
+        self.assertEqual(other, {"year": [{"value": 2020, "label": 2020, "count": 1}]})
+
+
+@skipUnless(content.PdfReader, "pypdf is not installed")
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class ContentExtractionTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = Course.objects.create(
+            code="CSC101",
+            title="Introduction to Computing",
+            faculty="computing",
+            department="Computer Science",
+            level="100",
+        )
+        self.moderator = User.objects.create_user(
+            "10000002", "kofi@example.com", "pass", is_moderator=True
+        )
+
+    def upload(self, name, data, year=2023):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("past_questions:past-question-list"),
+                {
+                    "course_id": self.course.pk,
+                    "year": year,
+                    "semester": "first",
+                    "exam_type": "final",
+                    "file": ContentFile(data, name=name),
+                },
+                HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.moderator)}",
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        return PastQuestion.objects.get(year=year, file_name=name)
+
+    def test_upload_extracts_text(self):
+        paper = self.upload("final.pdf", sample_pdf("Define an algorithm"))
+        self.assertEqual(paper.content.text, "Define an algorithm")
+        self.assertEqual(paper.content.page_count, 1)
+        self.assertEqual(paper.content.status, "extracted")
+        self.assertEqual(content.update_content(paper), "unchanged")
+
+        # An identical re-upload reuses the text without parsing the PDF
+        with mock.patch.object(content, "extract_text") as extract:
+            twin = self.upload("final.pdf", sample_pdf("Define an algorithm"), 2022)
+        extract.assert_not_called()
+        self.assertEqual(twin.content.text, "Define an algorithm")
+
+    def test_images_and_broken_pdfs(self):
+        image = self.upload("scan.png", encode(scanned_page((60, 80)), "PNG"))
+        self.assertFalse(hasattr(image, "content"))
+
+        with self.assertLogs("apps.past_questions", "WARNING"), self.assertLogs(
+            "pypdf", "WARNING"
+        ):
+            broken = self.upload("broken.pdf", b"%PDF-1.4 not really", 2022)
+        self.assertEqual((broken.content.status, broken.content.text), ("failed", ""))
+
+    @override_settings(CONTENT_EXTRACT_ON_UPLOAD=False)
+    def test_extraction_can_be_turned_off(self):
+        paper = self.upload("final.pdf", sample_pdf("Define an algorithm"))
+        self.assertFalse(hasattr(paper, "content"))
+
+
+class ContentSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        computing, maths = Course.objects.bulk_create(
+            Course(
+                code=code,
+                title=title,
+                faculty="computing",
+                department="Computer Science",
+                level="100",
+            )
+            for code, title in [("CSC101", "Computing"), ("MAT101", "Calculus")]
+        )
+        uploader = User.objects.create_user("10000001", "ama@example.com", "pass")
+        papers = [
+            (computing, 2023, "approved", "Explain binary search and its cost"),
+            (computing, 2022, "approved", "Sort the list, then binary search it"),
+            (computing, 2021, "pending", "Binary search trees"),
+            (maths, 2020, "approved", "Binary expansion of a function"),
+        ]
+        for n, (course, year, status, text) in enumerate(papers):
+            paper = PastQuestion.objects.create(
+                course=course,
+                year=year,
+                status=status,
+                title=f"Paper {n}",
+                file_name=f"paper-{n}.pdf",
+                uploaded_by=uploader,
+            )
+            PastQuestionContent.objects.create(
+                past_question=paper, file_hash=f"{n:064d}", text=text
+            )
+
+    def search(self, **params):
+        return self.client.get(
+            reverse("past_questions:past-question-content-search"), params
+        )
+
+    def titles(self, **params):
+        response = self.search(**params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [result["title"] for result in response.json()["results"]]
+
+    def test_matches_every_term_in_approved_papers(self):
+        # PostgreSQL orders by rank, so only membership is portable
+        self.assertCountEqual(self.titles(q="binary search"), ["Paper 0", "Paper 1"])
+        self.assertCountEqual(
+            self.titles(q="binary"), ["Paper 0", "Paper 1", "Paper 3"]
+        )
+        self.assertEqual(self.titles(q="quicksort"), [])
+
+    def test_filters(self):
+        self.assertEqual(self.titles(q="binary", course="mat"), ["Paper 3"])
+        self.assertEqual(self.titles(q="binary", year=2022), ["Paper 1"])
+        self.assertEqual(self.search(q="binary", year="last").status_code, 400)
+        self.assertEqual(self.search().status_code, 400)
+
+    def test_snippets_are_highlighted(self):
+        (result,) = self.search(q="search", year=2022).json()["results"]
+        self.assertIn("binary <mark>search</mark> it", result["snippet"])
+
+
+class SnippetTests(TestCase):
+    def test_window_around_first_match(self):
+        text = "a" * 200 + " binary search " + "b" * 200
+        headline = content.python_headline(text, "search", width=40)
+        self.assertTrue(headline.startswith("…") and headline.endswith("…"))
+        # Two ellipses and two markers around the 40 characters of text
+        self.assertEqual(len(headline), 44)
+        self.assertIn(f"{content.MARK_START}search{content.MARK_STOP}", headline)
+
+        headline = content.python_headline("short text", "text", width=40)
+        self.assertEqual(headline, f"short {content.MARK_START}text{content.MARK_STOP}")
+        self.assertEqual(content.python_headline("short text", "missing"), "")
+        self.assertEqual(content.python_headline("short text", "  "), "")
+
+    def test_terms_are_literal_and_case_insensitive(self):
+        headline = content.python_headline("Is a.b O(n)? Yes", "o(n)? A.B")
+        self.assertEqual(
+            content.render_snippet(headline),
+            "Is <mark>a.b</mark> <mark>O(n)?</mark> Yes",
+        )
+
+    def test_html_is_escaped(self):
+        paper = SimpleNamespace(
+            headline=f"<b>{content.MARK_START}x < y{content.MARK_STOP}</b>"
+        )
+        self.assertEqual(
+            content.snippet_for(paper, "x"), "&lt;b&gt;<mark>x &lt; y</mark>&lt;/b&gt;"
+        )
+        self.assertEqual(content.snippet_for(SimpleNamespace(content=None), "x"), "")
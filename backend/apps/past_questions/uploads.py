@@ -0,0 +1,124 @@
+"""
+Direct-to-storage uploads through upload intents.
+
+Streaming a file through Django's multipart parser holds a worker for as
+long as the student's connection takes. Instead the client asks for an
+intent, PUTs the file to the signed URL it gets back (S3 or MinIO directly,
+or ``SignedFileApp`` for local storage), then finalises. Finalising checks
+the stored object against the declared size and SHA-256 and creates the
+past question through ``PastQuestionCreateSerializer``. The file is written
+to its final, hash-sharded key up front, so finalising never copies it.
+"""
+
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from django.utils.crypto import get_random_string
+
+from .models import PastQuestion, UploadIntent
+from .signed_urls import signed_upload_url, upload_headers
+from .storage import is_remote, past_question_storage, sharded_name
+
+KEY_MAX_LENGTH = PastQuestion._meta.get_field("file").max_length
+
+
+def intent_key(file_name, sha256):
+    """Final storage key for an upload: sharded by the declared hash and
+    prefixed with a random tag so nobody can PUT over another file"""
+    stem, ext = os.path.splitext(get_valid_filename(file_name))
+    tag = get_random_string(8, "abcdefghijklmnopqrstuvwxyz0123456789")
+    key = sharded_name(f"past_questions/{tag}-{stem}{ext.lower()}", sha256)
+    if len(key) > KEY_MAX_LENGTH:
+        key = sharded_name(
+            f"past_questions/{tag}-{stem[: len(stem) - len(key) + KEY_MAX_LENGTH]}"
+            f"{ext.lower()}",
+            sha256,
+        )
+    return key
+
+
+def create_intent(user, file_name, size, sha256):
+    ttl = getattr(settings, "UPLOAD_INTENT_TTL", 3600)
+    # The name ends up in the past question and its download headers
+    file_name = get_valid_filename(file_name)
+    return UploadIntent.objects.create(
+        user=user,
+        file_name=file_name,
+        key=intent_key(file_name, sha256),
+        size=size,
+        sha256=sha256,
+        expires_at=timezone.now() + timedelta(seconds=ttl),
+    )
+
+
+def upload_url(intent):
+    expires = int(intent.expires_at.timestamp())
+    return signed_upload_url(
+        past_question_storage(), intent.key, intent.size, expires, intent.sha256
+    )
+
+
+def upload_url_headers(intent):
+    return upload_headers(past_question_storage(), intent.sha256)
+
+
+def finalise_deadline(intent):
+    """Uploads that started just before expiry still get to finish"""
+    grace = getattr(settings, "UPLOAD_INTENT_GRACE", 3600)
+    return intent.expires_at + timedelta(seconds=grace)
+
+
+def stored_sha256(storage, name):
+    digest = hashlib.sha256()
+    with storage.open(name, "rb") as stored:
+        for chunk in iter(lambda: stored.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StoredUpload(File):
+    """Stand-in for a file that is already in storage, so the create
+    serializer can apply its size and type rules without re-reading it"""
+
+    def __init__(self, name, size):
+        super().__init__(None, name)
+        self.size = size
+
+
+def check_stored_file(intent):
+    """``(StoredUpload, error)`` after checking the upload landed intact"""
+    storage = past_question_storage()
+    if not storage.exists(intent.key):
+        return None, "The file has not been uploaded yet"
+    size = storage.size(intent.key)
+    if size != intent.size:
+        return None, f"Uploaded {size} bytes but {intent.size} were declared"
+    if stored_sha256(storage, intent.key) != intent.sha256:
+        return None, "The uploaded file does not match the declared SHA-256"
+    return StoredUpload(intent.file_name, size), None
+
+
+def cleanup_intents(dry_run=False):
+    """Delete pending intents past their deadline and anything they stored;
+    returns how many were removed"""
+    grace = getattr(settings, "UPLOAD_INTENT_GRACE", 3600)
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    storage = past_question_storage()
+    abandoned = UploadIntent.objects.filter(status="pending", expires_at__lt=cutoff)
+    removed = 0
+    for intent in abandoned.iterator(chunk_size=200):
+        removed += 1
+        if dry_run:
+            continue
+        # A key is never shared, but be certain no paper points at it
+        if not PastQuestion.objects.filter(file=intent.key).exists():
+            storage.delete(intent.key)
+            if not is_remote(storage):
+                storage.delete(f"{intent.key}.part")
+        intent.delete()
+    return removed
@@ -6,6 +6,7 @@ app_name = "past_questions"
 urlpatterns = [
     # Basic CRUD
     path("", views.PastQuestionListView.as_view(), name="past-question-list"),
+    path("batch/", views.PastQuestionBatchView.as_view(), name="past-question-batch"),
     path(
         "<int:pk>/", views.PastQuestionDetailView.as_view(), name="past-question-detail"
     ),
@@ -15,10 +16,34 @@ urlpatterns = [
         views.PastQuestionDownloadView.as_view(),
         name="past-question-download",
     ),
+    path(
+        "<int:pk>/download-url/",
+        views.PastQuestionDownloadURLView.as_view(),
+        name="past-question-download-url",
+    ),
+    path(
+        "<int:pk>/similar/",
+        views.PastQuestionSimilarView.as_view(),
+        name="past-question-similar",
+    ),
+    # Direct-to-storage uploads
+    path(
+        "uploads/", views.UploadIntentCreateView.as_view(), name="upload-intent-create"
+    ),
+    path(
+        "uploads/<uuid:token>/finalise/",
+        views.UploadIntentFinaliseView.as_view(),
+        name="upload-intent-finalise",
+    ),
     # Search
     path(
         "search/", views.PastQuestionSearchView.as_view(), name="past-question-search"
     ),
+    path(
+        "search/content/",
+        views.PastQuestionContentSearchView.as_view(),
+        name="past-question-content-search",
+    ),
     path(
         "popular/",
         views.PopularPastQuestionsView.as_view(),
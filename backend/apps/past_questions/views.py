@@ -2,24 +2,59 @@ from rest_framework import generics, status, filters, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db.models import Case, F, Q, When
 from django.shortcuts import get_object_or_404
-from django.db import transaction
-from django.http import FileResponse
-import os
+from django.db import IntegrityError, transaction
+from django.urls import reverse
 from .permissions import *
 from django.utils import timezone
-from .models import PastQuestion, DownloadHistory
+from datetime import datetime, timezone as dt_timezone
+from .content import schedule_content_extraction, search_content
+from .facets import get_facets
+from .fingerprints import (
+    find_duplicates,
+    find_similar,
+    schedule_fingerprint,
+    sync_course,
+)
+from .optimization import schedule_scan_optimization
+from .signed_urls import signed_url
+from .storage import download_response
+from .uploads import (
+    check_stored_file,
+    create_intent,
+    finalise_deadline,
+    upload_url,
+    upload_url_headers,
+)
+from .models import (
+    PastQuestion,
+    DownloadHistory,
+    PastQuestionFingerprint,
+    UploadIntent,
+)
 from apps.users.models import User
+from apps.analytics.metrics import DOWNLOADS, DOWNLOAD_BYTES, REVIEWS, UPLOADS
 from .serializers import (
+    PastQuestionContentResultSerializer,
+    PastQuestionBatchSerializer,
+    PastQuestionContentSearchSerializer,
     PastQuestionSerializer,
     PastQuestionCreateSerializer,
     PastQuestionSearchSerializer,
+    PastQuestionValuesSerializer,
+    PendingPastQuestionSerializer,
+    SignedDownloadSerializer,
+    UploadIntentSerializer,
 )
 from apps.courses.models import Course
+from config.compiled import ValuesListMixin
+from config.fieldsets import SparseFieldsMixin
 
 
-class PastQuestionListView(generics.ListCreateAPIView):
+class PastQuestionListView(
+    ValuesListMixin, SparseFieldsMixin, generics.ListCreateAPIView
+):
     """
     List past questions or upload new one
     GET: List approved past questions (public)
@@ -27,6 +62,7 @@ class PastQuestionListView(generics.ListCreateAPIView):
     """
 
     serializer_class = PastQuestionSerializer
+    values_serializer_class = PastQuestionValuesSerializer
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,
@@ -48,41 +84,191 @@ class PastQuestionListView(generics.ListCreateAPIView):
         return PastQuestionSerializer
 
     def get_queryset(self):
-        queryset = PastQuestion.objects.select_related("course", "uploaded_by")
-        user = getattr(self.request, "user", None)
-
-        if (
-            user
-            and user.is_authenticated
-            and (
-                IsAdminUser().has_permission(self.request, self)
-                or IsModerator().has_permission(self.request, self)
-            )
-        ):
-            return queryset.all()
-        return queryset.filter(status="approved")
+        return visible_past_questions(self.request, self)
 
     def perform_create(self, serializer):
         """Set uploaded_by to current user"""
-        user = self.request.user
-        serializer.save(uploaded_by=self.request.user)
-        user.upload_count += 1
-        user.save(update_fields=["upload_count"])
+        past_question = serializer.save(uploaded_by=self.request.user)
+        record_upload(self.request.user, past_question)
+
+
+def is_reviewer(request, view):
+    """Admins and moderators, who can see past questions in any status"""
+    user = getattr(request, "user", None)
+    return bool(
+        user
+        and user.is_authenticated
+        and (
+            IsAdminUser().has_permission(request, view)
+            or IsModerator().has_permission(request, view)
+        )
+    )
+
+
+def visible_past_questions(request, view):
+    """Everything for reviewers, approved past questions for everyone else"""
+    queryset = PastQuestion.objects.all()
+    if is_reviewer(request, view):
+        return queryset
+    return queryset.filter(status="approved")
+
 
+def record_upload(user, past_question):
+    """Count a new upload and queue its post-upload processing"""
+    user.upload_count += 1
+    user.save(update_fields=["upload_count"])
+    UPLOADS.inc()
+    schedule_scan_optimization(past_question)
+    schedule_content_extraction(past_question)
+    schedule_fingerprint(past_question)
 
-class PastQuestionDetailView(generics.RetrieveUpdateDestroyAPIView):
+
+class PastQuestionBatchView(ValuesListMixin, SparseFieldsMixin, generics.ListAPIView):
+    """
+    Fetch up to PAST_QUESTION_BATCH_MAX_IDS past questions by id
+    GET ?ids=3,1,2: the visible ones, in the order asked for
+    ?record_views=true counts a view of each, as the detail view does
+    """
+
+    serializer_class = PastQuestionSerializer
+    values_serializer_class = PastQuestionValuesSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = []
+    pagination_class = None
+
+    def get_queryset(self):
+        serializer = PastQuestionBatchSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        self.batch_params = serializer.validated_data
+
+        ids = self.batch_params["ids"]
+        position = Case(*[When(pk=pk, then=index) for index, pk in enumerate(ids)])
+        return (
+            visible_past_questions(self.request, self)
+            .filter(pk__in=ids)
+            .order_by(position)
+        )
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if self.batch_params["record_views"] and not is_reviewer(request, self):
+            # One UPDATE for the whole batch; the response shows the
+            # counts as they were before this view
+            visible_past_questions(request, self).filter(
+                pk__in=self.batch_params["ids"]
+            ).update(view_count=F("view_count") + 1)
+        return response
+
+
+class UploadIntentCreateView(generics.CreateAPIView):
+    """
+    Reserve a slot for uploading a file straight to storage
+    """
+
+    serializer_class = UploadIntentSerializer
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser | IsModerator]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        intent = create_intent(request.user, **serializer.validated_data)
+        url = upload_url(intent)
+        finalise_url = reverse(
+            "past_questions:upload-intent-finalise", args=[intent.token]
+        )
+        intent.upload_url = request.build_absolute_uri(url)
+        intent.upload_method = "PUT"
+        intent.upload_headers = upload_url_headers(intent)
+        intent.finalise_url = request.build_absolute_uri(finalise_url)
+        return Response(
+            self.get_serializer(intent).data, status=status.HTTP_201_CREATED
+        )
+
+
+class UploadIntentFinaliseView(APIView):
+    """
+    Check a directly uploaded file and create the past question from it,
+    with the same rules as a regular upload
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser | IsModerator]
+
+    def post(self, request, token):
+        intent = get_object_or_404(UploadIntent, token=token, user=request.user)
+        if intent.status != "pending":
+            return Response(
+                {"error": "This upload has already been finalised"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if timezone.now() > finalise_deadline(intent):
+            return Response(
+                {"error": "This upload has expired"}, status=status.HTTP_410_GONE
+            )
+
+        stored, error = check_stored_file(intent)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = {key: value for key, value in request.data.items() if key != "file"}
+        serializer = PastQuestionCreateSerializer(
+            data={**data, "file": stored}, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            # Lock the intent so a repeated finalise cannot create a twin
+            locked = UploadIntent.objects.select_for_update().filter(
+                pk=intent.pk, status="pending"
+            )
+            if not locked.exists():
+                return Response(
+                    {"error": "This upload has already been finalised"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            try:
+                with transaction.atomic():
+                    past_question = serializer.save(
+                        uploaded_by=request.user,
+                        file=intent.key,
+                        file_name=intent.file_name,
+                        file_size=intent.size,
+                    )
+            except IntegrityError:
+                return Response(
+                    {"error": "This paper has already been uploaded"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            locked.update(
+                status="completed",
+                past_question=past_question,
+                completed_at=timezone.now(),
+            )
+            record_upload(request.user, past_question)
+
+        return Response(
+            PastQuestionSerializer(past_question, context={"request": request}).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class PastQuestionDetailView(SparseFieldsMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a past question
     """
 
     queryset = PastQuestion.objects.all()
     serializer_class = PastQuestionSerializer
+    default_expand = ("course", "uploaded_by")
+    trim_queryset = False
 
     def get_permissions(self):
         if self.request.method == "GET":
             return [permissions.AllowAny()]
         return [permission() for permission in [IsAdminUser | IsModerator]]
 
+    def perform_update(self, serializer):
+        sync_course(serializer.save())
+
     def retrieve(self, request, *args, **kwargs):
         """Increment view count and user download count on retrieve"""
         instance = self.get_object()
@@ -103,30 +289,32 @@ class PastQuestionDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Response(serializer.data)
 
 
-class PastQuestionDownloadView(APIView):
+class BaseDownloadView(APIView):
     """
-    Download a past question file and increment user stats
+    Permission checks and download bookkeeping shared by the download views
     """
 
     permission_classes = [permissions.IsAuthenticated]
 
-    def get(self, request, pk):
+    def get_downloadable(self, request, pk):
+        """The past question, or an error response if it cannot be downloaded"""
         past_question = get_object_or_404(PastQuestion, pk=pk)
 
         if past_question.status != "approved" and not (
             request.user.is_admin or request.user.is_moderator
         ):
-            return Response(
+            return None, Response(
                 {"error": "This past question is not approved yet"},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        file_path = past_question.file.path
-        if not os.path.exists(file_path):
-            return Response(
+        if not past_question.file.storage.exists(past_question.file.name):
+            return None, Response(
                 {"error": "File not found"}, status=status.HTTP_404_NOT_FOUND
             )
+        return past_question, None
 
+    def record_download(self, request, past_question):
         with transaction.atomic():
             past_question.increment_download_count()
 
@@ -139,22 +327,59 @@ class PastQuestionDownloadView(APIView):
                 past_question=past_question,
                 ip_address=request.META.get("REMOTE_ADDR"),
             )
+        DOWNLOADS.inc()
 
-        response = FileResponse(
-            open(file_path, "rb"), content_type="application/octet-stream"
-        )
-        response["Content-Disposition"] = (
-            f'attachment; filename="{past_question.file_name}"'
+
+class PastQuestionDownloadView(BaseDownloadView):
+    """
+    Download a past question file and increment user stats
+    """
+
+    def get(self, request, pk):
+        past_question, error = self.get_downloadable(request, pk)
+        if error is not None:
+            return error
+
+        self.record_download(request, past_question)
+        response = download_response(past_question.file, past_question.file_name)
+        DOWNLOAD_BYTES.inc(
+            int(response.get("Content-Length") or past_question.file_size or 0)
         )
         return response
 
 
-class PastQuestionSearchView(generics.ListAPIView):
+class PastQuestionDownloadURLView(BaseDownloadView):
+    """
+    Record a download and return a short-lived signed URL for the file,
+    so the transfer itself needs no authentication or database work
+    """
+
+    def post(self, request, pk):
+        past_question, error = self.get_downloadable(request, pk)
+        if error is not None:
+            return error
+
+        self.record_download(request, past_question)
+        url, expires = signed_url(past_question.file, past_question.file_name)
+        if url.startswith("/"):
+            url = request.build_absolute_uri(url)
+        DOWNLOAD_BYTES.inc(past_question.file_size or 0)
+        serializer = SignedDownloadSerializer(
+            {
+                "url": url,
+                "expires_at": datetime.fromtimestamp(expires, tz=dt_timezone.utc),
+            }
+        )
+        return Response(serializer.data)
+
+
+class PastQuestionSearchView(ValuesListMixin, SparseFieldsMixin, generics.ListAPIView):
     """
     Advanced search for past questions
     """
 
     serializer_class = PastQuestionSerializer
+    values_serializer_class = PastQuestionValuesSerializer
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
@@ -163,7 +388,7 @@ class PastQuestionSearchView(generics.ListAPIView):
         # Get search parameters
         serializer = PastQuestionSearchSerializer(data=self.request.query_params)
         serializer.is_valid(raise_exception=True)
-        data = serializer.validated_data
+        data = self.search_params = serializer.validated_data
 
         # Apply filters
         if data.get("course"):
@@ -182,10 +407,50 @@ class PastQuestionSearchView(generics.ListAPIView):
                 | Q(lecturer__icontains=data["q"])
             )
 
-        return queryset.select_related("course", "uploaded_by")
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """Add per-facet counts when ``facets=`` is requested"""
+        response = super().list(request, *args, **kwargs)
+
+        facets = self.search_params.get("facets")
+        if facets:
+            queryset = self.filter_queryset(self.get_queryset())
+            if not isinstance(response.data, dict):
+                response.data = {"results": response.data}
+            response.data["facets"] = get_facets(queryset, facets, self.search_params)
+        return response
+
+
+class PastQuestionContentSearchView(SparseFieldsMixin, generics.ListAPIView):
+    """
+    Search the text inside approved papers, with highlighted snippets
+    """
+
+    serializer_class = PastQuestionContentResultSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = []
+
+    def get_queryset(self):
+        serializer = PastQuestionContentSearchSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = self.search_params = serializer.validated_data
+
+        queryset = PastQuestion.objects.filter(status="approved")
+        if data.get("course"):
+            queryset = queryset.filter(course__code__icontains=data["course"])
+        if data.get("year"):
+            queryset = queryset.filter(year=data["year"])
+
+        return search_content(queryset, data["q"])
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["query"] = getattr(self, "search_params", {}).get("q", "")
+        return context
 
-class UserUploadsView(generics.ListAPIView):
+
+class UserUploadsView(SparseFieldsMixin, generics.ListAPIView):
     """
     Get past questions uploaded by current user
     """
@@ -194,27 +459,72 @@ class UserUploadsView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return (
-            PastQuestion.objects.filter(uploaded_by=self.request.user)
-            .select_related("course")
-            .order_by("-uploaded_at")
+        return PastQuestion.objects.filter(uploaded_by=self.request.user).order_by(
+            "-uploaded_at"
         )
 
 
-class PendingReviewListView(generics.ListAPIView):
+class PendingReviewListView(SparseFieldsMixin, generics.ListAPIView):
     """
     Get past questions pending review (admin/moderator only)
     """
 
-    serializer_class = PastQuestionSerializer
+    serializer_class = PendingPastQuestionSerializer
     permission_classes = [IsAdminUser | IsModerator]
 
     def get_queryset(self):
-        return (
-            PastQuestion.objects.filter(status="pending")
-            .select_related("course", "uploaded_by")
-            .order_by("uploaded_at")
+        return PastQuestion.objects.filter(status="pending").order_by("uploaded_at")
+
+    def get_serializer(self, *args, **kwargs):
+        """Look up likely duplicates for the whole page at once"""
+        serializer = super().get_serializer(*args, **kwargs)
+        if args:
+            serializer.context["duplicates"] = find_duplicates(
+                [past_question.pk for past_question in args[0]]
+            )
+        return serializer
+
+
+class PastQuestionSimilarView(APIView):
+    """
+    Papers in the same course that look like this one
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, pk):
+        past_question = get_object_or_404(PastQuestion, pk=pk)
+        user = request.user
+        is_staff = bool(
+            user and user.is_authenticated and (user.is_admin or user.is_moderator)
         )
+        if past_question.status != "approved" and not is_staff:
+            return Response(
+                {"error": "This past question is not approved yet"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        fingerprint = PastQuestionFingerprint.objects.filter(past_question=pk).first()
+        if fingerprint is None:
+            return Response({"fingerprinted": False, "results": []})
+
+        matches = find_similar(fingerprint, statuses=None if is_staff else ["approved"])
+        papers = PastQuestion.objects.in_bulk(
+            [match_pk for match_pk, _ in matches],
+        )
+        results = [
+            {
+                "id": match_pk,
+                "title": papers[match_pk].title,
+                "year": papers[match_pk].year,
+                "exam_type": papers[match_pk].exam_type,
+                "status": papers[match_pk].status,
+                "distance": distance,
+            }
+            for match_pk, distance in matches
+            if match_pk in papers
+        ]
+        return Response({"fingerprinted": True, "results": results})
 
 
 class ApprovePastQuestionView(APIView):
@@ -241,6 +551,7 @@ class ApprovePastQuestionView(APIView):
         uploader = past_question.uploaded_by
         uploader.successful_uploads += 1
         uploader.save(update_fields=["successful_uploads"])
+        REVIEWS.inc(decision="approved")
 
         # TODO: Send notification to uploader
 
@@ -272,6 +583,7 @@ class RejectPastQuestionView(APIView):
         past_question.reviewed_at = timezone.now()
         past_question.rejection_reason = rejection_reason
         past_question.save()
+        REVIEWS.inc(decision="rejected")
 
         # TODO: Send notification to uploader
 
@@ -281,17 +593,18 @@ class RejectPastQuestionView(APIView):
         )
 
 
-class PopularPastQuestionsView(generics.ListAPIView):
+class PopularPastQuestionsView(
+    ValuesListMixin, SparseFieldsMixin, generics.ListAPIView
+):
     """
     Get most downloaded past questions
     """
 
     serializer_class = PastQuestionSerializer
+    values_serializer_class = PastQuestionValuesSerializer
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
-        return (
-            PastQuestion.objects.filter(status="approved")
-            .select_related("course")
-            .order_by("-download_count")[:20]
-        )
+        return PastQuestion.objects.filter(status="approved").order_by(
+            "-download_count"
+        )[:20]
@@ -1,9 +1,10 @@
 from rest_framework import generics, permissions
+from config.streaming import StreamingListMixin
 from ..models import User
 from ..serializers import UserProfileSerializer
 
 
-class UserListView(generics.ListAPIView):
+class UserListView(StreamingListMixin, generics.ListAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAdminUser]
     pagination_class = None
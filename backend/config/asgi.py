@@ -14,3 +14,16 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Signed download links are answered before Django's request handling
+from apps.past_questions.signed_urls import SignedFileApp  # noqa: E402
+
+application = SignedFileApp(application)
+
+# Pay first-request costs (URLs, serializers, connections, caches) at boot
+from django.conf import settings  # noqa: E402
+
+if settings.WARMUP_ON_STARTUP:
+    from config.warmup import warm_up
+
+    warm_up()
@@ -0,0 +1,193 @@
+"""
+Read-only serialization straight from ``.values_list()`` rows.
+
+A ``ModelSerializer`` builds a model instance per row and runs every
+field's ``get_attribute``/``to_representation`` on it. ``ValuesSerializer``
+compiles the same serializer once into a column list and one small getter
+per output field, then builds each row's dict from a plain tuple. The
+output is identical to ``serializer_class`` for the flat (unexpanded)
+shape:
+
+* model fields whose representation is the value itself (integers,
+  strings, choices, booleans, floats, primary keys) are copied as is;
+* other model fields (datetimes, decimals) go through the serializer
+  field's own ``to_representation``;
+* ``get_<field>_display`` sources look the label up in the field's
+  choices, translated once per serializer;
+* file fields are turned into URLs from the storage's base URL, made
+  absolute once per request.
+
+Anything else (method fields, properties, methods on related objects) is
+compiled by ``compile_field`` in a subclass, e.g.::
+
+    def compile_field(self, name, field, column):
+        if name == "owner_name":
+            index = column("owner__username")
+            return lambda row: row[index].title()
+        return super().compile_field(name, field, column)
+
+``ValuesListMixin`` uses it for GET list requests that expand nothing.
+"""
+
+import re
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
+from rest_framework import fields as drf_fields
+from rest_framework import relations
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+PLAIN_FIELDS = (
+    drf_fields.IntegerField,
+    drf_fields.CharField,
+    drf_fields.ChoiceField,
+    drf_fields.BooleanField,
+    drf_fields.FloatField,
+    relations.PrimaryKeyRelatedField,
+)
+DISPLAY_SOURCE_RE = re.compile(r"^get_(\w+)_display$")
+
+
+def _nullable(getter, index):
+    """``None`` stays ``None``, as in ``Serializer.to_representation``"""
+
+    def get(row):
+        value = row[index]
+        return None if value is None else getter(value)
+
+    return get
+
+
+class CountedRows:
+    """``.values_list()`` rows that paginators count on the plain queryset,
+    without the joins the rows need"""
+
+    def __init__(self, rows, queryset):
+        self.rows, self.queryset = rows, queryset
+        self.ordered = rows.ordered
+
+    def count(self):
+        return self.queryset.count()
+
+    def __getitem__(self, key):
+        return self.rows[key]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class ValuesSerializer:
+    serializer_class = None
+
+    def __init__(self, fields=None, context=None):
+        self.context = context or {}
+        serializer = self.serializer_class(fields=fields, expand=())
+        self.model = serializer.Meta.model
+        columns = {}
+
+        def column(path):
+            return columns.setdefault(path, len(columns))
+
+        self.getters = [
+            (name, self.compile_field(name, field, column))
+            for name, field in serializer.fields.items()
+            if not field.write_only
+        ]
+        self.columns = list(columns)
+
+    def compile_field(self, name, field, column):
+        """Return a getter taking a row tuple for one output field"""
+        match = DISPLAY_SOURCE_RE.match(field.source)
+        if match:
+            choice_field = self.model._meta.get_field(match.group(1))
+            labels = {value: str(label) for value, label in choice_field.flatchoices}
+            index = column(choice_field.name)
+            return lambda row: labels.get(row[index], row[index])
+
+        model_field = self.model_field(field.source)
+        if model_field is None:
+            raise ValueError(
+                f"{type(self).__name__} cannot compile field {name!r}; "
+                "handle it in compile_field()"
+            )
+        index = column("__".join(field.source_attrs))
+        if isinstance(field, drf_fields.FileField):
+            return self.compile_file(field, model_field.storage, index)
+        if type(field) in PLAIN_FIELDS and not getattr(field, "pk_field", None):
+            return lambda row: row[index]
+        return _nullable(field.to_representation, index)
+
+    def compile_file(self, field, storage, index):
+        """URL getter matching ``FileField.to_representation``"""
+        request = self.context.get("request")
+        if not getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL):
+            return lambda row: row[index] or None
+
+        base_url = getattr(storage, "base_url", None)
+        if isinstance(storage, FileSystemStorage) and base_url.startswith("/"):
+            # Stored names never contain "//", "." or ".." segments, so
+            # joining onto the absolute base equals storage.url() followed
+            # by request.build_absolute_uri()
+            base = request.build_absolute_uri(base_url) if request else base_url
+            base = base.rstrip("/") + "/"
+            return lambda row: (
+                base + filepath_to_uri(row[index]).lstrip("/") if row[index] else None
+            )
+
+        def url(row):
+            if not row[index]:
+                return None
+            location = storage.url(row[index])
+            return request.build_absolute_uri(location) if request else location
+
+        return url
+
+    def model_field(self, source):
+        """The model field ``source`` ends at, or ``None`` for methods and
+        properties"""
+        model, field = self.model, None
+        for attr in source.split("."):
+            if model is None:
+                return None
+            try:
+                field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+            model = field.related_model
+        return field if field.concrete else None
+
+    def values(self, queryset):
+        return CountedRows(queryset.values_list(*self.columns), queryset)
+
+    def to_representation(self, rows):
+        getters = self.getters
+        return [{name: getter(row) for name, getter in getters} for row in rows]
+
+
+class ValuesListMixin:
+    """List GET requests answered by ``values_serializer_class``
+
+    Requests that expand a relation use the regular serializer. Combine
+    with ``config.fieldsets.SparseFieldsMixin`` for ``?fields=``.
+    """
+
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        fieldsets = self.get_fieldsets() if hasattr(self, "get_fieldsets") else {}
+        if self.values_serializer_class is None or fieldsets.get("expand"):
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.values_serializer_class(
+            fields=fieldsets.get("fields"), context=self.get_serializer_context()
+        )
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(queryset))
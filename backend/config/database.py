@@ -0,0 +1,102 @@
+"""
+Connection handling for every configured database (``DB_POOL_MODE``).
+
+``persistent`` (default)
+    Each worker thread keeps its connection open for ``DB_CONN_MAX_AGE``
+    seconds instead of reconnecting per request. ``DB_CONN_HEALTH_CHECKS``
+    pings a reused connection at the start of each request so a server
+    restart or idle timeout costs one retry rather than a 500.
+
+``psycopg``
+    A psycopg 3 connection pool per worker process (Django's built-in
+    ``OPTIONS["pool"]``), sized by ``DB_POOL_MIN_SIZE``/``DB_POOL_MAX_SIZE``.
+    Connections go back to the pool at the end of each request, so
+    ``CONN_MAX_AGE`` is forced to 0. Needs ``pip install "psycopg[binary,pool]"``
+    alongside (or instead of) ``psycopg2-binary``. Size the pool to the
+    worker's threads: a sync gunicorn worker needs 1-2, ``gthread`` workers
+    need one per thread.
+
+``pgbouncer``
+    Connections go to an external PgBouncer in transaction pooling mode,
+    which hands each transaction to whichever server connection is free.
+    Django keeps its (cheap) connection to PgBouncer open as in
+    ``persistent`` mode.
+
+What stays safe behind PgBouncer in transaction mode:
+
+* Safe: ordinary queries, ``transaction.atomic`` (and ``select_for_update``
+  inside it), ``F()`` updates, ``bulk_create``, ``on_commit`` hooks, and
+  ``.iterator()`` with server-side cursors disabled (set automatically;
+  results are fetched client-side in chunks instead).
+* Not safe: session state that outlives one transaction. This includes
+  ``SET`` without ``LOCAL``, session advisory locks, ``LISTEN``/``NOTIFY``,
+  temporary tables used across transactions, and server-side cursors
+  (``DISABLE_SERVER_SIDE_CURSORS`` covers Django's own). Named prepared
+  statements also break unless PgBouncer 1.21+ runs with
+  ``max_prepared_statements``; psycopg 3 automatic preparation is turned off.
+* Migrations take session-level locks; run them against the database
+  directly (``DATABASE_URL`` pointing past PgBouncer) rather than through it.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+
+POOL_MODES = ("persistent", "psycopg", "pgbouncer")
+
+
+def _is_postgres(config):
+    return config["ENGINE"] in (
+        "django.db.backends.postgresql",
+        "django.db.backends.postgresql_psycopg2",
+    )
+
+
+def _uses_psycopg3():
+    try:
+        import psycopg  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def configure_connections(
+    config,
+    mode="persistent",
+    max_age=60,
+    health_checks=True,
+    pool_min_size=1,
+    pool_max_size=4,
+    pool_timeout=10.0,
+):
+    """Apply the connection mode to one ``DATABASES`` entry"""
+    if mode not in POOL_MODES:
+        raise ImproperlyConfigured(
+            f"DB_POOL_MODE must be one of {', '.join(POOL_MODES)}, not {mode!r}"
+        )
+
+    config = {**config, "OPTIONS": dict(config.get("OPTIONS", {}))}
+    config["CONN_MAX_AGE"] = max_age
+    config["CONN_HEALTH_CHECKS"] = health_checks
+
+    if mode == "persistent":
+        return config
+    if not _is_postgres(config):
+        raise ImproperlyConfigured(f"DB_POOL_MODE={mode} requires PostgreSQL")
+
+    if mode == "psycopg":
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured(
+                'DB_POOL_MODE=psycopg requires "psycopg[binary,pool]"'
+            )
+        config["CONN_MAX_AGE"] = 0
+        config["OPTIONS"]["pool"] = {
+            "min_size": pool_min_size,
+            "max_size": pool_max_size,
+            "timeout": pool_timeout,
+        }
+    else:
+        config["DISABLE_SERVER_SIDE_CURSORS"] = True
+        if _uses_psycopg3():
+            config["OPTIONS"]["prepare_threshold"] = None
+    return config
@@ -0,0 +1,131 @@
+"""
+Sparse fieldsets (``?fields=``) and opt-in expansion (``?expand=``).
+
+``SparseFieldsSerializerMixin`` takes ``fields`` and ``expand`` keyword
+arguments. Relations listed in ``Meta.expandable_fields`` render as their
+primary key unless expanded, when the mapped serializer is nested instead.
+Left out, ``expand`` expands everything, so serializers used directly keep
+their full shape.
+
+``SparseFieldsMixin`` reads both parameters on GET, passes them to the
+serializer and trims the queryset to the columns and joins the chosen
+fields read, via ``select_related`` and ``.only()``. Fields whose source
+is not a model field are mapped in ``Meta.field_sources``; a selection
+containing one that is not mapped (a method field, say) is left untrimmed.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def _split(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class SparseFieldsSerializerMixin:
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, "expandable_fields", {})
+        expand = expandable if expand is None else expand
+        for name in expand:
+            if name in self.fields:
+                self.fields[name] = expandable[name](read_only=True)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def output_fields(cls):
+        return [name for name, field in cls().fields.items() if not field.write_only]
+
+    def queryset_paths(self):
+        """``(select_related, only)`` for the current fields, or ``None`` in
+        place of ``only`` when a field reads something unmapped"""
+        model = self.Meta.model
+        field_sources = getattr(self.Meta, "field_sources", {})
+        expanded = {
+            name
+            for name in getattr(self.Meta, "expandable_fields", {})
+            if isinstance(self.fields.get(name), serializers.BaseSerializer)
+        }
+        related, only = set(expanded), {model._meta.pk.name, *expanded}
+        trimmable = True
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if name in field_sources:
+                paths = field_sources[name]
+            elif field.source == "*":
+                trimmable = False
+                continue
+            else:
+                paths = ["__".join(field.source_attrs)]
+            for path in paths:
+                parts = path.split("__")
+                if parts[0] in expanded:
+                    continue
+                try:
+                    target = model._meta.get_field(parts[0])
+                except FieldDoesNotExist:
+                    trimmable = False
+                    continue
+                if len(parts) > 1 and target.is_relation:
+                    related.add("__".join(parts[:-1]))
+                    only.add(parts[0])
+                only.add(path)
+        return sorted(related), sorted(only) if trimmable else None
+
+
+class SparseFieldsMixin:
+    """List/retrieve views whose serializer supports ``fields``/``expand``
+
+    ``default_expand`` applies when ``?expand=`` is absent.
+    """
+
+    default_expand = ()
+    trim_queryset = True
+
+    def get_fieldsets(self):
+        if self.request.method != "GET":
+            return {}
+        if not hasattr(self, "_fieldsets"):
+            serializer_class = self.get_serializer_class()
+            params = self.request.query_params
+            fieldsets = {"expand": list(self.default_expand)}
+
+            if "expand" in params:
+                expand = _split(params["expand"])
+                expandable = getattr(serializer_class.Meta, "expandable_fields", {})
+                unknown = sorted(set(expand) - set(expandable))
+                if unknown:
+                    raise ValidationError(
+                        {"expand": [f"Cannot expand: {', '.join(unknown)}"]}
+                    )
+                fieldsets["expand"] = expand
+
+            if "fields" in params:
+                fields = _split(params["fields"])
+                unknown = sorted(set(fields) - set(serializer_class.output_fields()))
+                if unknown:
+                    raise ValidationError(
+                        {"fields": [f"Unknown fields: {', '.join(unknown)}"]}
+                    )
+                fieldsets["fields"] = fields
+            self._fieldsets = fieldsets
+        return self._fieldsets
+
+    def get_serializer(self, *args, **kwargs):
+        for key, value in self.get_fieldsets().items():
+            kwargs.setdefault(key, value)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fieldsets = self.get_fieldsets()
+        if not (fieldsets and self.trim_queryset):
+            return queryset
+        serializer = self.get_serializer_class()(**fieldsets)
+        related, only = serializer.queryset_paths()
+        queryset = queryset.select_related(*related)
+        return queryset.only(*only) if only is not None else queryset
@@ -0,0 +1,101 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .routers import begin_replica_reads, end_replica_reads
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Send reads for safe requests to URL names in ``DATABASE_REPLICA_VIEWS``
+    to a replica. After a user writes, their reads stay on the primary for
+    ``DATABASE_REPLICA_PIN_SECONDS`` so they see their own changes (e.g. an
+    upload showing up in ``my-uploads``). The pin follows the user id, so it
+    survives a token refresh; anonymous clients are pinned by address.
+
+    Removed from the middleware chain when no replicas are configured.
+    """
+
+    SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(settings, "DATABASE_REPLICAS", []):
+            raise MiddlewareNotUsed
+        self.views = set(getattr(settings, "DATABASE_REPLICA_VIEWS", []))
+        self.pin_seconds = getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 10)
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            token = getattr(request, "_replica_token", None)
+            if token is not None:
+                end_replica_reads(token)
+
+        state = getattr(request, "_replica_state", None)
+        wrote = request.method not in self.SAFE_METHODS or (state and state.wrote)
+        if wrote and response.status_code < 500:
+            cache.set(self.pin_key(request), True, self.pin_seconds)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in self.SAFE_METHODS:
+            return None
+        if request.resolver_match.view_name not in self.views:
+            return None
+        if cache.get(self.pin_key(request)):
+            return None
+        request._replica_state, request._replica_token = begin_replica_reads()
+        return None
+
+    @staticmethod
+    def user_id(request):
+        """The authenticated user's id, read from the access token before
+        DRF has authenticated the request"""
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return user.pk
+        authentication = JWTAuthentication()
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            token = authentication.get_validated_token(raw_token)
+        except InvalidToken:
+            return None
+        return token.get(jwt_settings.USER_ID_CLAIM)
+
+    @classmethod
+    def pin_key(cls, request):
+        """Identify the client by its user id, falling back to its address"""
+        user_id = cls.user_id(request)
+        if user_id is not None:
+            client = f"user:{user_id}"
+        else:
+            client = "addr:" + request.META.get("REMOTE_ADDR", "")
+        return "db:pin:" + hashlib.sha256(client.encode()).hexdigest()[:32]
+
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """
+    gzip JSON responses of at least ``GZIP_MIN_LENGTH`` bytes, and all
+    streamed JSON, for clients that accept it. Files and other media are
+    left alone; they are already compressed or served elsewhere.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get("Content-Type", "")
+        if not content_type.startswith("application/json"):
+            return response
+        min_length = getattr(settings, "GZIP_MIN_LENGTH", 1024)
+        if not response.streaming and len(response.content) < min_length:
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,131 @@
+"""
+Primary/replica database routing.
+
+Reads go to a replica only while ``ReplicaRoutingMiddleware`` has marked
+the current request as replica-safe (a GET/HEAD to a URL name listed in
+``DATABASE_REPLICA_VIEWS``). Everything else, including every write, any
+read inside a transaction and the rest of a request once it has written,
+uses ``default``.
+"""
+
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+_replica_state = ContextVar("replica_state", default=None)
+
+
+class ReplicaState:
+    """Routing decision for one request"""
+
+    def __init__(self):
+        self.alias = None
+        self.wrote = False
+
+
+def begin_replica_reads():
+    """Allow reads in this context to use a replica; returns a reset token"""
+    state = ReplicaState()
+    state.alias = replica_monitor.choose()
+    return state, _replica_state.set(state)
+
+
+def end_replica_reads(token):
+    _replica_state.reset(token)
+
+
+def current_state():
+    return _replica_state.get()
+
+
+class ReplicaMonitor:
+    """Per-process view of which replicas are close enough to the primary"""
+
+    def __init__(self):
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    @property
+    def replicas(self):
+        return getattr(settings, "DATABASE_REPLICAS", [])
+
+    def choose(self):
+        healthy = [alias for alias in self.replicas if self.is_healthy(alias)]
+        return random.choice(healthy) if healthy else None
+
+    def is_healthy(self, alias):
+        interval = getattr(settings, "DATABASE_REPLICA_CHECK_INTERVAL", 5.0)
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checked.get(alias)
+            if checked is not None and now - checked[0] < interval:
+                return checked[1]
+            # Other threads keep the previous answer while this one checks
+            self._checked[alias] = (now, checked[1] if checked else True)
+
+        max_lag = getattr(settings, "DATABASE_REPLICA_MAX_LAG", 2.0)
+        lag = replication_lag(alias)
+        healthy = lag is not None and lag <= max_lag
+        with self._lock:
+            self._checked[alias] = (time.monotonic(), healthy)
+        return healthy
+
+    def reset(self):
+        with self._lock:
+            self._checked.clear()
+
+
+def replication_lag(alias):
+    """Seconds the replica is behind the primary, or None if unreachable"""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        # SQLite stand-ins are copied explicitly by `sync_replica`
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT CASE
+                    WHEN NOT pg_is_in_recovery() THEN 0
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE COALESCE(
+                        EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()),
+                        0
+                    )
+                END
+                """
+            )
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _replica_state.get()
+        if state is None or state.alias is None or state.wrote:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _replica_state.get()
+        if state is not None:
+            # Later reads in this request must see the write
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+replica_monitor = ReplicaMonitor()
@@ -0,0 +1,87 @@
+"""
+Serves the OpenAPI schema written by ``manage.py build_schema`` so that
+production workers never import drf_spectacular or introspect views.
+"""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.html import escape
+from django.views.decorators.http import condition, require_safe
+
+SCHEMA_CONTENT_TYPE = "application/vnd.oai.openapi+json"
+
+SWAGGER_UI_HTML = """<!DOCTYPE html>
+<html>
+<head>
+  <title>{title}</title>
+  <meta charset="utf-8">
+  <link rel="stylesheet" href="{dist}/swagger-ui.css">
+</head>
+<body>
+  <div id="swagger-ui"></div>
+  <script src="{dist}/swagger-ui-bundle.js"></script>
+  <script>
+    SwaggerUIBundle({{url: {url}, dom_id: "#swagger-ui", deepLinking: true}});
+  </script>
+</body>
+</html>
+"""
+
+
+def schema_path():
+    return Path(settings.API_SCHEMA_DIR) / "openapi.json"
+
+
+class PrebuiltSchema:
+    """Schema bytes and ETag, reloaded when the file changes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.body = None
+        self.etag = None
+
+    def load(self):
+        path = schema_path()
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise Http404("Schema not built; run `manage.py build_schema`")
+        with self._lock:
+            if mtime != self._mtime:
+                self.body = path.read_bytes()
+                self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+                self._mtime = mtime
+            return self.body, self.etag
+
+
+prebuilt_schema = PrebuiltSchema()
+
+
+def _schema_etag(request):
+    return prebuilt_schema.load()[1]
+
+
+@require_safe
+@condition(etag_func=_schema_etag)
+def schema_view(request):
+    body, _ = prebuilt_schema.load()
+    response = HttpResponse(body, content_type=SCHEMA_CONTENT_TYPE)
+    response["Cache-Control"] = "public, max-age=300"
+    return response
+
+
+@require_safe
+def swagger_ui_view(request):
+    html = SWAGGER_UI_HTML.format(
+        title=escape(settings.SPECTACULAR_SETTINGS.get("TITLE", "API")),
+        dist=settings.SWAGGER_UI_DIST,
+        url=json.dumps(reverse("schema")),
+    )
+    return HttpResponse(html)
@@ -14,6 +14,9 @@ from pathlib import Path
 from datetime import timedelta
 import environ
 import os
+import tempfile
+
+from config.database import configure_connections
 
 env = environ.Env()
 environ.Env.read_env()
@@ -56,6 +59,19 @@ INSTALLED_APPS = [
     "rest_framework_simplejwt.token_blacklist",
 ]
 
+# Serve the schema written by `manage.py build_schema` instead of generating
+# it per request; drf_spectacular is then never imported by the workers
+API_SCHEMA_PREBUILT = env.bool("API_SCHEMA_PREBUILT", default=not DEBUG)
+API_SCHEMA_DIR = env("API_SCHEMA_DIR", default=str(BASE_DIR / "schema"))
+if API_SCHEMA_PREBUILT:
+    INSTALLED_APPS.remove("drf_spectacular")
+
+SPECTACULAR_SETTINGS = {
+    "TITLE": "PastQ API",
+    "VERSION": "1.0.0",
+}
+SWAGGER_UI_DIST = "https://cdn.jsdelivr.net/npm/swagger-ui-dist@5"
+
 AUTH_USER_MODEL = "users.User"
 
 # REST Framework settings
@@ -94,6 +110,17 @@ REST_FRAMEWORK = {
     "NON_FIELD_ERRORS_KEY": "non_field_errors",
 }
 
+# Encode/decode JSON with orjson (config/renderers.py); same output as the
+# stdlib renderer, falls back to it when orjson is not installed
+FAST_JSON = env.bool("FAST_JSON", default=False)
+if FAST_JSON:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = ["config.renderers.ORJSONRenderer"]
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"] = [
+        "config.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ]
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -138,21 +165,139 @@ else:
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Where past-question files live: "local" (MEDIA_ROOT) or "s3" (any
+# S3-compatible store, e.g. MinIO at S3_ENDPOINT_URL=http://localhost:9000).
+# Both shard names by content hash; see apps.past_questions.storage.
+PAST_QUESTION_STORAGE = env("PAST_QUESTION_STORAGE", default="local")
+if PAST_QUESTION_STORAGE == "s3":
+    PAST_QUESTION_STORAGE_CONFIG = {
+        "BACKEND": "apps.past_questions.storage.ShardedS3Storage",
+        "OPTIONS": {
+            "bucket_name": env("S3_BUCKET"),
+            "endpoint_url": env("S3_ENDPOINT_URL", default=None),
+            "region_name": env("S3_REGION", default=None),
+            "access_key": env("S3_ACCESS_KEY_ID", default=None),
+            "secret_key": env("S3_SECRET_ACCESS_KEY", default=None),
+            # MinIO and most self-hosted stores need path-style addressing
+            "addressing_style": env("S3_ADDRESSING_STYLE", default="path"),
+            "default_acl": None,
+            "querystring_expire": env.int("S3_URL_EXPIRE_SECONDS", default=300),
+            "multipart_threshold": env.int(
+                "S3_MULTIPART_THRESHOLD", default=8 * 1024 * 1024
+            ),
+            "multipart_chunksize": env.int(
+                "S3_MULTIPART_CHUNKSIZE", default=8 * 1024 * 1024
+            ),
+            "max_concurrency": env.int("S3_MAX_CONCURRENCY", default=4),
+        },
+    }
+else:
+    PAST_QUESTION_STORAGE_CONFIG = {
+        "BACKEND": "apps.past_questions.storage.ShardedFileSystemStorage",
+    }
+
+# Signed, expiring download links (apps.past_questions.signed_urls).
+# DOWNLOAD_URL_BASE points links at another host (e.g. a file-serving
+# ASGI worker); DOWNLOAD_ACCEL_REDIRECT_PREFIX hands the bytes to nginx.
+DOWNLOAD_URL_TTL = env.int("DOWNLOAD_URL_TTL", default=300)
+DOWNLOAD_URL_PREFIX = env("DOWNLOAD_URL_PREFIX", default="/files/")
+DOWNLOAD_URL_BASE = env("DOWNLOAD_URL_BASE", default="")
+DOWNLOAD_URL_SECRET = env("DOWNLOAD_URL_SECRET", default="")
+DOWNLOAD_ACCEL_REDIRECT_PREFIX = env("DOWNLOAD_ACCEL_REDIRECT_PREFIX", default="")
+
+# Direct-to-storage uploads (apps.past_questions.uploads). Intents can be
+# finalised for UPLOAD_INTENT_GRACE seconds after their upload URL expires;
+# run `manage.py cleanup_uploads` from cron to drop abandoned ones.
+UPLOAD_URL_PREFIX = env("UPLOAD_URL_PREFIX", default="/uploads/")
+UPLOAD_INTENT_TTL = env.int("UPLOAD_INTENT_TTL", default=3600)
+UPLOAD_INTENT_GRACE = env.int("UPLOAD_INTENT_GRACE", default=3600)
+
+# Most ids accepted by past-questions/batch/ in one request
+PAST_QUESTION_BATCH_MAX_IDS = env.int("PAST_QUESTION_BATCH_MAX_IDS", default=50)
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+    "past_questions": PAST_QUESTION_STORAGE_CONFIG,
+}
+
 # Max upload size (10MB)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "apps.analytics.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "config.middleware.JSONGZipMiddleware",
+    "apps.analytics.middleware.QueryInstrumentationMiddleware",
+    "apps.analytics.middleware.SlowQueryMiddleware",
+    "config.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "apps.analytics.middleware.ProfilingMiddleware",
 ]
 
+# JSON bodies at least this long are gzipped (streamed JSON always is)
+GZIP_MIN_LENGTH = env.int("GZIP_MIN_LENGTH", default=1024)
+
+# Query instrumentation: fraction of requests to record (0 disables it)
+QUERY_INSTRUMENTATION_SAMPLE_RATE = env.float(
+    "QUERY_INSTRUMENTATION_SAMPLE_RATE", default=1.0 if DEBUG else 0.0
+)
+# Same statement shape repeated this often in one request is logged as N+1
+QUERY_DUPLICATE_THRESHOLD = env.int("QUERY_DUPLICATE_THRESHOLD", default=5)
+# Maximum queries per request, by URL name (checked by QueryBudgetMixin)
+QUERY_BUDGETS = {
+    "courses:course-catalog": 1,
+    "courses:course-autocomplete": 1,
+    "courses:course-detail": 3,
+    "past_questions:past-question-list": 2,
+    "past_questions:past-question-search": 2,
+    "past_questions:past-question-download": 8,
+    "past_questions:approve-past-question": 6,
+}
+
+# Slow statements are kept per process and dumped by `dump_slow_queries`;
+# off (0) unless DEBUG or a threshold is set
+SLOW_QUERY_THRESHOLD_MS = env.float(
+    "SLOW_QUERY_THRESHOLD_MS", default=100 if DEBUG else 0
+)
+SLOW_QUERY_BUFFER_SIZE = env.int("SLOW_QUERY_BUFFER_SIZE", default=500)
+# Only the slowest fingerprints are explained, once each
+SLOW_QUERY_EXPLAIN_TOP = env.int("SLOW_QUERY_EXPLAIN_TOP", default=10)
+# Fraction of explains run with ANALYZE (PostgreSQL SELECTs only)
+SLOW_QUERY_EXPLAIN_ANALYZE_RATE = env.float(
+    "SLOW_QUERY_EXPLAIN_ANALYZE_RATE", default=0.0
+)
+SLOW_QUERY_DIR = env(
+    "SLOW_QUERY_DIR", default=os.path.join(tempfile.gettempdir(), "pastq-slow-queries")
+)
+
+# Prometheus metrics served at analytics/metrics/
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default=True)
+# Shared directory where each worker writes its metrics (unset = per process)
+METRICS_MULTIPROC_DIR = env("METRICS_MULTIPROC_DIR", default=None)
+METRICS_FLUSH_INTERVAL = env.float("METRICS_FLUSH_INTERVAL", default=1.0)
+# Bearer token for scrapes; without one metrics are only served with DEBUG on
+METRICS_AUTH_TOKEN = env("METRICS_AUTH_TOKEN", default="")
+
+# Request profiling (off unless enabled; then sampled or via signed header)
+PROFILING_ENABLED = env.bool("PROFILING_ENABLED", default=False)
+PROFILING_SAMPLE_RATE = env.float("PROFILING_SAMPLE_RATE", default=0.0)
+# "sampling" writes folded stacks for flame graphs, "cprofile" writes .prof
+PROFILING_MODE = env("PROFILING_MODE", default="sampling")
+PROFILING_INTERVAL = env.float("PROFILING_INTERVAL", default=0.005)
+PROFILING_DIR = env("PROFILING_DIR", default=str(BASE_DIR / "profiles"))
+PROFILING_MAX_FILES = env.int("PROFILING_MAX_FILES", default=200)
+PROFILING_TOKEN_MAX_AGE = env.int("PROFILING_TOKEN_MAX_AGE", default=60 * 60)
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -187,6 +332,129 @@ DATABASES = {
     "default": env.db(),  # gets info from DATABASE_URL
 }
 
+# Read replicas, e.g. DATABASE_REPLICA_URLS=postgres://...,postgres://...
+# Locally a second SQLite file kept current by `manage.py sync_replicas` works
+DATABASE_REPLICAS = []
+for index, url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[]), 1):
+    alias = f"replica{index}"
+    DATABASES[alias] = {
+        **env.db_url_config(url),
+        # Tests read the primary's test database through the replica alias
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["config.routers.ReplicaRouter"]
+
+# Connection reuse: "persistent", "psycopg" (psycopg 3 pool per worker) or
+# "pgbouncer" (transaction pooling); see config/database.py
+DB_POOL_MODE = env("DB_POOL_MODE", default="persistent")
+for alias, db_config in DATABASES.items():
+    DATABASES[alias] = configure_connections(
+        db_config,
+        mode=DB_POOL_MODE,
+        max_age=env.int("DB_CONN_MAX_AGE", default=60),
+        health_checks=env.bool("DB_CONN_HEALTH_CHECKS", default=True),
+        pool_min_size=env.int("DB_POOL_MIN_SIZE", default=1),
+        pool_max_size=env.int("DB_POOL_MAX_SIZE", default=4),
+        pool_timeout=env.float("DB_POOL_TIMEOUT", default=10.0),
+    )
+
+# URL names whose GET requests may read from a replica. Views that read and
+# then write back (past question detail, download) stay on the primary.
+DATABASE_REPLICA_VIEWS = [
+    "courses:course-list",
+    "courses:course-detail",
+    "courses:course-catalog",
+    "courses:course-autocomplete",
+    "courses:course-search",
+    "courses:popular-courses",
+    "courses:faculty-list",
+    "courses:department-list",
+    "past_questions:past-question-list",
+    "past_questions:past-question-search",
+    "past_questions:past-question-content-search",
+    "past_questions:popular-past-questions",
+    "past_questions:my-uploads",
+]
+# Replicas further behind than this (seconds) are skipped for the primary
+DATABASE_REPLICA_MAX_LAG = env.float("DATABASE_REPLICA_MAX_LAG", default=2.0)
+DATABASE_REPLICA_CHECK_INTERVAL = env.float(
+    "DATABASE_REPLICA_CHECK_INTERVAL", default=5.0
+)
+# How long a client's reads stay on the primary after it writes. Needs a
+# shared CACHE_URL when running more than one worker.
+DATABASE_REPLICA_PIN_SECONDS = env.int("DATABASE_REPLICA_PIN_SECONDS", default=10)
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+# The default locmem cache lives in each worker, so invalidating cached
+# course data after an edit only reaches the worker that saved it. Without
+# a shared CACHE_URL those caches fall back to short timeouts instead.
+CACHE_IS_SHARED = (
+    CACHES["default"]["BACKEND"] != "django.core.cache.backends.locmem.LocMemCache"
+)
+
+# Warm URLs, serializers, connections and caches when the WSGI/ASGI app loads
+WARMUP_ON_STARTUP = env.bool("WARMUP_ON_STARTUP", default=True)
+
+# Post-upload work runs on an in-process thread pool after commit
+BACKGROUND_TASK_WORKERS = env.int("BACKGROUND_TASK_WORKERS", default=2)
+BACKGROUND_TASKS_EAGER = env.bool("BACKGROUND_TASKS_EAGER", default=False)
+
+# Recompression of scanned image uploads (see past_questions/optimization.py)
+SCAN_OPTIMIZE_ON_UPLOAD = env.bool("SCAN_OPTIMIZE_ON_UPLOAD", default=True)
+# High by default: scans are mostly small print that low qualities blur
+SCAN_JPEG_QUALITY = env.int("SCAN_JPEG_QUALITY", default=92)
+# Downscale scans whose long side exceeds this many pixels (3508 is A4 at
+# 300 dpi); 0 keeps the full resolution
+SCAN_MAX_DIMENSION = env.int("SCAN_MAX_DIMENSION", default=0)
+SCAN_GRAYSCALE_TOLERANCE = env.int("SCAN_GRAYSCALE_TOLERANCE", default=24)
+SCAN_CONVERT_TO_PDF = env.bool("SCAN_CONVERT_TO_PDF", default=False)
+# Keep the original unless the result is at least this much smaller
+SCAN_MIN_SAVING = env.float("SCAN_MIN_SAVING", default=0.05)
+
+# Text extraction from PDF uploads for searching inside papers (needs pypdf)
+CONTENT_EXTRACT_ON_UPLOAD = env.bool("CONTENT_EXTRACT_ON_UPLOAD", default=True)
+CONTENT_MAX_CHARS = env.int("CONTENT_MAX_CHARS", default=200_000)
+
+# Near-duplicate detection: max dHash/aHash Hamming distance (of 64 bits).
+# dHash distances above 7 are not guaranteed to be found by the band index.
+PHASH_MAX_DISTANCE = env.int("PHASH_MAX_DISTANCE", default=7)
+PHASH_AHASH_MAX_DISTANCE = env.int("PHASH_AHASH_MAX_DISTANCE", default=10)
+
+# Course lookups: in-process LRU in front of the shared cache
+COURSE_CACHE_LOCAL_SIZE = env.int("COURSE_CACHE_LOCAL_SIZE", default=512)
+COURSE_CACHE_LOCAL_TTL = env.int("COURSE_CACHE_LOCAL_TTL", default=60)
+COURSE_CACHE_SHARED_TTL = env.int(
+    "COURSE_CACHE_SHARED_TTL",
+    default=60 * 60 if CACHE_IS_SHARED else COURSE_CACHE_LOCAL_TTL,
+)
+
+# Catalog snapshot is rebuilt when courses change. Without a shared cache
+# other workers never hear of the change, so it also expires after this long
+CATALOG_CACHE_TIMEOUT = env.int(
+    "CATALOG_CACHE_TIMEOUT", default=60 * 60 if CACHE_IS_SHARED else 60
+)
+
+# Seconds between checks for course changes made by other workers
+COURSE_AUTOCOMPLETE_REFRESH_INTERVAL = env.int(
+    "COURSE_AUTOCOMPLETE_REFRESH_INTERVAL", default=30
+)
+# Rebuild the index at least this often; the version check above cannot
+# reach other workers without a shared cache. Also refreshes popularity.
+COURSE_AUTOCOMPLETE_MAX_AGE = env.int(
+    "COURSE_AUTOCOMPLETE_MAX_AGE", default=60 * 60 if CACHE_IS_SHARED else 60
+)
+
+# Search facet counts for identical filters are reused for this many seconds
+SEARCH_FACETS_CACHE_TIMEOUT = env.int("SEARCH_FACETS_CACHE_TIMEOUT", default=30)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
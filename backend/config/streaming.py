@@ -0,0 +1,95 @@
+"""
+Streaming JSON for large, unpaginated list endpoints.
+
+``StreamingListMixin`` replaces ``ListModelMixin.list`` with a
+``StreamingHttpResponse``. The queryset is walked with
+``.iterator(chunk_size=...)``, each row goes through the view's serializer
+on its own, and rows are rendered a batch at a time by the renderer DRF
+negotiated (``JSONRenderer``, or ``ORJSONRenderer`` with ``FAST_JSON``).
+Memory stays flat however many rows there are, and the body is byte for
+byte what that renderer would produce for the whole list. Requests for
+another format (``?format=api``) or an indented body get the ordinary,
+non-streamed response.
+
+The query runs, and the first batch is serialized, inside the view. The
+middleware therefore still sees the query, which means it is recorded,
+routed to a replica and timed, and a failing query is an ordinary error
+response. The remaining rows come from the same open cursor without
+further queries.
+
+Once the first batch has been sent the status cannot change. An error
+after that is logged and re-raised, so the server drops the connection
+and the client is left with a truncated body that is not valid JSON,
+never a complete-looking list.
+
+Use it on unpaginated listings only; a paginated page is already small.
+"""
+
+import logging
+from itertools import chain, islice
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+
+def render_stream(renderer, items, media_type=None, context=None, batch_size=500):
+    """Render an iterable of already-serialized items as one JSON array,
+    yielding bytes as it goes"""
+    items = iter(items)
+    yield b"["
+    first = True
+    while batch := list(islice(items, batch_size)):
+        # Render the batch as a list and drop its brackets, so the
+        # separators and escaping match the renderer exactly
+        body = renderer.render(batch, media_type, context)[1:-1]
+        yield body if first else b"," + body
+        first = False
+    yield b"]"
+
+
+class StreamingListMixin:
+    """List action that streams the serialized queryset instead of
+    building it in memory"""
+
+    stream_chunk_size = 2000
+    stream_batch_size = 500
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        media_type = request.accepted_media_type
+        context = self.get_renderer_context()
+        if not isinstance(renderer, JSONRenderer) or renderer.get_indent(
+            media_type, context
+        ):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        first = [
+            serializer.to_representation(instance)
+            for instance in islice(rows, self.stream_batch_size)
+        ]
+        rest = (serializer.to_representation(instance) for instance in rows)
+
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        return StreamingHttpResponse(
+            self._stream(renderer, chain(first, rest), media_type, context),
+            content_type=content_type,
+        )
+
+    def _stream(self, renderer, items, media_type, context):
+        try:
+            yield from render_stream(
+                renderer, items, media_type, context, self.stream_batch_size
+            )
+        except Exception:
+            logger.exception(
+                "Streaming %s failed; the response is truncated",
+                self.request.get_full_path(),
+            )
+            raise
@@ -0,0 +1,468 @@
+import datetime
+import decimal
+import gzip
+import io
+import json
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    OperationalError,
+    connections,
+    transaction,
+)
+from django.http import Http404
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.courses.models import Course
+from apps.users.models import User
+from apps.users.serializers import UserProfileSerializer
+from apps.users.views.admin import UserListView
+
+from .database import configure_connections
+from .renderers import ORJSONRenderer, orjson
+from .routers import begin_replica_reads, end_replica_reads, replica_monitor
+from .schema import schema_view
+from .warmup import warm_up
+
+REPLICA = "replica_test"
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], DATABASE_REPLICA_MAX_LAG=2.0)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Routing against a second SQLite file, synced with ``sync_replicas`` and
+    then left behind: a course added afterwards exists only on the primary,
+    so each response shows which database served it.
+
+    Transaction test case, since reads inside a transaction always go to
+    the primary.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        # Registered here rather than in DATABASES, so the test runner does
+        # not create (or mirror) a test database for it
+        connections.settings[REPLICA] = {
+            **connections[DEFAULT_DB_ALIAS].settings_dict,
+            "NAME": str(Path(directory.name) / "replica.sqlite3"),
+        }
+        cls.addClassCleanup(cls.remove_replica)
+        cls.databases = {DEFAULT_DB_ALIAS, REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def remove_replica(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        if connections[DEFAULT_DB_ALIAS].vendor != "sqlite":
+            self.skipTest("The replica stand-in copies a SQLite primary")
+        cache.clear()
+        replica_monitor.reset()
+        self.user = User.objects.create_user("10000001", "ama@example.com", "pass")
+        self.other = User.objects.create_user("10000002", "kofi@example.com", "pass")
+        call_command("sync_replicas", stdout=io.StringIO())
+        Course.objects.create(
+            code="CSC101",
+            title="Introduction to Computing",
+            faculty="computing",
+            department="Computer Science",
+            level="100",
+        )
+
+    def list_courses(self, user=None, **headers):
+        if user is not None:
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {AccessToken.for_user(user)}"
+        with CaptureQueriesContext(connections[REPLICA]) as replica_queries:
+            response = self.client.get(reverse("courses:course-list"), **headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["count"], len(replica_queries)
+
+    def test_listed_view_reads_replica(self):
+        count, replica_queries = self.list_courses()
+        self.assertEqual(count, 0)
+        self.assertGreater(replica_queries, 0)
+
+    def test_unlisted_view_reads_primary(self):
+        with CaptureQueriesContext(connections[REPLICA]) as replica_queries:
+            response = self.client.get(
+                reverse("users:profile"),
+                HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(replica_queries), 0)
+
+    def test_write_pins_user_across_token_refresh(self):
+        response = self.client.patch(
+            reverse("users:profile"),
+            {"first_name": "Ama"},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # A fresh token for the same user still reads the primary
+        self.assertEqual(self.list_courses(self.user), (1, 0))
+        self.assertEqual(self.list_courses(self.other)[0], 0)
+
+    def test_anonymous_write_pins_address(self):
+        self.client.post(
+            reverse("users:login"),
+            {"index_number": "10000001", "password": "wrong"},
+            REMOTE_ADDR="10.0.0.1",
+        )
+        self.assertEqual(self.list_courses(REMOTE_ADDR="10.0.0.1"), (1, 0))
+        self.assertEqual(self.list_courses(REMOTE_ADDR="10.0.0.2")[0], 0)
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch("config.routers.replication_lag", return_value=30.0):
+            self.assertEqual(self.list_courses(), (1, 0))
+
+    def test_atomic_block_and_writes_use_primary(self):
+        state, token = begin_replica_reads()
+        try:
+            self.assertEqual(Course.objects.count(), 0)
+            with transaction.atomic():
+                self.assertEqual(Course.objects.count(), 1)
+            self.assertEqual(Course.objects.count(), 0)
+
+            # Once the request has written, it reads its own writes
+            Course.objects.filter(code="CSC101").update(title="Computing")
+            self.assertTrue(state.wrote)
+            self.assertEqual(Course.objects.count(), 1)
+        finally:
+            end_replica_reads(token)
+
+    def test_cache_loaders_read_primary(self):
+        # Long-lived caches refilled from the lagging replica would keep
+        # serving its stale rows after it caught up
+        response = self.client.get(reverse("courses:course-detail", args=["CSC101"]))
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse("courses:course-catalog"))
+        codes = [course["code"] for course in response.json()["courses"]]
+        self.assertEqual(codes, ["CSC101"])
+
+
+class ConfigureConnectionsTests(SimpleTestCase):
+    postgres = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": "pastq",
+        "OPTIONS": {"sslmode": "require"},
+    }
+
+    def test_persistent(self):
+        config = configure_connections(self.postgres, max_age=30, health_checks=False)
+        self.assertEqual(config["CONN_MAX_AGE"], 30)
+        self.assertIs(config["CONN_HEALTH_CHECKS"], False)
+        self.assertEqual(config["OPTIONS"], {"sslmode": "require"})
+
+    def test_psycopg_pool(self):
+        with mock.patch.dict(sys.modules, {"psycopg_pool": mock.Mock()}):
+            config = configure_connections(
+                self.postgres, mode="psycopg", pool_min_size=2, pool_max_size=8
+            )
+        # Connections go back to the pool after each request
+        self.assertEqual(config["CONN_MAX_AGE"], 0)
+        self.assertEqual(
+            config["OPTIONS"]["pool"], {"min_size": 2, "max_size": 8, "timeout": 10.0}
+        )
+        self.assertNotIn("pool", self.postgres["OPTIONS"])
+
+        with mock.patch.dict(sys.modules, {"psycopg_pool": None}):
+            with self.assertRaisesMessage(ImproperlyConfigured, "psycopg[binary,pool]"):
+                configure_connections(self.postgres, mode="psycopg")
+
+    def test_pgbouncer(self):
+        with mock.patch("config.database._uses_psycopg3", return_value=True):
+            config = configure_connections(self.postgres, mode="pgbouncer")
+        self.assertEqual(config["CONN_MAX_AGE"], 60)
+        self.assertIs(config["DISABLE_SERVER_SIDE_CURSORS"], True)
+        self.assertIsNone(config["OPTIONS"]["prepare_threshold"])
+
+        with mock.patch("config.database._uses_psycopg3", return_value=False):
+            config = configure_connections(self.postgres, mode="pgbouncer")
+        self.assertNotIn("prepare_threshold", config["OPTIONS"])
+
+    def test_rejected_modes(self):
+        sqlite = {"ENGINE": "django.db.backends.sqlite3", "NAME": "db.sqlite3"}
+        self.assertEqual(configure_connections(sqlite)["CONN_MAX_AGE"], 60)
+        with self.assertRaisesMessage(ImproperlyConfigured, "requires PostgreSQL"):
+            configure_connections(sqlite, mode="pgbouncer")
+        with self.assertRaisesMessage(ImproperlyConfigured, "DB_POOL_MODE must be"):
+            configure_connections(self.postgres, mode="pool")
+
+
+class PrebuiltSchemaTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        schema_dir = override_settings(API_SCHEMA_DIR=directory.name)
+        schema_dir.enable()
+        self.addCleanup(schema_dir.disable)
+
+    def get(self, **headers):
+        return schema_view(RequestFactory().get("/api/schema/", **headers))
+
+    def test_build_and_revalidate(self):
+        with self.assertRaisesMessage(Http404, "run `manage.py build_schema`"):
+            self.get()
+
+        call_command("build_schema", stdout=io.StringIO())
+        call_command("build_schema", "--check", stdout=io.StringIO())
+        body = (self.directory / "openapi.json").read_bytes()
+        self.assertEqual(len(list(self.directory.glob("openapi-*.json"))), 1)
+        self.assertIn("/past-questions/", json.loads(body)["paths"])
+
+        response = self.get()
+        self.assertEqual(response.content, body)
+        etag = response["ETag"]
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        # A rebuilt file is picked up with a new ETag
+        (self.directory / "openapi.json").write_bytes(body + b"\n")
+        with self.assertRaisesMessage(CommandError, "out of date"):
+            call_command("build_schema", "--check", stdout=io.StringIO())
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class WarmUpTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_missing_database_does_not_raise(self):
+        missing = OperationalError("unable to open database file")
+        with mock.patch.object(
+            connections[DEFAULT_DB_ALIAS], "ensure_connection", side_effect=missing
+        ), self.assertLogs("config.warmup", "WARNING") as logs:
+            timings = warm_up()
+        self.assertEqual(
+            list(timings), ["imports", "urls", "serializers", "connections", "caches"]
+        )
+        self.assertEqual(
+            [output.splitlines()[0] for output in logs.output],
+            [
+                "WARNING:config.warmup:Warm-up step connections failed",
+                "WARNING:config.warmup:Warm-up of the course cache failed",
+                "WARNING:config.warmup:Warm-up of the catalog failed",
+            ],
+        )
+
+    def test_empty_database(self):
+        with self.assertNoLogs("config.warmup", "WARNING"):
+            warm_up()
+
+    def test_unreachable_cache(self):
+        unreachable = mock.Mock(**{"get.side_effect": ConnectionError("refused")})
+        with mock.patch("apps.courses.catalog.cache", unreachable), self.assertLogs(
+            "config.warmup", "WARNING"
+        ) as logs:
+            warm_up()
+        # The other fills still ran
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("Warm-up of the catalog failed", logs.output[0])
+
+
+@mock.patch.object(UserListView, "stream_batch_size", 7)
+class StreamingListTests(TestCase):
+    url = reverse("users:user-list")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "10000000", "admin@example.com", "pass", is_staff=True
+        )
+        User.objects.bulk_create(
+            User(
+                index_number=f"1000{n:04d}",
+                email=f"student{n}@example.com",
+                first_name="Àmá\u2028" if n % 3 else f"Student {n}",
+            )
+            for n in range(1, 20)
+        )
+
+    def get(self, **headers):
+        return self.client.get(
+            self.url,
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.admin)}",
+            **headers,
+        )
+
+    def expected(self, renderer):
+        request = RequestFactory().get(self.url)
+        data = UserProfileSerializer(
+            User.objects.all(), many=True, context={"request": request}
+        ).data
+        return renderer.render(data)
+
+    def test_same_bytes_as_the_renderer(self):
+        response = self.get()
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(
+            b"".join(response.streaming_content), self.expected(JSONRenderer())
+        )
+
+        with mock.patch.object(UserListView, "renderer_classes", [ORJSONRenderer]):
+            response = self.get()
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            b"".join(response.streaming_content), self.expected(ORJSONRenderer())
+        )
+
+    def test_indented_requests_are_not_streamed(self):
+        response = self.get(HTTP_ACCEPT="application/json; indent=2")
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(json.loads(response.content)), 20)
+        self.assertIn(b'\n  {\n    "id"', response.content)
+
+    def test_query_runs_inside_the_view(self):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            response = self.get()
+        self.assertTrue(
+            any('"email"' in query["sql"] for query in queries.captured_queries)
+        )
+        # The rest of the rows come from the cursor opened in the view
+        with self.assertNumQueries(0):
+            body = b"".join(response.streaming_content)
+        self.assertEqual(len(json.loads(body)), 20)
+
+    def test_error_in_the_first_batch_is_an_error_response(self):
+        self.client.raise_request_exception = False
+        with mock.patch.object(
+            UserProfileSerializer, "to_representation", side_effect=ValueError
+        ), self.assertLogs("django.request", "ERROR"):
+            response = self.get()
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(response.streaming)
+
+    def test_error_mid_stream_truncates_the_body(self):
+        represent = UserProfileSerializer.to_representation
+        calls = []
+
+        def fail_on_tenth(serializer, instance):
+            calls.append(instance)
+            if len(calls) == 10:
+                raise ValueError("broken row")
+            return represent(serializer, instance)
+
+        with mock.patch.object(
+            UserProfileSerializer, "to_representation", fail_on_tenth
+        ):
+            response = self.get()
+            self.assertEqual(response.status_code, 200)
+            chunks = []
+            with self.assertLogs("config.streaming", "ERROR"), self.assertRaises(
+                ValueError
+            ):
+                for chunk in response.streaming_content:
+                    chunks.append(chunk)
+        body = b"".join(chunks)
+        self.assertTrue(body.startswith(b"[{"))
+        with self.assertRaises(ValueError):
+            json.loads(body)
+
+    def test_gzip_threshold(self):
+        response = self.get(HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        body = gzip.decompress(b"".join(response.streaming_content))
+        self.assertEqual(body, self.expected(JSONRenderer()))
+
+        # Short bodies are not worth compressing
+        url = reverse("users:user-detail", args=[self.admin.pk])
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(self.admin)}"}
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", **auth)
+        self.assertLess(len(response.content), settings.GZIP_MIN_LENGTH)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        with override_settings(GZIP_MIN_LENGTH=len(response.content)):
+            gzipped = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", **auth)
+        self.assertEqual(gzipped["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(gzipped.content), response.content)
+
+
+@skipUnless(orjson, "orjson is not installed")
+class ORJSONRendererTests(SimpleTestCase):
+    class PaperSerializer(serializers.Serializer):
+        price = serializers.DecimalField(max_digits=6, decimal_places=2)
+        reviewed_at = serializers.DateTimeField()
+        token = serializers.UUIDField()
+
+    def assertSameAsJSONRenderer(self, data):
+        expected = JSONRenderer().render(data)
+        self.assertEqual(ORJSONRenderer().render(data), expected)
+        return expected
+
+    def test_matches_json_renderer(self):
+        token = uuid.UUID("12345678-1234-5678-1234-567812345678")
+        aware = datetime.datetime(2024, 3, 1, 9, 30, 15, tzinfo=datetime.timezone.utc)
+        papers = self.PaperSerializer(
+            [{"price": decimal.Decimal("12.50"), "reviewed_at": aware, "token": token}],
+            many=True,
+        ).data
+        body = self.assertSameAsJSONRenderer(
+            {
+                "papers": papers,
+                "decimal": decimal.Decimal("0.10"),
+                "uuid": token,
+                "lazy": gettext_lazy("Final Exam"),
+                "text": "Àmá \u2028 \u2029 </script>",
+                "date": datetime.date(2024, 3, 1),
+                "time": datetime.time(9, 30),
+                "numbers": {1: 1.5, "big": 2**53, "nested": [None, True]},
+            }
+        )
+        self.assertEqual(
+            json.loads(body)["papers"][0],
+            {
+                "price": "12.50",
+                "reviewed_at": "2024-03-01 09:30:15",
+                "token": str(token),
+            },
+        )
+        self.assertIn(b"\\u2028", body)
+
+    def test_bare_datetimes_use_the_field_format(self):
+        # Documented difference: JSONRenderer would use ISO 8601 here
+        moment = datetime.datetime(2024, 3, 1, 9, 30, 15, tzinfo=datetime.timezone.utc)
+        expected = serializers.DateTimeField().to_representation(moment)
+        body = ORJSONRenderer().render({"at": moment})
+        self.assertEqual(json.loads(body), {"at": expected})
+        self.assertNotEqual(body, JSONRenderer().render({"at": moment}))
+
+    def test_indent_and_empty(self):
+        renderer = ORJSONRenderer()
+        self.assertEqual(renderer.render(None), b"")
+        context = {"indent": 2}
+        self.assertEqual(
+            renderer.render({"a": [1]}, renderer_context=context),
+            JSONRenderer().render({"a": [1]}, renderer_context=context),
+        )
@@ -20,7 +20,16 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+
+from apps.past_questions.signed_urls import receive_signed_upload, serve_signed_file
+
+if settings.API_SCHEMA_PREBUILT:
+    from config.schema import schema_view, swagger_ui_view
+else:
+    from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+
+    schema_view = SpectacularAPIView.as_view()
+    swagger_ui_view = SpectacularSwaggerView.as_view(url_name="schema")
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -31,11 +40,18 @@ urlpatterns = [
     path("notifications/", include("apps.notifications.urls")),
     path("api/token/", TokenObtainPairView.as_view(), name="token-obtain-pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("api/schema/", schema_view, name="schema"),
+    path("api/docs/", swagger_ui_view, name="swagger-ui"),
+    # Signed download/upload links (also answered by SignedFileApp under ASGI)
+    path(
+        f"{settings.DOWNLOAD_URL_PREFIX.strip('/')}/<path:name>",
+        serve_signed_file,
+        name="signed-file",
+    ),
     path(
-        "api/docs/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
-        name="swagger-ui",
+        f"{settings.UPLOAD_URL_PREFIX.strip('/')}/<path:name>",
+        receive_signed_upload,
+        name="signed-upload",
     ),
 ]
 
@@ -0,0 +1,119 @@
+"""
+Worker warm-up.
+
+Pays the first-request costs once at boot: importing every app's modules,
+compiling URL patterns, building serializer fields, opening database
+connections and filling the course, catalog and autocomplete caches.
+
+Under ``gunicorn --preload`` this runs once in the master, which then closes
+its connections (and shuts down any psycopg pool) so forked workers inherit
+the warmed state but not the sockets or pool threads; each worker runs
+``open_connections`` after the fork (see ``gunicorn.conf.py``).
+"""
+
+import logging
+import time
+from importlib import import_module
+
+from django.apps import apps
+from django.db import connections
+from django.urls import get_resolver
+from django.utils.module_loading import module_has_submodule
+
+logger = logging.getLogger(__name__)
+
+APP_MODULES = (
+    "models",
+    "signals",
+    "permissions",
+    "serializers",
+    "views",
+    "urls",
+    "admin",
+)
+
+
+def import_app_modules():
+    for app_config in apps.get_app_configs():
+        for name in APP_MODULES:
+            if module_has_submodule(app_config.module, name):
+                import_module(f"{app_config.name}.{name}")
+
+
+def compile_urls():
+    """Compile every pattern's regex and populate the reverse lookup tables"""
+
+    def compile_patterns(patterns):
+        count = 0
+        for pattern in patterns:
+            pattern.pattern.regex
+            count += 1
+            if hasattr(pattern, "url_patterns"):
+                count += compile_patterns(pattern.url_patterns)
+        return count
+
+    resolver = get_resolver()
+    resolver.reverse_dict
+    return compile_patterns(resolver.url_patterns)
+
+
+def build_serializers():
+    from apps.courses.serializers import CourseSerializer
+    from apps.past_questions.serializers import PastQuestionSerializer
+
+    for serializer_class in (PastQuestionSerializer, CourseSerializer):
+        serializer_class().fields
+
+
+def open_connections():
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def fill_caches():
+    from apps.courses.autocomplete import course_index
+    from apps.courses.cache import course_cache
+    from apps.courses.catalog import get_catalog
+
+    # Each fill is independent, so one failing still leaves the others warm
+    fills = [
+        ("course cache", course_cache.warm),
+        ("catalog", get_catalog),
+        ("autocomplete", course_index.warm),
+    ]
+    for name, fill in fills:
+        try:
+            fill()
+        except Exception:
+            logger.warning("Warm-up of the %s failed", name, exc_info=True)
+
+
+def warm_up():
+    """Run every warm-up step and return how long each took, in ms"""
+    steps = [
+        ("imports", import_app_modules),
+        ("urls", compile_urls),
+        ("serializers", build_serializers),
+        ("connections", open_connections),
+        ("caches", fill_caches),
+    ]
+    # Steps that reach the database or cache: a missing, empty or
+    # unreachable backend must not stop the worker booting
+    best_effort = {"connections", "caches"}
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            if name not in best_effort:
+                raise
+            logger.warning("Warm-up step %s failed", name, exc_info=True)
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    logger.info(
+        "Warm-up finished in %.0fms (%s)",
+        sum(timings.values()),
+        ", ".join(f"{name} {ms:.0f}ms" for name, ms in timings.items()),
+    )
+    return timings
@@ -0,0 +1,73 @@
+"""
+Gunicorn settings, loaded automatically when gunicorn starts in this
+directory (``gunicorn config.wsgi``).
+
+With ``GUNICORN_PRELOAD`` (the default) the application is imported and
+warmed once in the master, so recycled workers start with compiled URLs,
+built serializers and filled caches instead of paying for them on their
+first requests.
+"""
+
+import os
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+
+def on_starting(server):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    from django.conf import settings
+
+    if server.cfg.workers > 1 and not settings.CACHE_IS_SHARED:
+        # Invalidation only reaches the worker that made the edit; the others
+        # catch up when their cached course data expires
+        server.log.warning(
+            "CACHE_URL is a per-process cache and there are %d workers; use "
+            "Redis or Memcached so course edits show up in every worker at once",
+            server.cfg.workers,
+        )
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+
+    # Warm-up used the master's connections; workers must open their own
+    connections.close_all()
+    # close_all() only returns pooled connections to the pool. The pool's
+    # threads would not survive the fork, so shut it down; each worker
+    # builds its own on first use
+    for alias in connections:
+        connection = connections[alias]
+        if connection.settings_dict["OPTIONS"].get("pool"):
+            connection.close_pool()
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        # The worker imports (and warms) the application itself
+        return
+    from django.conf import settings
+    from django.db import DatabaseError
+
+    if settings.WARMUP_ON_STARTUP:
+        from config.warmup import open_connections
+
+        try:
+            open_connections()
+        except DatabaseError as exc:
+            worker.log.warning("Could not open database connections: %s", exc)
+
+
+def child_exit(server, worker):
+    directory = os.environ.get("METRICS_MULTIPROC_DIR")
+    if directory:
+        from apps.analytics.metrics import retire_process
+
+        # Keep the exited worker's counts without keeping its file
+        retire_process(directory, worker.pid)
@@ -79,12 +79,10 @@ export const PastQuestionCard = ({
               <FileText className="h-5 w-5 text-primary-600 dark:text-primary-400" />
 
               <Link
-                to={`/courses/${typeof pastQuestion.course === "object" ? pastQuestion.course.code : ""}`}
+                to={`/courses/${pastQuestion.course_code ?? ""}`}
                 className="text-xs font-medium text-primary-600 dark:text-primary-400 hover:underline"
               >
-                {typeof pastQuestion.course === "object"
-                  ? pastQuestion.course.code
-                  : "Course Info"}
+                {pastQuestion.course_code || "Course Info"}
               </Link>
             </div>
 
@@ -92,12 +90,11 @@ export const PastQuestionCard = ({
               {pastQuestion.title}
             </h3>
 
-            {typeof pastQuestion.course === "object" &&
-              pastQuestion.course?.title && (
-                <p className="text-sm text-gray-600 dark:text-gray-400 mb-2">
-                  {pastQuestion.course.title}
-                </p>
-              )}
+            {pastQuestion.course_title && (
+              <p className="text-sm text-gray-600 dark:text-gray-400 mb-2">
+                {pastQuestion.course_title}
+              </p>
+            )}
           </div>
 
           <div className="flex flex-col gap-1 items-end">
@@ -140,10 +137,10 @@ export const PastQuestionCard = ({
             )}
           </div>
 
-          {pastQuestion.uploader_name && (
+          {pastQuestion.uploaded_by_name && (
             <div className="flex items-center gap-1 text-sm text-gray-600 dark:text-gray-400">
               <User className="h-4 w-4" />
-              <span>{pastQuestion.uploader_name}</span>
+              <span>{pastQuestion.uploaded_by_name}</span>
             </div>
           )}
 
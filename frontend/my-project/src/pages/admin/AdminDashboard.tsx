@@ -220,9 +220,7 @@ export const AdminDashboard = () => {
                       Needs Review
                     </span>
                     <span className="text-sm text-primary-600 dark:text-primary-400 font-bold">
-                      {typeof upload.course === "object"
-                        ? upload.course.code
-                        : upload.course}
+                      {upload.course_code}
                     </span>
                   </div>
                   <h3 className="text-lg font-bold text-gray-900 dark:text-white leading-tight">
@@ -231,7 +229,7 @@ export const AdminDashboard = () => {
                   <div className="flex flex-wrap gap-4 mt-2 text-[10px] text-gray-500 font-bold uppercase tracking-widest">
                     <span>Year: {upload.year}</span>
                     <span>Semester: {upload.semester}</span>
-                    <span>Uploader: {upload.uploader_name || "Anonymous"}</span>
+                    <span>Uploader: {upload.uploaded_by_name || "Anonymous"}</span>
                   </div>
                 </div>
 
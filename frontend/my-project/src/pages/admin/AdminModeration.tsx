@@ -59,8 +59,8 @@ export const AdminModeration = () => {
       const searchStr = searchQuery.toLowerCase();
       return (
         item.title?.toLowerCase().includes(searchStr) ||
-        item.course?.code?.toLowerCase().includes(searchStr) ||
-        item.uploader_name?.toLowerCase().includes(searchStr)
+        item.course_code?.toLowerCase().includes(searchStr) ||
+        item.uploaded_by_name?.toLowerCase().includes(searchStr)
       );
     });
   }, [pendingItems, searchQuery]);
@@ -111,11 +111,11 @@ export const AdminModeration = () => {
                   <div className="flex flex-wrap items-center gap-x-4 gap-y-1">
                     <span className="flex items-center gap-1.5 text-xs font-bold text-primary-600 dark:text-primary-400">
                       <BookOpen className="w-3 h-3" />{" "}
-                      {item.course?.code || "N/A"}
+                      {item.course_code || "N/A"}
                     </span>
                     <span className="flex items-center gap-1.5 text-xs font-medium text-slate-500 dark:text-slate-400">
                       <User className="w-3 h-3" />{" "}
-                      {item.uploader_name || "Anonymous Student"}
+                      {item.uploaded_by_name || "Anonymous Student"}
                     </span>
                     <span className="text-[10px] font-black text-slate-400 uppercase tracking-widest bg-slate-100 dark:bg-slate-900 px-2 py-0.5 rounded">
                       Level {item.level || "---"} • {item.year || "---"}
@@ -47,7 +47,7 @@ export const QuestionManagement = () => {
       return (
         q.title?.toLowerCase().includes(searchStr) ||
         q.course_code?.toLowerCase().includes(searchStr) ||
-        q.course?.title?.toLowerCase().includes(searchStr)
+        q.course_title?.toLowerCase().includes(searchStr)
       );
     });
   }, [questions, searchQuery]);
@@ -197,7 +197,7 @@ export const PastQuestionDetail = () => {
                       Uploaded By
                     </p>
                     <p className="font-medium">
-                      {question.uploader_name || "Community Member"}
+                      {question.uploaded_by_name || "Community Member"}
                     </p>
                   </div>
                 </div>
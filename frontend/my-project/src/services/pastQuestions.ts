@@ -2,7 +2,7 @@ import api from './api';
 
 export interface PastQuestion {
   id: number;
-  course: string | {
+  course: number | string | {
     id: number;
     code: string;
     title: string;
@@ -12,6 +12,8 @@ export interface PastQuestion {
     credit_hours?: number;
     past_questions_count?: number;
 };
+  course_code?: string;
+  course_title?: string;
   title: string;
   year: number;
   semester: 'First' | 'Second' | 'Summer';
@@ -19,7 +21,7 @@ export interface PastQuestion {
   file_type: 'pdf' | 'image';
   file_size: number;
   uploader: number;
-  uploader_name?: string;
+  uploaded_by_name?: string;
   has_solutions: boolean;
   is_scanned: boolean;
   status: 'pending' | 'approved' | 'rejected';
@@ -84,6 +86,14 @@ export const pastQuestionsService = {
     return response.data;
   },
 
+  // One request for many ids; results keep the order of `ids`
+  getByIds: async (ids: number[], recordViews = false): Promise<PastQuestion[]> => {
+    const response = await api.get('/past-questions/batch/', {
+      params: { ids: ids.join(','), record_views: recordViews },
+    });
+    return response.data;
+  },
+
   search: async (query: string, filters?: { course?: string; year?: number; semester?: string }) => {
     const response = await api.get('/past-questions/search/', {
       params: { q: query, ...filters },